@@ -1,8 +1,11 @@
-from app.api.deps import get_current_user
+from app.api.deps import get_current_user, require_metrics_token
 from app.api.endpoints import (
     auth,
     category,
     course,
+    export,
+    media,
+    metrics,
     payment,
     progress,
     purchase,
@@ -30,6 +33,11 @@ api_router.include_router(
     prefix="/upload",
     tags=["upload"],
 )
+api_router.include_router(
+    media.router,
+    prefix="/media",
+    tags=["media"],
+)
 api_router.include_router(
     purchase.router,
     prefix="/purchases",
@@ -47,3 +55,16 @@ api_router.include_router(
     prefix="/payment",
     tags=["payment"],
 )
+api_router.include_router(
+    export.router,
+    prefix="/exports",
+    tags=["exports"],
+    dependencies=[Depends(get_current_user)],
+)
+api_router.include_router(
+    metrics.router,
+    prefix="/metrics",
+    tags=["metrics"],
+    dependencies=[Depends(require_metrics_token)],
+    include_in_schema=False,
+)
@@ -1,29 +1,42 @@
-from typing import Annotated, Generator
+import secrets
+from typing import Annotated, AsyncGenerator, Generator, Optional
 
+from app.config import config
 from app.crud.user import crud_user
-from app.database import engine
+from app.database import AsyncSessionLocal, SessionLocal, log_checkout_time
 from app.models import User
 from app.security import get_subject_token_type
 from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer, OAuth2PasswordBearer
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 
 ALGORITHM = "HS256"
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+metrics_scheme = HTTPBearer(auto_error=False)
 
 
 def get_db() -> Generator:
-    with Session(engine) as session:
+    with SessionLocal() as session:
+        try:
+            yield session
+        finally:
+            log_checkout_time(session)
+
+
+async def get_async_db() -> AsyncGenerator:
+    async with AsyncSessionLocal() as session:
         yield session
 
 
 SessionDep = Annotated[Session, Depends(get_db)]
+AsyncSessionDep = Annotated[AsyncSession, Depends(get_async_db)]
 TokenDep = Annotated[Session, Depends(oauth2_scheme)]
 
 
 def get_current_user(db: SessionDep, token: TokenDep) -> User:
     email = get_subject_token_type(token, 'access')
-    user = crud_user.get_by_email(db=db, email=email)
+    user = crud_user.get_active_by_email(db=db, email=email)
 
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -33,3 +46,19 @@ def get_current_user(db: SessionDep, token: TokenDep) -> User:
 
 
 CurrentUser = Annotated[User, Depends(get_current_user)]
+
+
+def require_metrics_token(
+    credentials: Annotated[Optional[HTTPAuthorizationCredentials], Depends(metrics_scheme)]
+) -> None:
+    """Internal endpoints: hidden unless `METRICS_TOKEN` is set, then it is required."""
+    if not config.METRICS_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not credentials or not secrets.compare_digest(
+        credentials.credentials.encode(), config.METRICS_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=401,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,30 +1,35 @@
 import logging
 
 from app.api.deps import CurrentUser, SessionDep
+from app.cache import cache
 from app.config import config
-from app.crud.user import crud_user
+from app.crud.user import crud_user, user_cache_key
 from app.models import User
 from app.schemas.user import PasswordRecovery, UserBase, UserCreate, UserLogin
-from app.security import create_token, get_subject_token_type
+from app.security import create_token, get_subject_token_type, password_hasher
 from app.utils import send_email
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, status
+from starlette.concurrency import run_in_threadpool
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
 
 @router.post("/register", status_code=201)
-def register(
+async def register(
     db: SessionDep,
     user_in: UserCreate,
     background_tasks: BackgroundTasks,
 ):
-    if crud_user.get_by_email(db=db, email=user_in.email):
+    if await run_in_threadpool(crud_user.get_by_email, db=db, email=user_in.email):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="A user with that email already exists",
         )
-    crud_user.create(db=db, obj_in=user_in)
+    hashed_password = await password_hasher.hash(user_in.password)
+    await run_in_threadpool(
+        crud_user.create, db=db, obj_in=user_in, hashed_password=hashed_password
+    )
     confirm_token = create_token(email=user_in.email, type='confirm')
     link = f"{config.FRONTEND_URL}/confirm?confirm_token={confirm_token}"
 
@@ -39,9 +44,9 @@ def register(
 
 
 @router.post("/login", status_code=200)
-def login(db: SessionDep, user_in: UserLogin):
-    user = crud_user.authenticate(db=db, email=user_in.email, password=user_in.password)
-    if not user:
+async def login(db: SessionDep, user_in: UserLogin):
+    user = await run_in_threadpool(crud_user.get_by_email, db=db, email=user_in.email)
+    if not user or not await password_hasher.verify(user_in.password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Incorrect email or password")
     elif not user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
@@ -62,6 +67,7 @@ async def active_email(
     email = get_subject_token_type(token=token, type='confirm')
     db.query(User).filter(User.email == email).update({"is_active": True})
     db.commit()
+    cache.delete(user_cache_key(email))
 
     access_token = create_token(email, 'access')
     return {"access_token": access_token, "token_type": "bearer"}
@@ -92,14 +98,17 @@ async def verify_email(db: SessionDep, request: Request, background_tasks: Backg
 
 
 @router.post("/password-recovery", status_code=200)
-def password_recovery(db: SessionDep, recovery_token: str, obj_in: PasswordRecovery):
+async def password_recovery(db: SessionDep, recovery_token: str, obj_in: PasswordRecovery):
     email = get_subject_token_type(token=recovery_token, type='recovery')
 
     if obj_in.password != obj_in.confirm_password:
         raise HTTPException(detail="Password does not match", status_code=400)
 
-    user = crud_user.get_by_email(db=db, email=email)
-    crud_user.update(db=db, db_obj=user, obj_in=obj_in)
+    user = await run_in_threadpool(crud_user.get_by_email, db=db, email=email)
+    hashed_password = await password_hasher.hash(obj_in.password)
+    await run_in_threadpool(
+        crud_user.update, db=db, db_obj=user, obj_in={"hashed_password": hashed_password}
+    )
 
     access_token = create_token(email, 'access')
     return {"access_token": access_token, "token_type": "bearer"}
@@ -1,23 +1,32 @@
-from app.api.deps import SessionDep
+from app.api.deps import AsyncSessionDep, SessionDep
+from app.cache import CachedResponse, response_cache
 from app.crud.base import CRUDBase
 from app.models import Category
 from app.schemas.category import CategoryCreate, CategoryOut
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import select
 
 router = APIRouter()
 crud_category = CRUDBase(Category)
 
+CATEGORIES_CACHE = "categories"
+
 
 @router.post("/", status_code=201, response_model=CategoryOut)
 def create_category(db: SessionDep, category_in: CategoryCreate):
     category = crud_category.create(db=db, obj_in=category_in)
+    response_cache.invalidate(CATEGORIES_CACHE)
     return category
 
 
 @router.get("/", status_code=200, response_model=list[CategoryOut])
-def get_list_category(db: SessionDep):
-    categories = db.query(Category).order_by(Category.name.asc()).all()
-    return categories
+async def get_list_category(db: AsyncSessionDep, request: Request):
+    async def render_categories():
+        categories = await db.scalars(select(Category).order_by(Category.name.asc()))
+        return CachedResponse.render(list[CategoryOut], categories.all())
+
+    cached = await response_cache.aget_or_set(CATEGORIES_CACHE, None, render_categories)
+    return cached.to_response(request)
 
 
 @router.get("/{category_id}", status_code=200, response_model=CategoryOut)
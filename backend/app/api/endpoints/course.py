@@ -1,8 +1,10 @@
 from typing import Any, Literal, Optional
 
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import AsyncSessionDep, CurrentUser, SessionDep
+from app.cache import CachedResponse, response_cache
 from app.crud.base import CRUDBase
 from app.crud.course import crud_course
+from app.crud.progress import crud_course_progress
 from app.models import Category, Chapter, Course, Purchase, UserProgress
 from app.schemas.chapter import (
     ChapterCreate,
@@ -15,19 +17,31 @@ from app.schemas.course import (
     ChapterOut,
     CourseCreate,
     CourseOut,
+    CourseSummaryOut,
     CourseUpdate,
     CourseWithChapterProgress,
     CourseWithProgressAndCategory,
     CourseWithProgressOut,
 )
-from fastapi import APIRouter, Body, HTTPException
+from app.search import search_index
+from fastapi import APIRouter, Body, HTTPException, Query, Request, Response
+from sqlalchemy import and_, case, func, or_
 from sqlalchemy.orm import contains_eager, joinedload
+from starlette.concurrency import run_in_threadpool
 
-from .progress import get_progress_percentage
+from .progress import get_progress_percentages
 
 router = APIRouter()
 crud_chapter = CRUDBase(Chapter)
 
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+CATALOG_CACHE = "catalog"
+PUBLIC_COURSE_CACHE = "public_course"
+
+
+def invalidate_course_caches():
+    response_cache.invalidate(CATALOG_CACHE, PUBLIC_COURSE_CACHE)
+
 
 def get_course_by_owner(db: SessionDep, course_id: int, current_user: CurrentUser):
     course = crud_course.get_one_by_owner(db=db, course_id=course_id, owner_id=current_user.id)
@@ -46,6 +60,7 @@ def create_course(db: SessionDep, course_in: CourseCreate, current_user: Current
             raise HTTPException(status_code=404, detail="Category not found")
 
     course = crud_course.create_with_onwer(db=db, obj_in=course_in, owner_id=current_user.id)
+    search_index.update(course)
     return course
 
 
@@ -74,22 +89,90 @@ def publish_course(
         course.is_published = True
         db.commit()
         db.refresh(course)
+        invalidate_course_caches()
         return HTTPException(detail="Published course", status_code=200)
     else:
         course.is_published = False
         db.commit()
         db.refresh(course)
+        invalidate_course_caches()
         return HTTPException(detail="Unpublished course", status_code=200)
 
 
-@router.get("/", status_code=200, response_model=list[CourseOut])
-def get_list_course(db: SessionDep, current_user: CurrentUser):
-    courses = crud_course.get_all_by_owner(db=db, owner_id=current_user.id)
+def get_course_page(
+    db: SessionDep,
+    response: Response,
+    current_user: CurrentUser,
+    cursor: Optional[str],
+    limit: int,
+    load_chapters: bool,
+):
+    try:
+        courses, next_cursor = crud_course.get_all_by_owner(
+            db=db,
+            owner_id=current_user.id,
+            cursor=cursor,
+            limit=limit,
+            load_chapters=load_chapters,
+        )
+    except ValueError:
+        raise HTTPException(detail="Invalid cursor", status_code=400)
+
+    if next_cursor:
+        response.headers[NEXT_CURSOR_HEADER] = next_cursor
     return courses
 
 
+@router.get("/", status_code=200, response_model=list[CourseOut])
+def get_list_course(
+    db: SessionDep,
+    response: Response,
+    current_user: CurrentUser,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+):
+    return get_course_page(
+        db=db,
+        response=response,
+        current_user=current_user,
+        cursor=cursor,
+        limit=limit,
+        load_chapters=True,
+    )
+
+
+@router.get("/summaries", status_code=200, response_model=list[CourseSummaryOut])
+def get_list_course_summary(
+    db: SessionDep,
+    response: Response,
+    current_user: CurrentUser,
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=500),
+):
+    return get_course_page(
+        db=db,
+        response=response,
+        current_user=current_user,
+        cursor=cursor,
+        limit=limit,
+        load_chapters=False,
+    )
+
+
 @router.get("/dashboard-courses", status_code=200, response_model=CourseWithProgressOut)
 def get_dashboard_courses(db: SessionDep, current_user: CurrentUser):
+    # Percentages first: creating missing counters commits, which would expire the
+    # courses loaded below and reload them one by one.
+    progress_percentages = get_progress_percentages(
+        db=db,
+        course_ids=[
+            course_id
+            for (course_id,) in db.query(Purchase.course_id).filter(
+                Purchase.owner_id == current_user.id
+            )
+        ],
+        owner_id=current_user.id,
+    )
     purchased_courses = (
         db.query(Purchase)
         .join(Course, Course.id == Purchase.course_id)
@@ -99,85 +182,77 @@ def get_dashboard_courses(db: SessionDep, current_user: CurrentUser):
         .all()
     )
     courses = [purchase.course for purchase in purchased_courses]
-    progress_data = []
-
-    for course in courses:
-        progress = get_progress_percentage(
-            db=db,
-            course_id=course.id,
-            owner_id=current_user.id,
-        )
-        course_dict = course.__dict__.copy()
-        course_dict["progress"] = progress
-        progress_data.append(course_dict)
+    progress_data = [
+        {
+            **{column.key: getattr(course, column.key) for column in Course.__table__.columns},
+            "chapters": course.chapters,
+            "progress": progress_percentages[course.id],
+        }
+        for course in courses
+    ]
 
     completed_courses = [course for course in progress_data if course["progress"] == 100]
-    courses_in_progress = [course for course in progress_data if course.get("progress", 0) < 100]
+    courses_in_progress = [course for course in progress_data if course["progress"] < 100]
     return {"completed_courses": completed_courses, "courses_in_progress": courses_in_progress}
 
 
+def get_catalog_with_progress(
+    db: SessionDep,
+    catalog: list[dict[str, Any]],
+    owner_id: int,
+):
+    if not catalog:
+        return []
+
+    purchased = db.query(Purchase).filter(
+        Purchase.owner_id == owner_id,
+        Purchase.course_id.in_([course["id"] for course in catalog]),
+    )
+    # Percentages first: creating missing counters commits, which would expire the
+    # purchases and reload them one by one.
+    progress_percentages = get_progress_percentages(
+        db=db,
+        course_ids=[course_id for (course_id,) in purchased.with_entities(Purchase.course_id)],
+        owner_id=owner_id,
+    )
+    purchases = {purchase.course_id: purchase for purchase in purchased}
+    return [
+        {
+            **course,
+            "purchase": purchases.get(course["id"]),
+            "progress": progress_percentages.get(course["id"]),
+        }
+        for course in catalog
+    ]
+
+
 @router.get(
     "/courses-progress",
     status_code=200,
     response_model=list[CourseWithProgressAndCategory],
 )
-def get_courses_with_progress(
+async def get_courses_with_progress(
     db: SessionDep,
+    request: Request,
     current_user: CurrentUser,
     category_id: Optional[int] = None,
     title: Optional[str] = None,
 ):
-    base_query = (
-        db.query(Course)
-        .join(Chapter, Chapter.course_id == Course.id)
-        .join(Category, Category.id == Course.category_id)
-        .options(
-            contains_eager(Course.chapters),
-            contains_eager(Course.category),
-        )
-        .filter(Course.is_published, Chapter.is_published)
-        .order_by(Course.created_at.desc())
+    # Cache backends and the search index block, so the catalog is built in the
+    # threadpool with single-flight on the event loop, never inside `run_sync`. The
+    # progress read goes through the same cache, so it stays on the sync session too
+    # (see benchmarks/catalog_load.py).
+    catalog = await response_cache.aget_or_set(
+        CATALOG_CACHE,
+        (category_id, title),
+        lambda: run_in_threadpool(
+            crud_course.get_published, db=db, category_id=category_id, title=title
+        ),
     )
-
-    if category_id is not None:
-        base_query = base_query.filter(Course.category_id == category_id)
-
-    if title is not None:
-        base_query = base_query.filter(Course.title.ilike(f"%{title}%"))
-
-    courses = base_query.all()
-    response_data = []
-    for course in courses:
-        purchase = (
-            db.query(Purchase)
-            .filter(
-                Purchase.owner_id == current_user.id,
-                Purchase.course_id == course.id,
-            )
-            .first()
-        )
-
-        course_data = course.__dict__.copy()
-        course_data.pop('chapters', None)
-
-        chapter_ids = [chapter.id for chapter in course.chapters]
-        course_data["chapter_ids"] = chapter_ids
-
-        if not purchase:
-            course_data["progress"] = None
-            course_data["purchase"] = None
-        else:
-            progress_percentage = get_progress_percentage(
-                db=db,
-                course_id=course.id,
-                owner_id=current_user.id,
-            )
-            course_data["progress"] = progress_percentage
-            course_data["purchase"] = purchase
-
-        response_data.append(course_data)
-
-    return response_data
+    courses = await run_in_threadpool(
+        get_catalog_with_progress, db=db, catalog=catalog, owner_id=current_user.id
+    )
+    return CachedResponse.render(list[CourseWithProgressAndCategory], courses).to_response(request)
 
 
 @router.patch("/{course_id}", status_code=200, response_model=CourseOut)
@@ -195,6 +270,8 @@ def update_course(
             raise HTTPException(status_code=404, detail="Category not found")
 
     course = crud_course.update(db=db, db_obj=course, obj_in=course_in)
+    search_index.update(course)
+    invalidate_course_caches()
     return course
 
 
@@ -209,18 +286,21 @@ def get_course_with_onwer(db: SessionDep, course_id: int, current_user: CurrentU
 
 
 @router.get("/public-course/{course_id}", status_code=200, response_model=CourseOut)
-def get_public_course(db: SessionDep, course_id: int):
-    course = (
-        db.query(Course)
-        .join(Chapter, Chapter.course_id == Course.id)
-        .filter(Course.id == course_id, Course.is_published)
-        .order_by(Chapter.position.asc())
-        .first()
-    )
-    if not course:
-        raise HTTPException(detail="Course not found", status_code=404)
+def get_public_course(db: SessionDep, request: Request, course_id: int):
+    def render_course():
+        course = (
+            db.query(Course)
+            .join(Chapter, Chapter.course_id == Course.id)
+            .filter(Course.id == course_id, Course.is_published)
+            .order_by(Chapter.position.asc())
+            .first()
+        )
+        if not course:
+            raise HTTPException(detail="Course not found", status_code=404)
+        return CachedResponse.render(CourseOut, course)
 
-    return course
+    cached = response_cache.get_or_set(PUBLIC_COURSE_CACHE, course_id, render_course)
+    return cached.to_response(request)
 
 
 @router.get(
@@ -254,8 +334,13 @@ def delete_course(
     course_id: int,
     current_user: CurrentUser,
 ):
-    get_course_by_owner(db=db, course_id=course_id, current_user=current_user)
+    course = get_course_by_owner(db=db, course_id=course_id, current_user=current_user)
+    # Deleted with the course, so the media of its chapters lose their references.
+    for chapter in course.chapters:
+        db.delete(chapter)
     crud_course.delete(db=db, id=course_id)
+    search_index.remove(course_id)
+    invalidate_course_caches()
     return HTTPException(detail="Course deleted", status_code=200)
 
 
@@ -288,6 +373,10 @@ def create_chapter(
         id_name="course_id",
         id_value=course_id,
     )
+    if db_obj.is_published:
+        crud_course_progress.on_chapter_published(db=db, chapter=db_obj, delta=1)
+        db.commit()
+    invalidate_course_caches()
     return db_obj
 
 
@@ -300,11 +389,28 @@ def reorder_chapter(
 ):
     get_course_by_owner(db=db, course_id=course_id, current_user=current_user)
 
-    for item in obj_in:
-        chapter = db.query(Chapter).filter(Chapter.id == item.id).first()
-        chapter.position = item.position
+    positions = {item.id: item.position for item in obj_in}
+    if not positions:
+        return HTTPException(detail="Reorder successfully", status_code=200)
 
-    db.commit()
+    # Positions are indexes into the course's chapter list.
+    chapter_count, found = (
+        db.query(func.count(Chapter.id), func.count(case((Chapter.id.in_(positions), 1))))
+        .filter(Chapter.course_id == course_id)
+        .one()
+    )
+    if found != len(positions):
+        raise HTTPException(detail="Chapter not found", status_code=404)
+    if max(positions.values()) >= chapter_count:
+        raise HTTPException(detail="Position out of range", status_code=400)
+
+    crud_chapter.bulk_update(
+        db,
+        objs_in=[
+            {"id": chapter_id, "position": position} for chapter_id, position in positions.items()
+        ],
+    )
+    invalidate_course_caches()
 
     return HTTPException(detail="Reorder successfully", status_code=200)
 
@@ -322,12 +428,17 @@ def update_chapter(
         raise HTTPException(detail="Chapter not found", status_code=404)
 
     get_course_by_owner(db=db, course_id=course_id, current_user=current_user)
+    if chapter_in.is_published is not None:
+        crud_course_progress.set_chapter_published(
+            db=db, chapter=chapter, is_published=chapter_in.is_published
+        )
     chapter.video_url = chapter_in.video_url
     db_obj = crud_chapter.update(
         db=db,
         db_obj=chapter,
         obj_in=chapter_in,
     )
+    invalidate_course_caches()
     return db_obj
 
 
@@ -350,7 +461,10 @@ def delete_chapter(
         course.is_published = False
         db.commit()
 
+    if chapter.is_published:
+        crud_course_progress.on_chapter_published(db=db, chapter=chapter, delta=-1)
     crud_chapter.delete(db=db, id=chapter_id)
+    invalidate_course_caches()
     return HTTPException(detail="Chapter deleted", status_code=200)
 
 
@@ -372,74 +486,92 @@ def publish_chapter(
         if not (chapter.title and chapter.description and chapter.video_url):
             raise HTTPException(detail="Missing required fields", status_code=400)
 
-        chapter.is_published = True
+        crud_course_progress.set_chapter_published(db=db, chapter=chapter, is_published=True)
         db.commit()
+        invalidate_course_caches()
         return HTTPException(detail="Chapter is published", status_code=200)
     else:
-        chapter.is_published = False
+        crud_course_progress.set_chapter_published(db=db, chapter=chapter, is_published=False)
         db.commit()
         published_chapter = (
-            db.query(Chapter).filter(Chapter.course_id == course_id, is_published=True).all()
+            db.query(Chapter).filter(Chapter.course_id == course_id, Chapter.is_published).all()
         )
         if not published_chapter:
             course.is_published = False
             db.commit()
+        invalidate_course_caches()
 
         return HTTPException(detail="Chapter is unpublished", status_code=200)
 
 
-@router.get(
-    "/{course_id}/chapters/{chapter_id}/dashboard",
-    status_code=200,
-    response_model=ChapterDashboard,
-)
-def chapter_in_dashboard(
-    db: SessionDep,
-    course_id: int,
-    chapter_id: int,
-    current_user: CurrentUser,
+def get_chapter_dashboard(
+    db: SessionDep, course_id: int, chapter_id: int, owner_id: int, prefetch: int = 0
 ):
-    purchase = (
-        db.query(Purchase)
-        .filter(
-            Purchase.course_id == course_id,
-            Purchase.owner_id == current_user.id,
+    row = (
+        db.query(Chapter, Course.price, Purchase, UserProgress)
+        .join(Course, Course.id == Chapter.course_id)
+        .outerjoin(
+            Purchase,
+            and_(Purchase.course_id == Chapter.course_id, Purchase.owner_id == owner_id),
+        )
+        .outerjoin(
+            UserProgress,
+            and_(UserProgress.chapter_id == Chapter.id, UserProgress.owner_id == owner_id),
         )
+        .filter(Chapter.id == chapter_id, Chapter.course_id == course_id)
         .first()
     )
-    course = db.query(Course).filter(Course.id == course_id).first()
-    chapter = db.query(Chapter).filter(Chapter.id == chapter_id).first()
-
-    if not course or not chapter:
+    if not row:
         raise HTTPException(detail="Not found chapter or course", status_code=404)
 
-    if chapter.is_free or purchase:
-        next_chapter = (
+    chapter, course_price, purchase, user_progress = row
+    has_access = bool(chapter.is_free or purchase)
+
+    next_chapters = []
+    if has_access or prefetch:
+        next_chapters = (
             db.query(Chapter)
             .filter(
                 Chapter.course_id == course_id,
                 Chapter.is_published,
-                Chapter.position >= chapter.position,
+                or_(
+                    Chapter.position > chapter.position,
+                    and_(Chapter.position == chapter.position, Chapter.id > chapter.id),
+                ),
             )
-            .order_by(Chapter.position.asc())
-            .first()
+            .order_by(Chapter.position.asc(), Chapter.id.asc())
+            .limit(max(prefetch, 1))
+            .all()
         )
 
-    user_progress = (
-        db.query(UserProgress)
-        .filter(
-            UserProgress.chapter_id == chapter_id,
-            UserProgress.owner_id == current_user.id,
-        )
-        .first()
-    )
-
     response_dict = {
         "purchase": purchase,
-        "course_price": course.price,
+        "course_price": course_price,
         "chapter": chapter,
         "user_progress": user_progress,
-        "next_chapter": next_chapter if chapter.is_free or purchase else None,
+        "next_chapter": next_chapters[0] if has_access and next_chapters else None,
+        "upcoming_chapters": next_chapters[:prefetch],
     }
 
     return response_dict
+
+
+@router.get(
+    "/{course_id}/chapters/{chapter_id}/dashboard",
+    status_code=200,
+    response_model=ChapterDashboard,
+)
+async def chapter_in_dashboard(
+    db: AsyncSessionDep,
+    course_id: int,
+    chapter_id: int,
+    current_user: CurrentUser,
+    prefetch: int = Query(0, ge=0, le=20),
+):
+    return await db.run_sync(
+        get_chapter_dashboard,
+        course_id=course_id,
+        chapter_id=chapter_id,
+        owner_id=current_user.id,
+        prefetch=prefetch,
+    )
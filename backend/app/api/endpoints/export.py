@@ -0,0 +1,138 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from typing import Any, Iterator, Literal, Optional
+
+from app.api.deps import CurrentUser
+from app.database import SessionLocal
+from app.models import Chapter, Course, Purchase, User, UserProgress
+from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select, select
+
+router = APIRouter()
+
+# Rows fetched per round trip from the server-side cursor, and written per chunk.
+EXPORT_BATCH_SIZE = 1000
+
+ExportFormat = Literal["csv", "ndjson"]
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+
+def to_export_value(value: Any) -> Any:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def stream_rows(statement: Select, export_format: ExportFormat) -> Iterator[str]:
+    """
+    Rows of `statement` rendered in chunks of `EXPORT_BATCH_SIZE`.
+
+    Uses its own session, the request one is closed before the body is sent, and a
+    server-side cursor through `yield_per`, so memory does not grow with the rows.
+    """
+    with SessionLocal() as db:
+        result = db.execute(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        columns = list(result.keys())
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if export_format == "csv":
+            writer.writerow(columns)
+
+        for rows in result.partitions():
+            for row in rows:
+                values = [to_export_value(value) for value in row]
+                if export_format == "csv":
+                    writer.writerow(values)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, values))))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+        if buffer.tell():
+            yield buffer.getvalue()
+
+
+def export_response(statement: Select, export_format: ExportFormat, name: str):
+    return StreamingResponse(
+        stream_rows(statement, export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{name}.{export_format}"'},
+    )
+
+
+@router.get("/purchases", status_code=200)
+def export_purchases(
+    current_user: CurrentUser,
+    export_format: ExportFormat = Query("csv", alias="format"),
+    course_id: Optional[int] = None,
+    with_course: bool = False,
+    with_user: bool = False,
+):
+    """Purchases of the current instructor's courses, optionally with course and buyer."""
+    columns = [
+        Purchase.id.label("purchase_id"),
+        Purchase.created_at,
+        Purchase.course_id,
+        Purchase.owner_id.label("user_id"),
+    ]
+    if with_course:
+        columns += [Course.title.label("course_title"), Course.price.label("course_price")]
+    if with_user:
+        columns += [User.username, User.email]
+
+    statement = (
+        select(*columns)
+        .select_from(Purchase)
+        .join(Course, Course.id == Purchase.course_id)
+        .filter(Course.owner_id == current_user.id)
+        .order_by(Purchase.id)
+    )
+    if with_user:
+        statement = statement.join(User, User.id == Purchase.owner_id)
+    if course_id is not None:
+        statement = statement.filter(Purchase.course_id == course_id)
+
+    return export_response(statement, export_format, "purchases")
+
+
+@router.get("/progress", status_code=200)
+def export_progress(
+    current_user: CurrentUser,
+    export_format: ExportFormat = Query("csv", alias="format"),
+    course_id: Optional[int] = None,
+    learner_id: Optional[int] = None,
+    with_user: bool = False,
+):
+    """Chapter progress of the learners of the current instructor's courses."""
+    columns = [
+        UserProgress.owner_id.label("user_id"),
+        Chapter.course_id,
+        UserProgress.chapter_id,
+        Chapter.title.label("chapter_title"),
+        UserProgress.is_completed,
+        UserProgress.updated_at,
+    ]
+    if with_user:
+        columns += [User.username, User.email]
+
+    statement = (
+        select(*columns)
+        .select_from(UserProgress)
+        .join(Chapter, Chapter.id == UserProgress.chapter_id)
+        .join(Course, Course.id == Chapter.course_id)
+        .filter(Course.owner_id == current_user.id)
+        .order_by(UserProgress.owner_id, UserProgress.chapter_id)
+    )
+    if with_user:
+        statement = statement.join(User, User.id == UserProgress.owner_id)
+    if course_id is not None:
+        statement = statement.filter(Chapter.course_id == course_id)
+    if learner_id is not None:
+        statement = statement.filter(UserProgress.owner_id == learner_id)
+
+    return export_response(statement, export_format, "progress")
@@ -0,0 +1,170 @@
+import mimetypes
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
+
+import anyio
+from app.config import config
+from app.storage import local_storage
+from fastapi import APIRouter, HTTPException, Request, Response
+from starlette.types import Receive, Scope, Send
+
+router = APIRouter()
+
+RANGE_PATTERN = re.compile(r"bytes=(\d*)-(\d*)")
+ZEROCOPY_EXTENSION = "http.response.zerocopysend"
+
+
+class FileRangeResponse(Response):
+    """
+    Sends `length` bytes of a file from `offset`.
+
+    The file goes out with the ASGI zero-copy extension (sendfile) when the server
+    offers it, and in `chunk_size` reads otherwise.
+    """
+
+    chunk_size = 1024 * 1024
+
+    def __init__(
+        self, path: Path, offset: int, length: int, status_code: int, headers: dict[str, str]
+    ):
+        self.path = path
+        self.offset = offset
+        self.length = length
+        self.status_code = status_code
+        self.media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        self.background = None
+        self.init_headers({**headers, "Content-Length": str(length)})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send(
+            {
+                "type": "http.response.start",
+                "status": self.status_code,
+                "headers": self.raw_headers,
+            }
+        )
+        if scope["method"] == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if ZEROCOPY_EXTENSION in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send(
+                    {
+                        "type": ZEROCOPY_EXTENSION,
+                        "file": f.fileno(),
+                        "offset": self.offset,
+                        "count": self.length,
+                        "more_body": False,
+                    }
+                )
+            return
+
+        remaining = self.length
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.offset)
+            while remaining:
+                chunk = await f.read(min(self.chunk_size, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def is_not_modified(request: Request, etag: str, mtime: int) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return if_none_match.strip() == "*" or etag in (
+            tag.strip().removeprefix("W/") for tag in if_none_match.split(",")
+        )
+    return is_unmodified_since(request.headers.get("if-modified-since"), mtime)
+
+
+def is_unmodified_since(value: Optional[str], mtime: int) -> bool:
+    try:
+        return value is not None and mtime <= parsedate_to_datetime(value).timestamp()
+    except (TypeError, ValueError):
+        return False
+
+
+def is_range_current(if_range: Optional[str], etag: str, mtime: int) -> bool:
+    """
+    Whether `If-Range` lets a range through: no header, or the same strong ETag or the
+    exact Last-Modified date (RFC 9110, 13.1.5).
+    """
+    if if_range is None:
+        return True
+    if if_range.startswith(('"', "W/")):
+        return if_range == etag
+    try:
+        return parsedate_to_datetime(if_range).timestamp() == mtime
+    except (TypeError, ValueError):
+        return False
+
+
+def parse_range(value: str, size: int) -> Optional[tuple[int, int]]:
+    """
+    First and last byte of a single `bytes=` range, or None for a malformed header.
+
+    Raises 416 when the range starts past the end of the file.
+    """
+    match = RANGE_PATTERN.fullmatch(value.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Suffix range: the last `end` bytes.
+        first, last = max(size - int(end), 0), size - 1
+    else:
+        first, last = int(start), min(int(end), size - 1) if end else size - 1
+    if first > last:
+        if start and end and int(start) > int(end):
+            return None
+        raise HTTPException(
+            status_code=416,
+            detail="Range not satisfiable",
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+    return first, last
+
+
+@router.api_route("/{key:path}", methods=["GET", "HEAD"])
+def serve_media(key: str, request: Request):
+    """Serve a file of the local storage backend, with conditional and range requests."""
+    path = local_storage.path(key)
+    if not path:
+        raise HTTPException(status_code=404, detail="File not found")
+
+    stat = path.stat()
+    mtime = int(stat.st_mtime)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(mtime, usegmt=True),
+        "Accept-Ranges": "bytes",
+        "Cache-Control": f"public, max-age={config.MEDIA_CACHE_MAX_AGE}",
+    }
+    if is_not_modified(request, etag, mtime):
+        return Response(status_code=304, headers=headers)
+
+    if config.MEDIA_ACCEL_REDIRECT:
+        # The proxy in front serves the file itself, ranges and sendfile included.
+        headers["X-Accel-Redirect"] = f"{config.MEDIA_ACCEL_REDIRECT.rstrip('/')}/{key}"
+        return Response(headers=headers)
+
+    size = stat.st_size
+    byte_range = None
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and size and is_range_current(if_range, etag, mtime):
+        byte_range = parse_range(range_header, size)
+
+    if byte_range is None:
+        return FileRangeResponse(path, 0, size, 200, headers)
+
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{size}"
+    return FileRangeResponse(path, first, last - first + 1, 206, headers)
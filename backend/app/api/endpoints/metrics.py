@@ -0,0 +1,15 @@
+from app.cache import cache
+from app.security import password_hasher
+from app.worker import stripe_event_worker
+from fastapi import APIRouter
+
+router = APIRouter()
+
+
+@router.get("/", status_code=200)
+def get_metrics():
+    return {
+        "password_hasher": password_hasher.stats(),
+        "cache": cache.stats(),
+        "stripe_events": stripe_event_worker.stats(),
+    }
@@ -1,44 +1,68 @@
 import stripe
-from app.api.deps import CurrentUser, SessionDep
+from app.api.deps import AsyncSessionDep, CurrentUser
+from app.cache import cache
 from app.config import config
-from app.models import Course, Customer, Purchase
-from fastapi import APIRouter, HTTPException, Request, responses
+from app.crud.stripe_event import HANDLED_EVENTS, crud_stripe_event
+from app.models import Course, Customer, Purchase, User
+from app.stripe_client import stripe_gateway
+from app.worker import stripe_event_worker
+from fastapi import APIRouter, HTTPException, Request
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.concurrency import run_in_threadpool
 
 router = APIRouter()
 
 stripe.api_key = config.STRIPE_API_KEY
 
 
+def customer_cache_key(user_id: int) -> str:
+    return f"stripe_customer:{user_id}"
+
+
+async def get_stripe_customer_id(db: AsyncSession, user: User, course_id: int) -> str:
+    """Stripe customer of `user`, created on their first checkout."""
+
+    async def get_or_create():
+        stripe_customer_id = await db.scalar(
+            select(Customer.stripe_customer_id).where(Customer.user_id == user.id).limit(1)
+        )
+        if stripe_customer_id is None:
+            stripe_customer_id = await stripe_gateway.create_customer(email=user.email)
+            db.add(
+                Customer(
+                    user_id=user.id,
+                    course_id=course_id,
+                    stripe_customer_id=stripe_customer_id,
+                )
+            )
+            await db.commit()
+        return stripe_customer_id
+
+    # Single-flight, so concurrent first checkouts of a user create one customer.
+    return await cache.aget_or_set(
+        customer_cache_key(user.id), get_or_create, config.STRIPE_CUSTOMER_CACHE_TTL
+    )
+
+
 @router.post("/courses/{course_id}")
-async def create_checkout_session(db: SessionDep, course_id: int, current_user: CurrentUser):
-    course = db.get(Course, course_id)
+async def create_checkout_session(db: AsyncSessionDep, course_id: int, current_user: CurrentUser):
+    course = await db.get(Course, course_id)
     if not course:
         raise HTTPException(detail="Course not found", status_code=404)
 
-    purchase = (
-        db.query(Purchase)
-        .filter(
+    purchase_id = await db.scalar(
+        select(Purchase.id).where(
             Purchase.course_id == course_id,
             Purchase.owner_id == current_user.id,
         )
-        .first()
     )
-    if purchase:
+    if purchase_id:
         raise HTTPException(detail="Already purchased", status_code=400)
 
-    customer = db.query(Customer).filter(Customer.user_id == current_user.id).first()
-    if not customer:
-        stripe_customer = stripe.Customer.create(email=current_user.email)
-        customer = Customer(
-            user_id=current_user.id,
-            course_id=course_id,
-            stripe_customer_id=stripe_customer.id,
-        )
-        db.add(customer)
-        db.commit()
-        db.refresh(customer)
+    stripe_customer_id = await get_stripe_customer_id(db, current_user, course_id)
 
-    checkout_session = stripe.checkout.Session.create(
+    checkout_session = await stripe_gateway.create_checkout_session(
         line_items=[
             {
                 "price_data": {
@@ -52,8 +76,8 @@ async def create_checkout_session(db: SessionDep, course_id: int, current_user:
             }
         ],
         mode="payment",
-        customer=customer.stripe_customer_id,
-        metadata={"user_id": customer.user_id, "course_id": course_id},
+        customer=stripe_customer_id,
+        metadata={"user_id": current_user.id, "course_id": course_id},
         success_url=f"{config.FRONTEND_URL}/courses/{course_id}?success=1",
         cancel_url=f"{config.FRONTEND_URL}/courses/{course_id}?cancel=1",
     )
@@ -61,13 +85,18 @@ async def create_checkout_session(db: SessionDep, course_id: int, current_user:
 
 
 @router.post("/webhook")
-async def stripe_webhook(db: SessionDep, request: Request):
+async def stripe_webhook(db: AsyncSessionDep, request: Request):
+    """
+    Verify the event and store it in the inbox, `stripe_event_worker` applies it.
+
+    Redeliveries of an event already stored are acknowledged without effect.
+    """
     payload = await request.body()
-    event = None
     signature = request.headers.get('Stripe-Signature')
 
     try:
-        event = stripe.Webhook.construct_event(
+        event = await run_in_threadpool(
+            stripe.Webhook.construct_event,
             payload=payload,
             sig_header=signature,
             secret=config.STRIPE_WEBHOOK_SECRET,
@@ -78,19 +107,12 @@ async def stripe_webhook(db: SessionDep, request: Request):
     except stripe.error.SignatureVerificationError:
         raise HTTPException(status_code=400, detail="Invalid signature")
 
-    if event["type"] == "checkout.session.completed":
-        payment = event["data"]["object"]
-        user_id = payment["metadata"]["user_id"]
-        course_id = payment["metadata"]["course_id"]
-
-        if not (user_id and course_id):
-            raise HTTPException(detail="Webhook Error: Missing metadata", status_code=400)
-
-        purchase = Purchase(
-            course_id=course_id,
-            owner_id=user_id,
+    if event["type"] in HANDLED_EVENTS:
+        await db.run_sync(
+            crud_stripe_event.enqueue,
+            event_id=event["id"],
+            event_type=event["type"],
+            payload=payload.decode(),
         )
-        db.add(purchase)
-        db.commit()
-        db.refresh(purchase)
+        stripe_event_worker.notify()
     return HTTPException(detail="Success payment", status_code=200)
@@ -1,37 +1,24 @@
+from typing import Annotated, Optional
+
 from app.api.deps import CurrentUser, SessionDep
+from app.crud.progress import crud_course_progress, crud_user_progress
 from app.models import Chapter, Course, UserProgress
-from app.schemas.chapter import ChapterProgressComplete
-from fastapi import APIRouter, HTTPException
+from app.schemas.chapter import ChapterProgressComplete, ChapterProgressItem, CourseProgressOut
+from fastapi import APIRouter, Body, HTTPException
 
 router = APIRouter()
 
+MAX_PROGRESS_BATCH = 500
 
-def get_progress_percentage(db: SessionDep, course_id: int, owner_id: int):
-    published_chapters = (
-        db.query(Chapter.id)
-        .filter(
-            Chapter.course_id == course_id,
-            Chapter.is_published,
-        )
-        .all()
-    )
 
-    published_chapter_ids = [chapter.id for chapter in published_chapters]
-    if len(published_chapter_ids) <= 0:
-        return None
+def get_progress_percentages(
+    db: SessionDep, course_ids: list[int], owner_id: int
+) -> dict[int, Optional[float]]:
+    return crud_course_progress.get_percentages(db=db, owner_id=owner_id, course_ids=course_ids)
 
-    completed_chapters = (
-        db.query(UserProgress)
-        .filter(
-            UserProgress.owner_id == owner_id,
-            UserProgress.chapter_id.in_(published_chapter_ids),
-            UserProgress.is_completed,
-        )
-        .count()
-    )
 
-    progress_percentage = round((completed_chapters / len(published_chapter_ids)) * 100, 1)
-    return progress_percentage
+def get_progress_percentage(db: SessionDep, course_id: int, owner_id: int) -> Optional[float]:
+    return get_progress_percentages(db=db, course_ids=[course_id], owner_id=owner_id)[course_id]
 
 
 @router.get("/{course_id}", status_code=200)
@@ -40,12 +27,9 @@ def get_progress(
     course_id: int,
     current_user: CurrentUser,
 ):
-    progress_percentage = get_progress_percentage(
-        db=db,
-        course_id=course_id,
-        owner_id=current_user.id,
-    )
-    return progress_percentage
+    # Sync on purpose: the percentages go through the blocking cache, so the
+    # whole read stays on a worker thread instead of the event loop.
+    return get_progress_percentage(db=db, course_id=course_id, owner_id=current_user.id)
 
 
 @router.put(
@@ -68,27 +52,64 @@ def chapter_progress(
     if not course:
         raise HTTPException(detail="Course not found", status_code=404)
 
-    user_progress = (
+    delta = crud_user_progress.set_completed(
+        db, owner_id=current_user.id, completed={chapter_id: progress_data.is_completed}
+    )[chapter_id]
+    crud_course_progress.on_progress_changed(
+        db=db,
+        owner_id=current_user.id,
+        chapter=chapter,
+        delta=delta,
+    )
+    db.commit()
+
+    return (
         db.query(UserProgress)
         .filter(
             UserProgress.chapter_id == chapter_id,
             UserProgress.owner_id == current_user.id,
         )
-        .first()
+        .one()
     )
 
-    if user_progress:
-        user_progress.is_completed = progress_data.is_completed
-    else:
-        data = UserProgress(
-            chapter_id=chapter_id,
-            owner_id=current_user.id,
-            is_completed=progress_data.is_completed,
+
+@router.put("/courses/{course_id}/progress", status_code=200, response_model=CourseProgressOut)
+def chapters_progress(
+    db: SessionDep,
+    course_id: int,
+    current_user: CurrentUser,
+    items: Annotated[list[ChapterProgressItem], Body(max_length=MAX_PROGRESS_BATCH)],
+):
+    """
+    Apply many chapter progress updates of a course, e.g. from a client back online.
+
+    The chapters are validated with one query and the progress rows are written with
+    one upsert and a conditional update per value, in a single transaction. The
+    counter delta comes from those writes, so retried batches count once. A later
+    item wins over an earlier one for the same chapter.
+    """
+    completed = {item.chapter_id: item.is_completed for item in items}
+    if completed:
+        published = dict(
+            db.query(Chapter.id, Chapter.is_published)
+            .filter(Chapter.course_id == course_id, Chapter.id.in_(completed))
+            .all()
         )
-        db.add(data)
-        user_progress = data
+        if len(published) != len(completed):
+            raise HTTPException(detail="Chapter not found", status_code=404)
 
-    db.commit()
-    db.refresh(user_progress)
+        deltas = crud_user_progress.set_completed(
+            db, owner_id=current_user.id, completed=completed
+        )
+        crud_course_progress.on_completed_changed(
+            db=db,
+            owner_id=current_user.id,
+            course_id=course_id,
+            delta=sum(delta for chapter_id, delta in deltas.items() if published[chapter_id]),
+        )
+        db.commit()
+    elif not db.get(Course, course_id):
+        raise HTTPException(detail="Course not found", status_code=404)
 
-    return user_progress
+    progress = get_progress_percentage(db=db, course_id=course_id, owner_id=current_user.id)
+    return {"course_id": course_id, "progress": progress}
@@ -1,49 +1,56 @@
-from typing import Dict
+from datetime import date
+from typing import Optional
 
 from app.api.deps import CurrentUser, SessionDep
-from app.crud.base import CRUDBase
-from app.models import Course, Purchase
+from app.crud.revenue import crud_daily_revenue
+from app.models import Purchase
 from app.schemas.purchase import PurchaseOut
-from app.schemas.purchase_analytic import PurChaseAnalyticOut, PurchaseWithCourse
+from app.schemas.purchase_analytic import PurChaseAnalyticOut
 from fastapi import APIRouter, HTTPException
-from sqlalchemy.orm import joinedload
 
 router = APIRouter()
-crud_purchase = CRUDBase(Purchase)
-
-
-def group_by_course(purchases: list[PurchaseWithCourse]):
-    grouped: Dict[str, float] = {}
-
-    for purchase in purchases:
-        course_title = purchase.course.title
-
-        if not grouped.get(course_title):
-            grouped[course_title] = 0.0
-
-        grouped[course_title] += purchase.course.price
-
-    return grouped
 
 
 @router.get("/analist", status_code=200, response_model=PurChaseAnalyticOut)
-def get_analytic(db: SessionDep, current_user: CurrentUser):
-    purchases = (
-        db.query(Purchase)
-        .join(Course, Purchase.course_id == Course.id)
-        .options(joinedload(Purchase.course))
-        .filter(Course.owner_id == current_user.id)
-        .all()
+def get_analytic(
+    db: SessionDep,
+    current_user: CurrentUser,
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    daily: bool = False,
+):
+    """
+    Sales and revenue per course of the current instructor, all-time or between
+    `start` and `end`, and per day with `daily`.
+
+    Every figure comes from the daily revenue rollup, at the prices of the sales.
+    """
+    if start and end and start > end:
+        raise HTTPException(detail="start must not be after end", status_code=400)
+
+    totals = crud_daily_revenue.totals_by_course(
+        db=db, owner_id=current_user.id, start=start, end=end
     )
 
-    grouped_earnings = group_by_course(purchases=purchases)
     data = [
-        {"name": course_title, "total": total} for course_title, total in grouped_earnings.items()
+        {"name": course_title, "total": revenue or 0.0, "sales": sales or 0}
+        for course_title, sales, revenue in totals
     ]
-    total_revenue = sum(item["total"] for item in data)
-    total_sales = len(purchases)
-
-    return {"data": data, "total_revenue": total_revenue, "total_sales": total_sales}
+    days = []
+    if daily:
+        days = [
+            {"day": day, "sales": sales, "revenue": revenue}
+            for day, sales, revenue in crud_daily_revenue.totals_by_day(
+                db=db, owner_id=current_user.id, start=start, end=end
+            )
+        ]
+
+    return {
+        "data": data,
+        "total_revenue": sum(item["total"] for item in data),
+        "total_sales": sum(item["sales"] for item in data),
+        "days": days,
+    }
 
 
 @router.get("/courses/{course_id}", status_code=200, response_model=PurchaseOut)
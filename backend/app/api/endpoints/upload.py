@@ -1,33 +1,45 @@
 import logging
+import uuid
 from typing import Literal
 
-import cloudinary
-import cloudinary.uploader
+from app.api.deps import AsyncSessionDep, CurrentUser, SessionDep
 from app.config import config
-from fastapi import APIRouter, HTTPException, UploadFile, status
+from app.crud.media import crud_media_object, hash_file
+from app.models import MediaUpload
+from app.schemas.upload import UploadComplete, UploadCreate, UploadOut
+from app.uploads import (
+    COMPLETED,
+    EXPIRED,
+    FAILED,
+    PROCESSING,
+    UPLOADING,
+    is_stalled,
+    process_upload,
+    upload_staging,
+)
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Path, Request, UploadFile, status
+from sqlalchemy import or_, update
+from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
-cloudinary.config(
-    cloud_name=config.CLOUD_NAME,
-    api_key=config.CLOUD_API_KEY,
-    api_secret=config.CLOUD_API_SECRET,
-)
-
-CHUNK_SIZE = 2 * 1024 * 1024
-
 
 @router.post("/", status_code=201)
-def upload_file(file: UploadFile, resource_type: Literal["image", "video"] = "image"):
+def upload_file(
+    db: SessionDep, file: UploadFile, resource_type: Literal["image", "video"] = "image"
+):
     try:
-        result = cloudinary.uploader.upload(
+        content_hash, size = hash_file(file.file)
+        url = crud_media_object.store(
+            db,
             file.file,
-            chunk_size=CHUNK_SIZE,
+            content_hash=content_hash,
+            size=size,
+            filename=file.filename or "",
             resource_type=resource_type,
         )
-        url = result.get("secure_url")
     except Exception as e:
         logger.error(f"Error to upload file: {e}")
         raise HTTPException(
@@ -36,3 +48,110 @@ def upload_file(file: UploadFile, resource_type: Literal["image", "video"] = "im
         )
 
     return url
+
+
+def get_owned_upload(db: Session, upload_id: str, owner_id: int) -> MediaUpload:
+    upload = db.get(MediaUpload, upload_id)
+    if not upload or upload.owner_id != owner_id:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return upload
+
+
+def upload_out(upload: MediaUpload) -> UploadOut:
+    parts = upload_staging.parts(upload.id) if upload.status != COMPLETED else {}
+    return UploadOut(
+        id=upload.id,
+        filename=upload.filename,
+        resource_type=upload.resource_type,
+        status=upload.status,
+        size=upload.size,
+        url=upload.url,
+        error=upload.error,
+        parts=parts,
+        created_at=upload.created_at,
+        updated_at=upload.updated_at,
+    )
+
+
+@router.post("/sessions", status_code=201, response_model=UploadOut)
+def start_upload(db: SessionDep, upload_in: UploadCreate, current_user: CurrentUser):
+    upload = MediaUpload(
+        id=uuid.uuid4().hex,
+        owner_id=current_user.id,
+        filename=upload_in.filename,
+        resource_type=upload_in.resource_type,
+        status=UPLOADING,
+    )
+    db.add(upload)
+    db.commit()
+    return upload_out(upload)
+
+
+@router.get("/sessions/{upload_id}", status_code=200, response_model=UploadOut)
+def get_upload(db: SessionDep, upload_id: str, current_user: CurrentUser):
+    return upload_out(get_owned_upload(db, upload_id, current_user.id))
+
+
+@router.put("/sessions/{upload_id}/parts/{part_number}", status_code=200)
+async def upload_part(
+    db: AsyncSessionDep,
+    request: Request,
+    upload_id: str,
+    current_user: CurrentUser,
+    part_number: int = Path(ge=1, le=config.UPLOAD_MAX_PARTS),
+):
+    """Store the raw request body as part `part_number`; re-sending a part replaces it."""
+    upload = await db.get(MediaUpload, upload_id)
+    if not upload or upload.owner_id != current_user.id:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload.status not in (UPLOADING, FAILED):
+        raise HTTPException(status_code=409, detail=f"Upload is {upload.status}")
+    # Don't hold a pooled connection while the part streams in.
+    await db.close()
+
+    size = await upload_staging.write_part(upload_id, part_number, request.stream())
+    return {"part_number": part_number, "size": size}
+
+
+@router.post("/sessions/{upload_id}/complete", status_code=202, response_model=UploadOut)
+def complete_upload(
+    db: SessionDep,
+    upload_id: str,
+    upload_in: UploadComplete,
+    background_tasks: BackgroundTasks,
+    current_user: CurrentUser,
+):
+    upload = get_owned_upload(db, upload_id, current_user.id)
+    if upload.status in (COMPLETED, EXPIRED):
+        # Their parts are gone, don't report them as missing.
+        raise HTTPException(status_code=409, detail=f"Upload is {upload.status}")
+    if len(set(upload_in.parts)) != len(upload_in.parts):
+        raise HTTPException(status_code=400, detail="Parts must not repeat")
+
+    received = upload_staging.parts(upload_id)
+    missing = [number for number in upload_in.parts if number not in received]
+    if missing:
+        raise HTTPException(status_code=400, detail=f"Missing parts: {missing}")
+
+    # Conditional update, so a repeated request can't queue the upload twice. An upload
+    # whose job stalled, e.g. with the worker restarted, can be completed again.
+    claimed = db.execute(
+        update(MediaUpload)
+        .where(
+            MediaUpload.id == upload_id,
+            or_(MediaUpload.status.in_((UPLOADING, FAILED)), is_stalled()),
+        )
+        .values(
+            status=PROCESSING,
+            size=sum(received[number] for number in upload_in.parts),
+            error=None,
+        )
+    ).rowcount
+    db.commit()
+    if not claimed:
+        db.refresh(upload)
+        raise HTTPException(status_code=409, detail=f"Upload is {upload.status}")
+
+    background_tasks.add_task(process_upload, upload_id, upload_in.parts)
+    db.refresh(upload)
+    return upload_out(upload)
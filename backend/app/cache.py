@@ -0,0 +1,473 @@
+import asyncio
+import hashlib
+import logging
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Hashable, Iterable, Optional
+
+from app.config import config
+from fastapi import Request, Response
+from pydantic import TypeAdapter
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire `ttl` seconds after they are set.
+
+    Keeps `hits` and `misses` counters, see `stats`.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: OrderedDict[Hashable, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[0] <= time.monotonic():
+                if item is not None:
+                    del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"size": len(self._data), "hits": self.hits, "misses": self.misses}
+
+
+@lru_cache
+def get_type_adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+class CachedResponse:
+    """JSON body rendered through a response model, with its strong ETag."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+    @classmethod
+    def render(cls, response_type: Any, value: Any) -> "CachedResponse":
+        adapter = get_type_adapter(response_type)
+        return cls(adapter.dump_json(adapter.validate_python(value, from_attributes=True)))
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        if not if_none_match:
+            return False
+        etags = {etag.strip().removeprefix("W/") for etag in if_none_match.split(",")}
+        return "*" in etags or self.etag in etags
+
+    def to_response(self, request: Request) -> Response:
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache"}
+        if self.matches(request.headers.get("if-none-match")):
+            return Response(status_code=304, headers=headers)
+        return Response(content=self.body, media_type="application/json", headers=headers)
+
+
+class CacheBackend:
+    """Byte storage shared by the workers using it, see `MemoryBackend` and `RedisBackend`."""
+
+    def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        """Set `key` only if it is missing, returns whether it was set."""
+        raise NotImplementedError
+
+    def delete(self, *keys: str) -> None:
+        raise NotImplementedError
+
+    def incr(self, key: str) -> int:
+        raise NotImplementedError
+
+
+class MemoryBackend(CacheBackend):
+    """Per-process backend, only consistent with a single worker."""
+
+    def __init__(self, maxsize: int):
+        self._data = TTLCache(maxsize=maxsize)
+        self._counters: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        values = []
+        for key in keys:
+            counter = self._counters.get(key)
+            values.append(str(counter).encode() if counter is not None else self._data.get(key))
+        return values
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self._data.set(key, value, ttl=ttl)
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        with self._lock:
+            if self._data.get(key) is not None:
+                return False
+            self._data.set(key, value, ttl=ttl)
+            return True
+
+    def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._data.delete(key)
+
+    def incr(self, key: str) -> int:
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+
+class RedisBackend(CacheBackend):
+    """Backend on any server speaking the Redis protocol, shared by every worker."""
+
+    def __init__(self, url: str, timeout: float):
+        import redis
+
+        self.client = redis.Redis.from_url(
+            url, socket_timeout=timeout, socket_connect_timeout=timeout
+        )
+
+    def get_many(self, keys: list[str]) -> list[Optional[bytes]]:
+        return self.client.mget(keys) if keys else []
+
+    def set(self, key: str, value: bytes, ttl: float) -> None:
+        self.client.set(key, value, px=max(int(ttl * 1000), 1))
+
+    def add(self, key: str, value: bytes, ttl: float) -> bool:
+        return bool(self.client.set(key, value, px=max(int(ttl * 1000), 1), nx=True))
+
+    def delete(self, *keys: str) -> None:
+        if keys:
+            self.client.delete(*keys)
+
+    def incr(self, key: str) -> int:
+        return self.client.incr(key)
+
+
+def is_event_loop_thread() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class Cache:
+    """
+    Pickled values in a `CacheBackend`, with tag invalidation and single-flight builds.
+
+    Every tag has a version counter in the backend. Entries store the versions of their
+    tags read before their value was built, and `invalidate` bumps the counters, so
+    stale entries are never served by any worker and age out on their TTL.
+
+    `get_or_set` lets one caller per key build a missing value, in this process with a
+    lock and across workers with a short-lived lock key in the backend. The others wait
+    for its result, up to `lock_timeout` seconds, then build it themselves.
+
+    Hits and misses are counted per namespace, the part of the key before its first
+    `:`, see `stats`.
+    """
+
+    def __init__(self, backend: CacheBackend, prefix: str = "", lock_timeout: float = 10):
+        self.backend = backend
+        self.prefix = prefix
+        self.lock_timeout = lock_timeout
+        self.errors = 0
+        self._lookups: dict[str, dict[str, int]] = {}
+        self._lookups_lock = threading.Lock()
+        self._locks = [threading.Lock() for _ in range(64)]
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _tag_key(self, tag: str) -> str:
+        return f"{self.prefix}tag:{tag}"
+
+    def _lock_key(self, key: str) -> str:
+        return f"{self.prefix}lock:{key}"
+
+    def tag_versions(self, tags: Iterable[str]) -> Optional[dict[str, int]]:
+        """Current versions of `tags`, or None when the backend is unavailable."""
+        tags = list(tags)
+        if not tags:
+            return {}
+        try:
+            values = self.backend.get_many([self._tag_key(tag) for tag in tags])
+        except Exception:
+            logger.exception("Cache read failed")
+            self.errors += 1
+            return None
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    def get_many(self, keys: list[str]) -> dict[str, Any]:
+        """Values of the `keys` that are cached and not invalidated, backend errors are misses."""
+        try:
+            raw = self.backend.get_many([self._key(key) for key in keys])
+            entries = {key: pickle.loads(value) for key, value in zip(keys, raw) if value}
+        except Exception:
+            logger.exception("Cache read failed")
+            self.errors += 1
+            return {}
+        current = self.tag_versions({tag for versions, _ in entries.values() for tag in versions})
+        if current is None:
+            return {}
+
+        values = {
+            key: value
+            for key, (versions, value) in entries.items()
+            if all(current[tag] == version for tag, version in versions.items())
+        }
+        self._count_lookups(keys, values)
+        return values
+
+    def _count_lookups(self, keys: list[str], values: dict[str, Any]) -> None:
+        with self._lookups_lock:
+            for key in keys:
+                counts = self._lookups.setdefault(
+                    key.partition(":")[0], {"hits": 0, "misses": 0}
+                )
+                counts["hits" if key in values else "misses"] += 1
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: float,
+        tags: Iterable[str] = (),
+        versions: Optional[dict[str, int]] = None,
+    ) -> None:
+        """Store `value`, `versions` are the tag versions read before building it."""
+        if versions is None:
+            versions = self.tag_versions(tags)
+            if versions is None:
+                return
+        try:
+            self.backend.set(self._key(key), pickle.dumps((versions, value)), ttl)
+        except Exception:
+            logger.exception("Cache write failed")
+            self.errors += 1
+
+    def delete(self, *keys: str) -> None:
+        try:
+            self.backend.delete(*(self._key(key) for key in keys))
+        except Exception:
+            logger.exception("Cache delete failed")
+            self.errors += 1
+
+    def invalidate(self, *tags: str) -> None:
+        try:
+            for tag in tags:
+                self.backend.incr(self._tag_key(tag))
+        except Exception:
+            logger.exception("Cache invalidation failed")
+            self.errors += 1
+
+    def _acquire(self, key: str) -> bool:
+        try:
+            return self.backend.add(self._lock_key(key), b"1", self.lock_timeout)
+        except Exception:
+            self.errors += 1
+            return True
+
+    def _release(self, key: str) -> None:
+        self.delete(f"lock:{key}")
+
+    def get_or_set(
+        self, key: str, build: Callable[[], Any], ttl: float, tags: Iterable[str] = ()
+    ) -> Any:
+        """
+        Cached value of `key`, built by one caller at a time.
+
+        Waiting callers block their thread, so this must not run on the event loop
+        thread, which includes code under `AsyncSession.run_sync`: use `aget_or_set`.
+        """
+        if is_event_loop_thread():
+            raise RuntimeError("Cache.get_or_set would block the event loop, use aget_or_set")
+        value = self.get(key)
+        if value is not None:
+            return value
+
+        with self._locks[hash(key) % len(self._locks)]:
+            value = self.get(key)
+            if value is not None:
+                return value
+
+            deadline = time.monotonic() + self.lock_timeout
+            while not self._acquire(key) and time.monotonic() < deadline:
+                time.sleep(0.05)
+                value = self.get(key)
+                if value is not None:
+                    return value
+            try:
+                versions = self.tag_versions(tags)
+                value = build()
+                if versions is not None:
+                    self.set(key, value, ttl, versions=versions)
+            finally:
+                self._release(key)
+            return value
+
+    async def aget_or_set(
+        self, key: str, build: Callable[[], Awaitable[Any]], ttl: float, tags: Iterable[str] = ()
+    ) -> Any:
+        """`get_or_set` for async builds, backend calls run in the threadpool."""
+        value = await run_in_threadpool(self.get, key)
+        if value is not None:
+            return value
+
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            return await asyncio.shield(inflight)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            deadline = time.monotonic() + self.lock_timeout
+            while not await run_in_threadpool(self._acquire, key):
+                if time.monotonic() >= deadline:
+                    break
+                await asyncio.sleep(0.05)
+                value = await run_in_threadpool(self.get, key)
+                if value is not None:
+                    future.set_result(value)
+                    return value
+            try:
+                versions = await run_in_threadpool(self.tag_versions, tags)
+                value = await build()
+                if versions is not None:
+                    await run_in_threadpool(self.set, key, value, ttl, versions=versions)
+            finally:
+                await run_in_threadpool(self._release, key)
+            future.set_result(value)
+            return value
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+
+    def stats(self) -> dict[str, Any]:
+        with self._lookups_lock:
+            namespaces = {
+                namespace: {
+                    **counts,
+                    "hit_ratio": round(counts["hits"] / (counts["hits"] + counts["misses"]), 3),
+                }
+                for namespace, counts in sorted(self._lookups.items())
+            }
+        return {
+            "backend": type(self.backend).__name__,
+            "hits": sum(counts["hits"] for counts in namespaces.values()),
+            "misses": sum(counts["misses"] for counts in namespaces.values()),
+            "errors": self.errors,
+            "namespaces": namespaces,
+        }
+
+
+def get_cache_backend() -> CacheBackend:
+    if config.CACHE_URL:
+        return RedisBackend(config.CACHE_URL, timeout=config.CACHE_TIMEOUT)
+    return MemoryBackend(maxsize=config.CACHE_SIZE)
+
+
+cache = Cache(get_cache_backend(), prefix=config.CACHE_PREFIX)
+
+
+def invalidate_on_commit(db: Session, *tags: str, keys: Iterable[str] = ()) -> None:
+    """
+    Invalidate `tags` and delete `keys` once the transaction of `db` commits.
+
+    Invalidating before the commit would let a concurrent read cache the old rows
+    again under the new tag versions.
+    """
+    pending = db.info.setdefault("cache_invalidations", (set(), set()))
+    pending[0].update(tags)
+    pending[1].update(keys)
+
+
+@event.listens_for(Session, "after_commit")
+def apply_invalidations(session: Session) -> None:
+    pending = session.info.pop("cache_invalidations", None)
+    if pending:
+        tags, keys = pending
+        cache.invalidate(*tags)
+        if keys:
+            cache.delete(*keys)
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def discard_invalidations(session: Session, previous_transaction) -> None:
+    session.info.pop("cache_invalidations", None)
+
+
+class ResponseCache:
+    """
+    Read endpoint results in `cache`, grouped in namespaces.
+
+    `invalidate` bumps the tag of a namespace, which every worker sees.
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+
+    def _key(self, namespace: str, key: Hashable) -> str:
+        # A cache namespace of its own, so every response cache has its own stats.
+        return f"response.{namespace}:{key!r}"
+
+    def get_or_set(self, namespace: str, key: Hashable, build: Callable[[], Any]) -> Any:
+        return cache.get_or_set(
+            self._key(namespace, key), build, self.ttl, tags=[f"response:{namespace}"]
+        )
+
+    async def aget_or_set(
+        self, namespace: str, key: Hashable, build: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        return await cache.aget_or_set(
+            self._key(namespace, key), build, self.ttl, tags=[f"response:{namespace}"]
+        )
+
+    def invalidate(self, *namespaces: str) -> None:
+        cache.invalidate(*(f"response:{namespace}" for namespace in namespaces))
+
+
+response_cache = ResponseCache(ttl=config.RESPONSE_CACHE_TTL)
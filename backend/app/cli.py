@@ -0,0 +1,148 @@
+import argparse
+import logging
+import sys
+from datetime import timedelta
+from pathlib import Path
+from typing import Optional
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config as AlembicConfig
+from alembic.migration import MigrationContext
+from app import models
+from app.config import config
+from app.crud.media import crud_media_object
+from app.crud.progress import crud_course_progress
+from app.crud.revenue import crud_daily_revenue
+from app.database import SessionLocal, engine
+from app.uploads import expire_stale_uploads
+from sqlalchemy import inspect
+
+# Schema the old import-time create_all produced, before migrations existed.
+LEGACY_REVISION = "0001"
+
+
+def get_alembic_config() -> AlembicConfig:
+    alembic_config = AlembicConfig()
+    alembic_config.set_main_option("script_location", str(Path(__file__).parent / "migrations"))
+    alembic_config.set_main_option("sqlalchemy.url", config.DATABASE_URL.replace("%", "%%"))
+    return alembic_config
+
+
+def migrate(args: argparse.Namespace) -> int:
+    alembic_config = get_alembic_config()
+
+    with engine.connect() as connection:
+        tables = set(inspect(connection).get_table_names())
+        if "users" in tables and "alembic_version" not in tables:
+            # Created by create_all: stamp it at the revision its schema matches.
+            diff = compare_metadata(MigrationContext.configure(connection), models.Base.metadata)
+            command.stamp(alembic_config, LEGACY_REVISION if diff else "head")
+
+    command.upgrade(alembic_config, args.revision)
+    return 0
+
+
+def progress_counters(args: argparse.Namespace) -> int:
+    with SessionLocal() as db:
+        drifted = crud_course_progress.rebuild(db=db, verify_only=args.verify)
+
+    for (owner_id, course_id), (completed, published) in sorted(drifted.items()):
+        print(
+            f"user={owner_id} course={course_id} "
+            f"expected completed={completed} published={published}"
+        )
+    action = "drifted" if args.verify else "rebuilt"
+    print(f"{len(drifted)} course progress counters {action}")
+    return 1 if args.verify and drifted else 0
+
+
+def revenue_rollup(args: argparse.Namespace) -> int:
+    with SessionLocal() as db:
+        rows = crud_daily_revenue.rebuild(db=db)
+
+    print(f"{rows} daily revenue rows rebuilt")
+    return 0
+
+
+def media_gc(args: argparse.Namespace) -> int:
+    with SessionLocal() as db:
+        removed = crud_media_object.collect_garbage(db=db, grace=timedelta(hours=args.grace_hours))
+
+    for url in removed:
+        print(url)
+    print(f"{len(removed)} unused media removed")
+    return 0
+
+
+def upload_gc(args: argparse.Namespace) -> int:
+    with SessionLocal() as db:
+        discarded = expire_stale_uploads(db=db, max_age=timedelta(hours=args.max_age_hours))
+
+    for upload_id in discarded:
+        print(upload_id)
+    print(f"{len(discarded)} stale upload sessions discarded")
+    return 0
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    migrations = subparsers.add_parser("migrate", help="Apply database migrations")
+    migrations.add_argument(
+        "revision",
+        nargs="?",
+        default="head",
+        help="Target revision, defaults to the latest one",
+    )
+    migrations.set_defaults(func=migrate)
+
+    counters = subparsers.add_parser(
+        "progress-counters",
+        help="Recompute course progress counters from purchases and user progress",
+    )
+    counters.add_argument(
+        "--verify",
+        action="store_true",
+        help="Only report drifted counters, exit with 1 if any",
+    )
+    counters.set_defaults(func=progress_counters)
+
+    revenue = subparsers.add_parser(
+        "revenue-rollup",
+        help="Recompute the daily revenue rollup from purchases at current course prices",
+    )
+    revenue.set_defaults(func=revenue_rollup)
+
+    gc = subparsers.add_parser(
+        "media-gc",
+        help="Remove uploaded media no course or chapter uses from storage",
+    )
+    gc.add_argument(
+        "--grace-hours",
+        type=float,
+        default=24,
+        help="Keep media unused for less than this, defaults to 24",
+    )
+    gc.set_defaults(func=media_gc)
+
+    uploads = subparsers.add_parser(
+        "upload-gc",
+        help="Expire stale upload sessions and delete their staged parts",
+    )
+    uploads.add_argument(
+        "--max-age-hours",
+        type=float,
+        default=24,
+        help="Expire sessions unchanged for this long, defaults to 24",
+    )
+    uploads.set_defaults(func=upload_gc)
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-5.5s [%(name)s] %(message)s")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -13,7 +13,29 @@ class GlobalConfig(BaseConfig):
     SECRET_KEY: Optional[str] = None
     DATABASE_URL: Optional[str] = None
     DB_FORCE_ROLL_BACK: bool = False
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_TIMEOUT: Optional[int] = None
     AT_EXPIRED: Optional[int] = None
+    METRICS_TOKEN: Optional[str] = None
+
+    CACHE_URL: Optional[str] = None
+    CACHE_PREFIX: str = "lms:"
+    CACHE_SIZE: int = 4096
+    CACHE_TIMEOUT: float = 1.0
+    USER_CACHE_TTL: int = 60
+    RESPONSE_CACHE_TTL: int = 60
+    PROGRESS_CACHE_TTL: int = 300
+
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_QUEUE_SIZE: int = 64
+    PASSWORD_HASH_PROCESSES: bool = False
+
+    SEARCH_BACKEND: Optional[Literal["postgres", "memory"]] = None
+    SEARCH_INDEX_REFRESH: int = 300
 
     EMAILS_FROM_NAME: Optional[str] = None
     EMAILS_FROM_EMAIL: Optional[str] = None
@@ -29,9 +51,29 @@ class GlobalConfig(BaseConfig):
     CLOUD_API_KEY: Optional[int] = None
     CLOUD_API_SECRET: Optional[str] = None
 
+    STORAGE_BACKEND: Optional[Literal["cloudinary", "local"]] = None
+    MEDIA_ROOT: str = "media"
+    MEDIA_URL: str = "/api/media"
+    MEDIA_CACHE_MAX_AGE: int = 86400
+    MEDIA_ACCEL_REDIRECT: Optional[str] = None
+
+    UPLOAD_TMP_DIR: Optional[str] = None
+    UPLOAD_MAX_PART_SIZE: int = 64 * 1024 * 1024
+    UPLOAD_MAX_PARTS: int = 10000
+    UPLOAD_PROCESSING_TIMEOUT: int = 3600
+
     FRONTEND_URL: Optional[str] = None
     STRIPE_WEBHOOK_SECRET: Optional[str] = None
     STRIPE_API_KEY: Optional[str] = None
+    STRIPE_API_BASE: Optional[str] = None
+    STRIPE_TIMEOUT: float = 10
+    STRIPE_MAX_CONCURRENCY: int = 20
+    STRIPE_MAX_RETRIES: int = 2
+    STRIPE_CUSTOMER_CACHE_TTL: int = 86400
+    STRIPE_EVENTS_WORKER: bool = True
+    STRIPE_EVENTS_BATCH_SIZE: int = 500
+    STRIPE_EVENTS_POLL_INTERVAL: float = 5
+    STRIPE_EVENTS_MAX_ATTEMPTS: int = 5
 
 
 config = GlobalConfig()
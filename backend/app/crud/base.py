@@ -1,7 +1,9 @@
-from typing import Any, Dict, Generic, Optional, Type, TypeVar, Union
+from typing import Any, Dict, Generic, Iterator, Optional, Sequence, Type, TypeVar, Union
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
+from sqlalchemy import bindparam, inspect, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 ModelType = TypeVar("ModelType", bound=Any)
@@ -46,22 +48,155 @@ class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
         return db_obj
 
     def update(
-        self, db: Session, *, db_obj: ModelType, obj_in: Union[UpdateSchemaType, Dict[str, Any]]
+        self,
+        db: Session,
+        *,
+        db_obj: ModelType,
+        obj_in: Union[UpdateSchemaType, Dict[str, Any]],
+        refresh: bool = True,
     ) -> ModelType:
-        obj_data = jsonable_encoder(db_obj)
-        print(obj_data)
+        """
+        Set the mapped columns of `db_obj` present in `obj_in` and commit.
+
+        Only the columns whose value changes are written. When nothing changes and the
+        session has no other pending changes, the commit and refresh are skipped.
+        """
         if isinstance(obj_in, dict):
             update_data = obj_in
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
+
+        changed = False
+        for field in inspect(self.model).column_attrs.keys():
+            if field in update_data and getattr(db_obj, field) != update_data[field]:
                 setattr(db_obj, field, update_data[field])
+                changed = True
+        if not (changed or db.dirty or db.new or db.deleted):
+            return db_obj
+
         db.add(db_obj)
         db.commit()
-        db.refresh(db_obj)
+        if refresh:
+            db.refresh(db_obj)
         return db_obj
 
+    def _batches(
+        self, objs_in: Sequence[Union[BaseModel, Dict[str, Any]]], batch_size: int
+    ) -> Iterator[list[Dict[str, Any]]]:
+        for start in range(0, len(objs_in), batch_size):
+            yield [
+                obj if isinstance(obj, dict) else obj.model_dump()
+                for obj in objs_in[start : start + batch_size]
+            ]
+
+    def _reload(self, db: Session, objs: list[ModelType], batch_size: int) -> None:
+        """Load the expired `objs` again with one `SELECT ... IN` per batch."""
+        primary_key = inspect(self.model).primary_key
+        column = primary_key[0] if len(primary_key) == 1 else tuple_(*primary_key)
+        for start in range(0, len(objs), batch_size):
+            identities = [
+                inspect(obj).identity[0] if len(primary_key) == 1 else inspect(obj).identity
+                for obj in objs[start : start + batch_size]
+            ]
+            db.query(self.model).filter(column.in_(identities)).all()
+
+    def bulk_update(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Dict[str, Any]],
+        batch_size: int = 500,
+        commit: bool = True,
+    ) -> None:
+        """
+        Update rows by primary key, each dict holds the primary key and the new values.
+
+        Runs as one `executemany` of `UPDATE ... WHERE <primary key>` per batch and set
+        of updated fields. Objects already in the session are not refreshed.
+        """
+        primary_key = inspect(self.model).primary_key
+        statement = update(self.model.__table__).where(
+            *(column == bindparam(f"pk_{column.key}") for column in primary_key)
+        )
+        for batch in self._batches(objs_in, batch_size):
+            groups: Dict[tuple, list[Dict[str, Any]]] = {}
+            for values in batch:
+                params = {
+                    f"pk_{key}" if key in statement.table.primary_key.columns else key: value
+                    for key, value in values.items()
+                }
+                groups.setdefault(tuple(params), []).append(params)
+            for params in groups.values():
+                db.execute(statement, params)
+        if commit:
+            db.commit()
+
+    def upsert(
+        self,
+        db: Session,
+        *,
+        objs_in: Sequence[Union[CreateSchemaType, Dict[str, Any]]],
+        index_elements: Sequence[str],
+        update_fields: Optional[Sequence[str]] = None,
+        increment_fields: Sequence[str] = (),
+        batch_size: int = 500,
+        refresh: bool = False,
+        commit: bool = True,
+    ) -> list[ModelType]:
+        """
+        `INSERT ... ON CONFLICT (index_elements)` on PostgreSQL and SQLite.
+
+        Conflicting rows get `update_fields`, by default every other given field that
+        is not in `increment_fields`, and have the given `increment_fields` values added
+        to theirs. They are left as they are when both are empty. Columns with an
+        `onupdate` default are set too. With `refresh` the inserted and updated objects
+        are returned, loaded through `RETURNING` and, after the commit, with one
+        `SELECT` per batch.
+        """
+        dialect = db.get_bind().dialect.name
+        if dialect == "postgresql":
+            statement = postgresql.insert(self.model)
+        elif dialect == "sqlite":
+            statement = sqlite.insert(self.model)
+        else:
+            raise NotImplementedError(f"upsert is not supported on {dialect}")
+
+        upserted = []
+        for batch in self._batches(objs_in, batch_size):
+            fields = update_fields
+            if fields is None:
+                fields = [
+                    field
+                    for field in batch[0]
+                    if field not in index_elements and field not in increment_fields
+                ]
+            if fields or increment_fields:
+                set_ = {field: statement.excluded[field] for field in fields}
+                for field in increment_fields:
+                    set_[field] = self.model.__table__.c[field] + statement.excluded[field]
+                for column in self.model.__table__.columns:
+                    if column.onupdate is not None and column.key not in set_:
+                        # Python-side `onupdate` defaults only fire on UPDATE statements.
+                        set_[column.key] = column.onupdate.arg(None)
+                batch_statement = statement.on_conflict_do_update(
+                    index_elements=index_elements, set_=set_
+                )
+            else:
+                batch_statement = statement.on_conflict_do_nothing(index_elements=index_elements)
+
+            if refresh:
+                batch_statement = batch_statement.returning(self.model).execution_options(
+                    populate_existing=True
+                )
+            result = db.execute(batch_statement, batch)
+            if refresh:
+                upserted.extend(result.scalars().all())
+        if commit:
+            db.commit()
+            if refresh:
+                self._reload(db, upserted, batch_size)
+        return upserted
+
     def delete(self, db: Session, *, id: int) -> ModelType:
         obj = db.query(self.model).get(id)
         db.delete(obj)
@@ -1,10 +1,25 @@
-from typing import Any, Dict, Optional, Union
+import base64
+from datetime import datetime
+from typing import Any, Dict, Optional
 
 from app.crud.base import CRUDBase
-from app.models import Course
+from app.models import Category, Chapter, Course
 from app.schemas.course import CourseCreate, CourseUpdate
+from app.search import search_index
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, contains_eager, noload, selectinload
+
+
+def encode_cursor(course: Course) -> str:
+    value = f"{course.created_at.isoformat()}|{course.id}"
+    return base64.urlsafe_b64encode(value.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, int]:
+    """Raises `ValueError` for a cursor not produced by `encode_cursor`."""
+    created_at, course_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.fromisoformat(created_at), int(course_id)
 
 
 class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
@@ -21,31 +36,91 @@ class CRUDCourse(CRUDBase[Course, CourseCreate, CourseUpdate]):
         return course
 
     def get_all_by_owner(
-        self, db: Session, *, owner_id: int, skip: int = 0, limit: int = 100
-    ) -> list[Course]:
-        return (
-            db.query(self.model).filter(Course.owner_id == owner_id).offset(skip).limit(limit).all()
-        )
-
-    def update(
         self,
         db: Session,
         *,
-        db_obj: Course,
-        obj_in: Union[CourseUpdate, Dict[str, Any]],
-    ) -> Course:
-        obj_data = jsonable_encoder(db_obj)
-        if isinstance(obj_in, dict):
-            update_data = obj_in
+        owner_id: int,
+        cursor: Optional[str] = None,
+        limit: int = 100,
+        load_chapters: bool = True,
+    ) -> tuple[list[Course], Optional[str]]:
+        """
+        Newest courses of `owner_id` first, paginated by keyset on (created_at, id).
+
+        Returns the page and the cursor of the next one, `None` on the last page.
+        """
+        query = db.query(self.model).filter(Course.owner_id == owner_id)
+        if cursor is not None:
+            created_at, course_id = decode_cursor(cursor)
+            query = query.filter(
+                or_(
+                    Course.created_at < created_at,
+                    and_(Course.created_at == created_at, Course.id < course_id),
+                )
+            )
+        if load_chapters:
+            query = query.options(selectinload(Course.chapters))
         else:
-            update_data = obj_in.model_dump(exclude_unset=True)
-        for field in obj_data:
-            if field in update_data:
-                setattr(db_obj, field, update_data[field])
-        db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
-        return db_obj
+            query = query.options(noload(Course.chapters))
+
+        courses = query.order_by(Course.created_at.desc(), Course.id.desc()).limit(limit + 1).all()
+        if len(courses) <= limit:
+            return courses, None
+        courses = courses[:limit]
+        return courses, encode_cursor(courses[-1])
+
+    def get_published(
+        self,
+        db: Session,
+        *,
+        category_id: Optional[int] = None,
+        title: Optional[str] = None,
+    ) -> list[Dict[str, Any]]:
+        """
+        Published catalog with the category and published chapter ids of every course,
+        as plain values so it can be cached. With a `title` search, courses are ordered
+        by search rank instead of newest first.
+        """
+        query = (
+            db.query(Course)
+            .join(Chapter, Chapter.course_id == Course.id)
+            .join(Category, Category.id == Course.category_id)
+            .options(
+                contains_eager(Course.chapters),
+                contains_eager(Course.category),
+            )
+            .filter(Course.is_published, Chapter.is_published)
+            .order_by(Course.created_at.desc())
+        )
+        if category_id is not None:
+            query = query.filter(Course.category_id == category_id)
+        ranked_ids = None
+        if title:
+            ranked_ids = search_index.search(db, title)
+            query = query.filter(Course.id.in_(ranked_ids))
+
+        courses = query.all()
+        if ranked_ids is not None:
+            rank = {course_id: position for position, course_id in enumerate(ranked_ids)}
+            courses.sort(key=lambda course: rank[course.id])
+
+        return [
+            {
+                "id": course.id,
+                "title": course.title,
+                "description": course.description,
+                "image_url": course.image_url,
+                "price": course.price,
+                "category_id": course.category_id,
+                "is_published": course.is_published,
+                "owner_id": course.owner_id,
+                "chapter_ids": [chapter.id for chapter in course.chapters],
+                "category": {"id": course.category.id, "name": course.category.name},
+                "created_at": course.created_at,
+                "updated_at": course.updated_at,
+            }
+            for course in courses
+        ]
 
 
 crud_course = CRUDCourse(Course)
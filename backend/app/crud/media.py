@@ -0,0 +1,155 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from app.crud.base import CRUDBase
+from app.models import Chapter, Course, MediaObject
+from app.storage import storage
+from pydantic import BaseModel
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
+
+logger = logging.getLogger(__name__)
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Columns holding media URLs; every row pointing at an indexed URL is one reference.
+MEDIA_COLUMNS = {Course: "image_url", Chapter: "video_url"}
+
+
+def hash_file(file: BinaryIO) -> tuple[str, int]:
+    """SHA-256 and size of the rest of `file`, which is rewound afterwards."""
+    start = file.tell()
+    content_hash = hashlib.sha256()
+    size = 0
+    while chunk := file.read(HASH_CHUNK_SIZE):
+        content_hash.update(chunk)
+        size += len(chunk)
+    file.seek(start)
+    return content_hash.hexdigest(), size
+
+
+class CRUDMediaObject(CRUDBase[MediaObject, BaseModel, BaseModel]):
+    """
+    Index of stored media by content hash, so identical uploads share one file.
+
+    `ref_count` is kept by a `before_flush` listener from the courses and chapters
+    pointing at each URL. Media nothing uses is only removed by `collect_garbage`,
+    after a grace period that leaves time for a fresh upload to be attached.
+    """
+
+    def get_by_hash(
+        self, db: Session, *, content_hash: str, resource_type: str
+    ) -> Optional[MediaObject]:
+        return db.get(MediaObject, (content_hash, resource_type))
+
+    def store(
+        self,
+        db: Session,
+        source: Union[Path, BinaryIO],
+        *,
+        content_hash: str,
+        size: int,
+        filename: str,
+        resource_type: str,
+    ) -> str:
+        """URL of the content: the indexed copy if there is one, else a newly saved one."""
+        media = self.get_by_hash(db, content_hash=content_hash, resource_type=resource_type)
+        if media:
+            # Restarts the grace period so garbage collection can't take it meanwhile.
+            media.updated_at = datetime.now()
+            db.commit()
+            return media.url
+
+        url = storage.save(source, filename, resource_type)
+        self.upsert(
+            db,
+            objs_in=[
+                {
+                    "content_hash": content_hash,
+                    "resource_type": resource_type,
+                    "url": url,
+                    "size": size,
+                    "ref_count": 0,
+                }
+            ],
+            index_elements=["content_hash", "resource_type"],
+            update_fields=[],
+        )
+        indexed_url = db.scalar(
+            select(MediaObject.url).where(
+                MediaObject.content_hash == content_hash,
+                MediaObject.resource_type == resource_type,
+            )
+        )
+        if indexed_url != url:
+            # A concurrent upload of the same content was indexed first.
+            storage.delete(url)
+        return indexed_url
+
+    def collect_garbage(self, db: Session, *, grace: timedelta) -> list[str]:
+        """Remove media no course or chapter has used for `grace`, returns their URLs."""
+        cutoff = datetime.now() - grace
+        unused = (MediaObject.ref_count <= 0, MediaObject.updated_at < cutoff)
+        removed = []
+        for url in db.scalars(select(MediaObject.url).where(*unused)).all():
+            # Rechecked row by row, a reference may have been added since the select.
+            deleted = db.query(MediaObject).filter(MediaObject.url == url, *unused).delete(
+                synchronize_session=False
+            )
+            db.commit()
+            if deleted:
+                storage.delete(url)
+                removed.append(url)
+        return removed
+
+
+crud_media_object = CRUDMediaObject(MediaObject)
+
+
+def committed_url(session: Session, obj: Union[Course, Chapter], attr: str) -> Optional[str]:
+    history = get_history(obj, attr)
+    if history.deleted or history.unchanged:
+        return (history.deleted or history.unchanged)[0]
+    state = inspect(obj)
+    if not state.has_identity:
+        return None
+    # Expired before it was changed or deleted: the row still has the old value.
+    model = type(obj)
+    return session.connection().scalar(
+        select(getattr(model, attr)).where(model.id == state.identity[0])
+    )
+
+
+@event.listens_for(Session, "before_flush")
+def count_media_references(session: Session, flush_context, instances) -> None:
+    deltas: dict[str, int] = {}
+
+    def add(url: Optional[str], delta: int) -> None:
+        if url:
+            deltas[url] = deltas.get(url, 0) + delta
+
+    for obj in session.new:
+        attr = MEDIA_COLUMNS.get(type(obj))
+        if attr:
+            add(getattr(obj, attr), 1)
+    for obj in session.dirty:
+        attr = MEDIA_COLUMNS.get(type(obj))
+        if attr and get_history(obj, attr).added:
+            add(committed_url(session, obj, attr), -1)
+            add(getattr(obj, attr), 1)
+    for obj in session.deleted:
+        attr = MEDIA_COLUMNS.get(type(obj))
+        if attr:
+            add(committed_url(session, obj, attr), -1)
+
+    for url, delta in deltas.items():
+        if delta:
+            session.connection().execute(
+                update(MediaObject)
+                .where(MediaObject.url == url)
+                .values(ref_count=MediaObject.ref_count + delta)
+            )
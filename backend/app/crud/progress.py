@@ -0,0 +1,305 @@
+from typing import Optional
+
+from app.cache import cache, invalidate_on_commit
+from app.config import config
+from app.crud.base import CRUDBase
+from app.models import Chapter, CourseProgress, Purchase, UserProgress
+from pydantic import BaseModel
+from sqlalchemy import case, distinct, exists, func, update
+from sqlalchemy.orm import Session
+
+Counts = dict[tuple[int, int], tuple[int, int]]
+
+PROGRESS_CACHE_TAG = "course_progress"
+
+
+def progress_cache_key(owner_id: int, course_id: int) -> str:
+    return f"course_progress:{owner_id}:{course_id}"
+
+
+def course_progress_tag(course_id: int) -> str:
+    return f"course_progress:course:{course_id}"
+
+
+def to_percentage(completed_chapters: int, published_chapters: int) -> Optional[float]:
+    if published_chapters <= 0:
+        return None
+    return round((completed_chapters / published_chapters) * 100, 1)
+
+
+class CRUDCourseProgress(CRUDBase[CourseProgress, BaseModel, BaseModel]):
+    """
+    Per (user, course) counters of completed and published chapters.
+
+    The counters are maintained on write by `on_progress_changed` and
+    `on_chapter_published`, so progress reads are primary-key lookups. Their deltas
+    come from conditional writes (`CRUDUserProgress.set_completed`,
+    `set_chapter_published`), so concurrent retries of a toggle count once.
+
+    Missing rows are created from the source rows on first read. A progress write
+    committing while such a read counts can be missed by the new counter, and
+    `rebuild` (`python -m app.cli progress-counters`) is the repair path for that
+    drift.
+
+    Counters read are kept in `cache`. Progress changes delete the entry of their
+    user and course, chapter changes invalidate the tag of their course.
+    """
+
+    def count_from_source(
+        self,
+        db: Session,
+        *,
+        owner_id: Optional[int] = None,
+        course_ids: Optional[list[int]] = None,
+    ) -> tuple[dict[int, int], Counts]:
+        """Published chapters per course and completed chapters per (user, course)."""
+        published_query = db.query(Chapter.course_id, func.count(Chapter.id)).filter(
+            Chapter.is_published
+        )
+        completed_query = (
+            db.query(
+                UserProgress.owner_id,
+                Chapter.course_id,
+                func.count(distinct(UserProgress.chapter_id)),
+            )
+            .join(Chapter, Chapter.id == UserProgress.chapter_id)
+            .filter(UserProgress.is_completed, Chapter.is_published)
+        )
+        if owner_id is not None:
+            completed_query = completed_query.filter(UserProgress.owner_id == owner_id)
+        if course_ids is not None:
+            published_query = published_query.filter(Chapter.course_id.in_(course_ids))
+            completed_query = completed_query.filter(Chapter.course_id.in_(course_ids))
+
+        published = dict(published_query.group_by(Chapter.course_id).all())
+        completed = {
+            (owner_id, course_id): count
+            for owner_id, course_id, count in completed_query.group_by(
+                UserProgress.owner_id, Chapter.course_id
+            )
+        }
+        return published, completed
+
+    def get_percentages(
+        self, db: Session, *, owner_id: int, course_ids: list[int]
+    ) -> dict[int, Optional[float]]:
+        if not course_ids:
+            return {}
+
+        keys = {course_id: progress_cache_key(owner_id, course_id) for course_id in course_ids}
+        cached = cache.get_many(list(keys.values()))
+        counters = {course_id: cached[key] for course_id, key in keys.items() if key in cached}
+        uncached = [course_id for course_id in course_ids if course_id not in counters]
+        if not uncached:
+            return {course_id: to_percentage(*counters[course_id]) for course_id in course_ids}
+
+        versions = cache.tag_versions(
+            [PROGRESS_CACHE_TAG, *(course_progress_tag(course_id) for course_id in uncached)]
+        )
+        counters.update(
+            (counter.course_id, (counter.completed_chapters, counter.published_chapters))
+            for counter in db.query(CourseProgress).filter(
+                CourseProgress.owner_id == owner_id,
+                CourseProgress.course_id.in_(uncached),
+            )
+        )
+
+        missing = [course_id for course_id in uncached if course_id not in counters]
+        if missing:
+            published, completed = self.count_from_source(
+                db, owner_id=owner_id, course_ids=missing
+            )
+            for course_id in missing:
+                counters[course_id] = (
+                    completed.get((owner_id, course_id), 0),
+                    published.get(course_id, 0),
+                )
+            # A concurrent request may create the same counters from the same source rows.
+            self.upsert(
+                db,
+                objs_in=[
+                    {
+                        "owner_id": owner_id,
+                        "course_id": course_id,
+                        "completed_chapters": counters[course_id][0],
+                        "published_chapters": counters[course_id][1],
+                    }
+                    for course_id in missing
+                ],
+                index_elements=["owner_id", "course_id"],
+                update_fields=[],
+            )
+
+        if versions is not None:
+            for course_id in uncached:
+                cache.set(
+                    keys[course_id],
+                    counters[course_id],
+                    config.PROGRESS_CACHE_TTL,
+                    versions={
+                        PROGRESS_CACHE_TAG: versions[PROGRESS_CACHE_TAG],
+                        course_progress_tag(course_id): versions[course_progress_tag(course_id)],
+                    },
+                )
+
+        return {course_id: to_percentage(*counters[course_id]) for course_id in course_ids}
+
+    def on_progress_changed(
+        self, db: Session, *, owner_id: int, chapter: Chapter, delta: int
+    ) -> None:
+        """Apply a +1/-1 change of completed chapters after a `UserProgress` write."""
+        if not chapter.is_published:
+            return
+        self.on_completed_changed(db, owner_id=owner_id, course_id=chapter.course_id, delta=delta)
+
+    def on_completed_changed(
+        self, db: Session, *, owner_id: int, course_id: int, delta: int
+    ) -> None:
+        """Apply a change of completed published chapters of a course."""
+        if not delta:
+            return
+        db.query(CourseProgress).filter(
+            CourseProgress.owner_id == owner_id,
+            CourseProgress.course_id == course_id,
+        ).update(
+            {CourseProgress.completed_chapters: CourseProgress.completed_chapters + delta},
+            synchronize_session=False,
+        )
+        invalidate_on_commit(db, keys=[progress_cache_key(owner_id, course_id)])
+
+    def set_chapter_published(self, db: Session, *, chapter: Chapter, is_published: bool) -> None:
+        """
+        Write `is_published` of `chapter` and apply the change it made to the counters.
+
+        The change is read from the conditional update itself, not from a prior read,
+        so concurrent requests toggling the same chapter apply it once.
+        """
+        toggled = (
+            db.query(Chapter)
+            .filter(
+                Chapter.id == chapter.id,
+                func.coalesce(Chapter.is_published, False) != is_published,
+            )
+            .update({Chapter.is_published: is_published})
+        )
+        if toggled:
+            self.on_chapter_published(db, chapter=chapter, delta=1 if is_published else -1)
+
+    def on_chapter_published(self, db: Session, *, chapter: Chapter, delta: int) -> None:
+        """Apply a +1/-1 change of published chapters, also to users who completed it."""
+        if not delta:
+            return
+        completed = exists().where(
+            UserProgress.owner_id == CourseProgress.owner_id,
+            UserProgress.chapter_id == chapter.id,
+            UserProgress.is_completed,
+        )
+        db.query(CourseProgress).filter(CourseProgress.course_id == chapter.course_id).update(
+            {
+                CourseProgress.published_chapters: CourseProgress.published_chapters + delta,
+                CourseProgress.completed_chapters: CourseProgress.completed_chapters
+                + case((completed, delta), else_=0),
+            },
+            synchronize_session=False,
+        )
+        invalidate_on_commit(db, course_progress_tag(chapter.course_id))
+
+    def rebuild(self, db: Session, *, verify_only: bool = False) -> Counts:
+        """
+        Recompute every counter from purchases and `UserProgress` rows.
+
+        Returns the drifted counters with their expected values. Unless `verify_only`
+        is set, they are fixed and the missing counters are created.
+        """
+        current = {
+            (counter.owner_id, counter.course_id): (
+                counter.completed_chapters,
+                counter.published_chapters,
+            )
+            for counter in db.query(CourseProgress)
+        }
+        published, completed = self.count_from_source(db)
+        pairs = set(current) | set(completed)
+        pairs.update(db.query(Purchase.owner_id, Purchase.course_id).distinct().all())
+
+        expected = {
+            (owner_id, course_id): (
+                completed.get((owner_id, course_id), 0),
+                published.get(course_id, 0),
+            )
+            for owner_id, course_id in pairs
+        }
+        drifted = {pair: counts for pair, counts in expected.items() if current.get(pair) != counts}
+
+        if not verify_only and drifted:
+            self.upsert(
+                db,
+                objs_in=[
+                    {
+                        "owner_id": owner_id,
+                        "course_id": course_id,
+                        "completed_chapters": completed,
+                        "published_chapters": published,
+                    }
+                    for (owner_id, course_id), (completed, published) in drifted.items()
+                ],
+                index_elements=["owner_id", "course_id"],
+            )
+            cache.invalidate(PROGRESS_CACHE_TAG)
+
+        return drifted
+
+
+crud_course_progress = CRUDCourseProgress(CourseProgress)
+
+
+class CRUDUserProgress(CRUDBase[UserProgress, BaseModel, BaseModel]):
+    def set_completed(
+        self, db: Session, *, owner_id: int, completed: dict[int, bool]
+    ) -> dict[int, int]:
+        """
+        Write `is_completed` per chapter id, returns the change of completed chapters.
+
+        Missing rows are inserted with `ON CONFLICT DO NOTHING`, the others updated
+        only where the value differs. Deltas come from what these writes report, so
+        concurrent or retried requests can't count a toggle twice, and concurrent
+        first completions don't conflict.
+        """
+        inserted = self.upsert(
+            db,
+            objs_in=[
+                {"owner_id": owner_id, "chapter_id": chapter_id, "is_completed": value}
+                for chapter_id, value in completed.items()
+            ],
+            index_elements=["owner_id", "chapter_id"],
+            update_fields=[],
+            refresh=True,
+            commit=False,
+        )
+        deltas = {progress.chapter_id: int(bool(progress.is_completed)) for progress in inserted}
+
+        for value in (True, False):
+            chapter_ids = [
+                chapter_id
+                for chapter_id, is_completed in completed.items()
+                if is_completed == value and chapter_id not in deltas
+            ]
+            if not chapter_ids:
+                continue
+            toggled = db.scalars(
+                update(UserProgress)
+                .where(
+                    UserProgress.owner_id == owner_id,
+                    UserProgress.chapter_id.in_(chapter_ids),
+                    func.coalesce(UserProgress.is_completed, False) != value,
+                )
+                .values(is_completed=value)
+                .returning(UserProgress.chapter_id)
+                .execution_options(synchronize_session=False)
+            ).all()
+            deltas.update((chapter_id, 1 if value else -1) for chapter_id in toggled)
+
+        return {chapter_id: deltas.get(chapter_id, 0) for chapter_id in completed}
+
+
+crud_user_progress = CRUDUserProgress(UserProgress)
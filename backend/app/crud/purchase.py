@@ -0,0 +1,4 @@
+from app.crud.base import CRUDBase
+from app.models import Purchase
+
+crud_purchase = CRUDBase(Purchase)
@@ -0,0 +1,166 @@
+from datetime import date, datetime
+from typing import Optional
+
+from app.crud.base import CRUDBase
+from app.models import Course, DailyRevenue, Purchase
+from pydantic import BaseModel
+from sqlalchemy import event, func, insert, select
+from sqlalchemy.orm import Session
+
+
+class CRUDDailyRevenue(CRUDBase[DailyRevenue, BaseModel, BaseModel]):
+    """
+    Per (course, day) rollup of purchases, so analytics never scan the purchases.
+
+    Sales are added by `record_sales` when a purchase is created, at the price stored
+    on the purchase: by the Stripe event worker for its bulk inserts and by the
+    `after_flush` listener below for purchases added through the ORM. It is the one
+    source of sales figures, `rebuild` recomputes it from the purchases.
+    """
+
+    def record_sales(
+        self,
+        db: Session,
+        *,
+        sales: list[tuple[int, Optional[float]]],
+        day: Optional[date] = None,
+        commit: bool = True,
+    ) -> None:
+        """Add `(course_id, price)` sales to the rollup of `day`, today by default."""
+        totals: dict[int, tuple[int, float]] = {}
+        for course_id, price in sales:
+            count, revenue = totals.get(course_id, (0, 0.0))
+            totals[course_id] = (count + 1, revenue + (price or 0))
+        if not totals:
+            return
+
+        day = day or datetime.now().date()
+        self.upsert(
+            db,
+            objs_in=[
+                {"course_id": course_id, "day": day, "sales": count, "revenue": revenue}
+                for course_id, (count, revenue) in totals.items()
+            ],
+            index_elements=["course_id", "day"],
+            increment_fields=["sales", "revenue"],
+            commit=commit,
+        )
+
+    def _owner_query(
+        self,
+        db: Session,
+        *columns,
+        owner_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ):
+        query = (
+            db.query(*columns)
+            .join(Course, Course.id == DailyRevenue.course_id)
+            .filter(Course.owner_id == owner_id)
+        )
+        if start is not None:
+            query = query.filter(DailyRevenue.day >= start)
+        if end is not None:
+            query = query.filter(DailyRevenue.day <= end)
+        return query
+
+    def totals_by_course(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> list[tuple[str, int, float]]:
+        """(course title, sales, revenue) of the owner's courses between `start` and `end`."""
+        return (
+            self._owner_query(
+                db,
+                Course.title,
+                func.sum(DailyRevenue.sales),
+                func.sum(DailyRevenue.revenue),
+                owner_id=owner_id,
+                start=start,
+                end=end,
+            )
+            .group_by(Course.id, Course.title)
+            .order_by(Course.id)
+            .all()
+        )
+
+    def totals_by_day(
+        self,
+        db: Session,
+        *,
+        owner_id: int,
+        start: Optional[date] = None,
+        end: Optional[date] = None,
+    ) -> list[tuple[date, int, float]]:
+        """(day, sales, revenue) of the owner's courses between `start` and `end`."""
+        return (
+            self._owner_query(
+                db,
+                DailyRevenue.day,
+                func.sum(DailyRevenue.sales),
+                func.sum(DailyRevenue.revenue),
+                owner_id=owner_id,
+                start=start,
+                end=end,
+            )
+            .group_by(DailyRevenue.day)
+            .order_by(DailyRevenue.day)
+            .all()
+        )
+
+    def rebuild(self, db: Session) -> int:
+        """Recompute the rollup from the purchases at their prices, returns its row count."""
+        day = func.date(Purchase.created_at)
+        db.query(DailyRevenue).delete(synchronize_session=False)
+        db.execute(
+            insert(DailyRevenue).from_select(
+                ["course_id", "day", "sales", "revenue"],
+                select(
+                    Purchase.course_id,
+                    day,
+                    func.count(Purchase.id),
+                    func.sum(func.coalesce(Purchase.price, 0)),
+                )
+                .filter(Purchase.created_at.isnot(None))
+                .group_by(Purchase.course_id, day),
+            )
+        )
+        db.commit()
+        return db.query(DailyRevenue).count()
+
+
+crud_daily_revenue = CRUDDailyRevenue(DailyRevenue)
+
+
+@event.listens_for(Session, "before_flush")
+def price_purchases(session: Session, flush_context, instances) -> None:
+    """Store the current course price on new purchases that don't have one."""
+    purchases = [obj for obj in session.new if isinstance(obj, Purchase) and obj.price is None]
+    if not purchases:
+        return
+    # Purchases added by course id have no course loaded, their prices are read at once.
+    course_ids = {purchase.course_id for purchase in purchases if purchase.course is None}
+    prices = dict(
+        session.connection()
+        .execute(select(Course.id, Course.price).where(Course.id.in_(course_ids)))
+        .all()
+    )
+    for purchase in purchases:
+        course = purchase.course
+        purchase.price = course.price if course is not None else prices.get(purchase.course_id)
+
+
+@event.listens_for(Session, "after_flush")
+def record_purchases(session: Session, flush_context) -> None:
+    sales_by_day: dict[date, list[tuple[int, Optional[float]]]] = {}
+    for purchase in session.new:
+        if isinstance(purchase, Purchase):
+            day = (purchase.created_at or datetime.now()).date()
+            sales_by_day.setdefault(day, []).append((purchase.course_id, purchase.price))
+    for day, sales in sales_by_day.items():
+        crud_daily_revenue.record_sales(session, sales=sales, day=day, commit=False)
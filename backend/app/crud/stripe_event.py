@@ -0,0 +1,134 @@
+import json
+import logging
+from datetime import datetime
+from typing import Optional
+
+from app.crud.base import CRUDBase
+from app.crud.purchase import crud_purchase
+from app.crud.revenue import crud_daily_revenue
+from app.models import Course, StripeEvent, User
+from pydantic import BaseModel
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+CHECKOUT_COMPLETED = "checkout.session.completed"
+HANDLED_EVENTS = {CHECKOUT_COMPLETED}
+
+
+class CRUDStripeEvent(CRUDBase[StripeEvent, BaseModel, BaseModel]):
+    """
+    Durable inbox of Stripe webhook events keyed by event id.
+
+    `enqueue` stores an event once however often Stripe delivers it, and
+    `process_pending` applies stored events in batches. Applying is idempotent:
+    purchases are inserted with `ON CONFLICT DO NOTHING` and only the inserted ones
+    are added to the revenue rollup.
+    """
+
+    def enqueue(self, db: Session, *, event_id: str, event_type: str, payload: str) -> None:
+        self.upsert(
+            db,
+            objs_in=[{"id": event_id, "type": event_type, "payload": payload}],
+            index_elements=["id"],
+            update_fields=[],
+        )
+
+    def _pending(self, db: Session, *, max_attempts: int, event_ids: Optional[list[str]] = None):
+        query = db.query(StripeEvent).filter(
+            StripeEvent.processed_at.is_(None), StripeEvent.attempts < max_attempts
+        )
+        if event_ids is not None:
+            query = query.filter(StripeEvent.id.in_(event_ids))
+        return query.order_by(StripeEvent.received_at)
+
+    def pending_ids(self, db: Session, *, batch_size: int, max_attempts: int) -> list[str]:
+        """Ids of the next batch `process_pending` would apply."""
+        return [
+            event.id
+            for event in self._pending(db, max_attempts=max_attempts)
+            .with_entities(StripeEvent.id)
+            .limit(batch_size)
+        ]
+
+    def process_pending(
+        self,
+        db: Session,
+        *,
+        batch_size: int,
+        max_attempts: int,
+        event_ids: Optional[list[str]] = None,
+    ) -> int:
+        """
+        Apply up to `batch_size` pending events in one transaction, returns how many.
+
+        With `event_ids`, only those of them that are still pending are applied.
+        """
+        events = (
+            self._pending(db, max_attempts=max_attempts, event_ids=event_ids)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        if not events:
+            return 0
+
+        errors: dict[str, str] = {}
+        pairs: dict[str, tuple[int, int]] = {}
+        for event in events:
+            try:
+                metadata = json.loads(event.payload)["data"]["object"]["metadata"]
+                pairs[event.id] = (int(metadata["user_id"]), int(metadata["course_id"]))
+            except (KeyError, TypeError, ValueError) as exc:
+                errors[event.id] = f"Missing metadata: {exc!r}"
+
+        user_ids = {user_id for user_id, _ in pairs.values()}
+        course_ids = {course_id for _, course_id in pairs.values()}
+        prices = dict(db.query(Course.id, Course.price).filter(Course.id.in_(course_ids)))
+        users = {user_id for (user_id,) in db.query(User.id).filter(User.id.in_(user_ids))}
+        for event_id, (user_id, course_id) in list(pairs.items()):
+            if course_id not in prices or user_id not in users:
+                errors[event_id] = f"Unknown user {user_id} or course {course_id}"
+                del pairs[event_id]
+
+        purchases = [
+            {"owner_id": user_id, "course_id": course_id, "price": prices[course_id]}
+            for user_id, course_id in set(pairs.values())
+        ]
+        if purchases:
+            inserted = crud_purchase.upsert(
+                db,
+                objs_in=purchases,
+                index_elements=["owner_id", "course_id"],
+                update_fields=[],
+                refresh=True,
+                commit=False,
+            )
+            crud_daily_revenue.record_sales(
+                db,
+                sales=[(purchase.course_id, purchase.price) for purchase in inserted],
+                commit=False,
+            )
+
+        now = datetime.now()
+        for event in events:
+            event.attempts += 1
+            event.processed_at = now
+            event.last_error = errors.get(event.id)
+            if event.last_error:
+                logger.warning("Stripe event %s not applied: %s", event.id, event.last_error)
+        db.commit()
+        return len(events)
+
+    def fail(self, db: Session, *, event_id: str, error: str) -> None:
+        """Count a failed attempt of one event, which is retried until `max_attempts`."""
+        db.query(StripeEvent).filter(
+            StripeEvent.id == event_id, StripeEvent.processed_at.is_(None)
+        ).update(
+            {StripeEvent.attempts: StripeEvent.attempts + 1, StripeEvent.last_error: error},
+            synchronize_session=False,
+        )
+        db.commit()
+
+
+crud_stripe_event = CRUDStripeEvent(StripeEvent)
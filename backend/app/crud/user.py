@@ -1,5 +1,7 @@
 from typing import Any, Dict, Optional
 
+from app.cache import cache
+from app.config import config
 from app.models import User
 from app.schemas.user import UserCreate, UserUpdate
 from app.security import get_password_hash, verify_password
@@ -7,16 +9,39 @@ from sqlalchemy.orm import Session
 
 from .base import CRUDBase
 
+# Active users by email, holds the column values only so hits need no session.
+USER_CACHE_FIELDS = ("id", "username", "email", "is_active")
+
+
+def user_cache_key(email: str) -> str:
+    return f"user:{email}"
+
 
 class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
     def get_by_email(self, db: Session, email: str) -> Optional[User]:
         return db.query(User).filter(User.email == email).first()
 
-    def create(self, db: Session, *, obj_in: UserCreate) -> User:
+    def get_active_by_email(self, db: Session, email: str) -> Optional[User]:
+        """
+        Cached `get_by_email` for authentication, returns a transient `User` with the
+        `USER_CACHE_FIELDS` columns only. Inactive users are never cached.
+        """
+        fields = cache.get(user_cache_key(email))
+        if fields is None:
+            user = self.get_by_email(db, email=email)
+            if not user or not user.is_active:
+                return user
+            fields = {field: getattr(user, field) for field in USER_CACHE_FIELDS}
+            cache.set(user_cache_key(email), fields, config.USER_CACHE_TTL)
+        return User(**fields)
+
+    def create(
+        self, db: Session, *, obj_in: UserCreate, hashed_password: Optional[str] = None
+    ) -> User:
         db_obj = User(
             username=obj_in.username,
             email=obj_in.email,
-            hashed_password=get_password_hash(obj_in.password),
+            hashed_password=hashed_password or get_password_hash(obj_in.password),
         )
         db.add(db_obj)
         db.commit()
@@ -35,11 +60,14 @@ class CRUDUser(CRUDBase[User, UserCreate, UserUpdate]):
         else:
             update_data = obj_in.model_dump(exclude_unset=True)
 
-        if update_data["password"]:
+        if update_data.get("password"):
             hashed_password = get_password_hash(update_data["password"])
             del update_data["password"]
             update_data["hashed_password"] = hashed_password
-        return super().update(db, db_obj=db_obj, obj_in=update_data)
+        email = db_obj.email
+        user = super().update(db, db_obj=db_obj, obj_in=update_data)
+        cache.delete(user_cache_key(email), user_cache_key(user.email))
+        return user
 
     def authenticate(self, db: Session, email: str, password: str) -> Optional[User]:
         user = self.get_by_email(db, email=email)
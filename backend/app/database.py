@@ -1,10 +1,87 @@
+import logging
+import time
+from typing import Any
+
 import sqlalchemy
+from sqlalchemy import event
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 
 from .config import config
 
-engine = sqlalchemy.create_engine(config.DATABASE_URL)
+logger = logging.getLogger(__name__)
+
+
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def get_async_database_url(database_url: str) -> URL:
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    return url.set(drivername=f"{backend}+{ASYNC_DRIVERS[backend]}")
+
+
+def get_engine_options(database_url: str, is_async: bool = False) -> dict[str, Any]:
+    url = make_url(database_url)
+    if url.get_backend_name() == "sqlite":
+        # Sessions move between threadpool threads, and SQLite has no server-side pool.
+        return {} if is_async else {"connect_args": {"check_same_thread": False}}
+
+    options: dict[str, Any] = {
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT,
+        "pool_recycle": config.DB_POOL_RECYCLE,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+    }
+    if config.DB_STATEMENT_TIMEOUT and url.get_backend_name() == "postgresql":
+        if is_async:
+            options["connect_args"] = {
+                "server_settings": {"statement_timeout": str(config.DB_STATEMENT_TIMEOUT)}
+            }
+        else:
+            options["connect_args"] = {
+                "options": f"-c statement_timeout={config.DB_STATEMENT_TIMEOUT}"
+            }
+    return options
+
+
+engine = sqlalchemy.create_engine(config.DATABASE_URL, **get_engine_options(config.DATABASE_URL))
 
 Base = declarative_base()
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionLocal = sessionmaker(autocommit=False, bind=engine)
+
+async_engine = create_async_engine(
+    get_async_database_url(config.DATABASE_URL),
+    **get_engine_options(config.DATABASE_URL, is_async=True),
+)
+# Objects stay loaded after commit, attribute refreshes would need to await.
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+@event.listens_for(SessionLocal, "do_orm_execute")
+def start_checkout_timer(orm_execute_state):
+    session = orm_execute_state.session
+    if not session.in_transaction():
+        session.info["checkout_started"] = time.perf_counter()
+
+
+@event.listens_for(SessionLocal, "after_begin")
+def stop_checkout_timer(session, transaction, connection):
+    started = session.info.pop("checkout_started", None)
+    if started is not None:
+        session.info["checkout_seconds"] = (
+            session.info.get("checkout_seconds", 0.0) + time.perf_counter() - started
+        )
+
+
+def log_checkout_time(session: Session) -> None:
+    checkout_seconds = session.info.get("checkout_seconds")
+    if checkout_seconds is not None:
+        logger.info(
+            "DB pool checkout took %.2f ms (%s)",
+            checkout_seconds * 1000,
+            engine.pool.status(),
+        )
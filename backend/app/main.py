@@ -2,21 +2,39 @@ from app.api.api import api_router
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from . import models
-from .database import SessionLocal, engine
+from .config import config
+from .database import async_engine
+from .security import password_hasher
+from .stripe_client import stripe_gateway
+from .worker import stripe_event_worker
 
-models.Base.metadata.create_all(bind=engine)
+app = FastAPI()
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("startup")
+async def start_stripe_event_worker():
+    if config.STRIPE_EVENTS_WORKER:
+        stripe_event_worker.start()
 
 
-app = FastAPI()
+@app.on_event("shutdown")
+async def stop_stripe_event_worker():
+    await stripe_event_worker.stop()
+
+
+@app.on_event("shutdown")
+def shutdown_password_hasher():
+    password_hasher.shutdown()
+
+
+@app.on_event("shutdown")
+async def close_stripe_gateway():
+    await stripe_gateway.close()
+
+
+@app.on_event("shutdown")
+async def dispose_async_engine():
+    await async_engine.dispose()
 
 
 app.add_middleware(
@@ -25,6 +43,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
 
 
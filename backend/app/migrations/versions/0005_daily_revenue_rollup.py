@@ -0,0 +1,53 @@
+"""daily revenue rollup
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 15:10:12.402518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, Sequence[str], None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_revenue',
+    sa.Column('course_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('sales', sa.Integer(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.ForeignKeyConstraint(['course_id'], ['courses.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('course_id', 'day')
+    )
+
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('price', sa.Float(), nullable=True))
+
+    # Earlier purchases didn't record their price, the current course price is all there is.
+    op.execute(
+        "UPDATE purchases SET price = "
+        "(SELECT courses.price FROM courses WHERE courses.id = purchases.course_id)"
+    )
+    op.execute(
+        "INSERT INTO daily_revenue (course_id, day, sales, revenue) "
+        "SELECT course_id, DATE(created_at), COUNT(id), SUM(COALESCE(price, 0)) "
+        "FROM purchases WHERE created_at IS NOT NULL "
+        "GROUP BY course_id, DATE(created_at)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.batch_alter_table('purchases', schema=None) as batch_op:
+        batch_op.drop_column('price')
+
+    op.drop_table('daily_revenue')
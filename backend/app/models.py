@@ -1,6 +1,19 @@
 from datetime import datetime
 
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer,
+    String,
+    Text,
+    UniqueConstraint,
+)
 from sqlalchemy.orm import relationship
 
 from .database import Base
@@ -25,6 +38,10 @@ class User(Base):
 
 class Course(Base):
     __tablename__ = 'courses'
+    __table_args__ = (
+        Index("ix_courses_owner_id", "owner_id"),
+        Index("ix_courses_is_published_created_at", "is_published", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -60,6 +77,9 @@ class Category(Base):
 
 class Chapter(Base):
     __tablename__ = "chapters"
+    __table_args__ = (
+        Index("ix_chapters_course_id_is_published_position", "course_id", "is_published", "position"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
@@ -80,6 +100,10 @@ class Chapter(Base):
 
 class UserProgress(Base):
     __tablename__ = "user_progress"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "chapter_id", name="uq_user_progress_owner_id_chapter_id"),
+        Index("ix_user_progress_chapter_id", "chapter_id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     is_completed = Column(Boolean, default=False)
@@ -94,8 +118,25 @@ class UserProgress(Base):
     updated_at = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
 
 
+class CourseProgress(Base):
+    __tablename__ = "course_progress"
+    __table_args__ = (Index("ix_course_progress_course_id", "course_id"),)
+
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    completed_chapters = Column(Integer, nullable=False, default=0)
+    published_chapters = Column(Integer, nullable=False, default=0)
+
+    created_at = Column(DateTime(), default=datetime.now)
+    updated_at = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
+
+
 class Purchase(Base):
     __tablename__ = "purchases"
+    __table_args__ = (
+        UniqueConstraint("owner_id", "course_id", name="uq_purchases_owner_id_course_id"),
+        Index("ix_purchases_course_id", "course_id"),
+    )
 
     id = Column(Integer, primary_key=True)
     created_at = Column(DateTime(), default=datetime.now)
@@ -107,9 +148,24 @@ class Purchase(Base):
     course_id = Column(Integer, ForeignKey("courses.id"))
     course = relationship("Course", back_populates="purchases")
 
+    # Course price at the time of purchase, what its sale adds to the revenue.
+    price = Column(Float, nullable=True)
+
+
+class DailyRevenue(Base):
+    """Sales and revenue per course and day, kept up to date by the Stripe webhook."""
+
+    __tablename__ = "daily_revenue"
+
+    course_id = Column(Integer, ForeignKey("courses.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    sales = Column(Integer, nullable=False, default=0)
+    revenue = Column(Float, nullable=False, default=0)
+
 
 class Customer(Base):
     __tablename__ = "customers"
+    __table_args__ = (Index("ix_customers_user_id", "user_id"),)
 
     id = Column(Integer, primary_key=True)
     user_id = Column(Integer, nullable=False)
@@ -117,3 +173,52 @@ class Customer(Base):
     course_id = Column(Integer, nullable=False)
     created_at = Column(DateTime(), default=datetime.now)
     updated_at = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
+
+
+class StripeEvent(Base):
+    """Inbox of verified Stripe webhook events, applied by `StripeEventWorker`."""
+
+    __tablename__ = "stripe_events"
+    __table_args__ = (
+        Index("ix_stripe_events_processed_at_received_at", "processed_at", "received_at"),
+    )
+
+    id = Column(String(255), primary_key=True)
+    type = Column(String(100), nullable=False)
+    payload = Column(Text, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text)
+    received_at = Column(DateTime(), default=datetime.now)
+    processed_at = Column(DateTime())
+
+
+class MediaUpload(Base):
+    """A resumable upload; parts are staged on disk until the file is handed to storage."""
+
+    __tablename__ = "media_uploads"
+    __table_args__ = (Index("ix_media_uploads_owner_id", "owner_id"),)
+
+    id = Column(String(32), primary_key=True)
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    filename = Column(String(255), nullable=False)
+    resource_type = Column(String(20), nullable=False)
+    status = Column(String(20), nullable=False, default="uploading")
+    size = Column(BigInteger)
+    url = Column(String)
+    error = Column(Text)
+    created_at = Column(DateTime(), default=datetime.now)
+    updated_at = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
+
+
+class MediaObject(Base):
+    """Stored media indexed by content, with the number of courses and chapters using it."""
+
+    __tablename__ = "media_objects"
+
+    content_hash = Column(String(64), primary_key=True)
+    resource_type = Column(String(20), primary_key=True)
+    url = Column(String(255), nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    ref_count = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime(), default=datetime.now)
+    updated_at = Column(DateTime(), default=datetime.now, onupdate=datetime.now)
@@ -1,7 +1,7 @@
 from datetime import datetime
 from typing import Optional
 
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 
 from .purchase import PurchaseOut
 
@@ -25,7 +25,7 @@ class ChapterUpdate(ChapterBase):
 
 class ReorderList(BaseModel):
     id: int
-    position: int
+    position: int = Field(ge=0)
 
 
 class ChapterOut(ChapterBase):
@@ -49,11 +49,28 @@ class ChapterProgressComplete(BaseModel):
     is_completed: bool
 
 
+class ChapterProgressItem(ChapterProgressComplete):
+    chapter_id: int
+
+
+class CourseProgressOut(BaseModel):
+    course_id: int
+    progress: Optional[float] = None
+
+
+class ChapterMeta(BaseModel):
+    id: int
+    title: str
+    position: Optional[int] = None
+    is_free: Optional[bool] = None
+
+
 class ChapterDashboard(BaseModel):
     chapter: ChapterOut
     course_price: float
     purchase: Optional[PurchaseOut] = None
     user_progress: Optional[UserProgress] = None
     next_chapter: Optional[ChapterOut] = None
+    upcoming_chapters: list[ChapterMeta] = []
 
     model_config = ConfigDict(format_attributes=True)
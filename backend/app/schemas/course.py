@@ -35,6 +35,14 @@ class CourseOut(CourseBase):
     model_config: ConfigDict(format_attributes=True)
 
 
+class CourseSummaryOut(CourseBase):
+    id: int
+    owner_id: int
+
+    created_at: datetime
+    updated_at: datetime
+
+
 class CourseWithProgress(CourseOut):
     progress: float
     pass
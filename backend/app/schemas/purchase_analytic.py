@@ -1,3 +1,5 @@
+from datetime import date
+
 from app.schemas.course import CourseOut
 from pydantic import BaseModel, ConfigDict
 
@@ -19,9 +21,17 @@ class PurchaseWithCourse(PurchaseOut):
 class PurChaseAnalytic(BaseModel):
     name: str
     total: float
+    sales: int = 0
+
+
+class DailyRevenueOut(BaseModel):
+    day: date
+    sales: int
+    revenue: float
 
 
 class PurChaseAnalyticOut(BaseModel):
     data: list[PurChaseAnalytic] = []
     total_revenue: float
     total_sales: int
+    days: list[DailyRevenueOut] = []
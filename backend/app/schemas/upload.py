@@ -0,0 +1,26 @@
+from datetime import datetime
+from typing import Literal, Optional
+
+from pydantic import BaseModel, Field
+
+
+class UploadCreate(BaseModel):
+    filename: str = Field(min_length=1, max_length=255)
+    resource_type: Literal["image", "video"] = "image"
+
+
+class UploadComplete(BaseModel):
+    parts: list[int] = Field(min_length=1)
+
+
+class UploadOut(BaseModel):
+    id: str
+    filename: str
+    resource_type: str
+    status: str
+    size: Optional[int] = None
+    url: Optional[str] = None
+    error: Optional[str] = None
+    parts: dict[int, int] = {}
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,243 @@
+import logging
+import re
+import threading
+import time
+import unicodedata
+from bisect import bisect_left, insort
+from typing import Optional
+
+from app.config import config
+from app.database import SessionLocal, engine
+from app.models import Course
+from sqlalchemy import func, literal, literal_column
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+TOKEN_PATTERN = re.compile(r"\w+")
+TITLE_WEIGHT = 2
+DESCRIPTION_WEIGHT = 1
+EXACT_MATCH = 1.0
+PREFIX_MATCH = 0.8
+TYPO_MATCH = 0.5
+MIN_TYPO_LENGTH = 4
+MAX_PREFIX_EXPANSIONS = 50
+
+
+def tokenize(text: Optional[str]) -> list[str]:
+    if not text:
+        return []
+    text = unicodedata.normalize("NFKD", text.lower())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return TOKEN_PATTERN.findall(text)
+
+
+def single_deletes(token: str) -> set[str]:
+    return {token[:i] + token[i + 1 :] for i in range(len(token))}
+
+
+class SearchIndex:
+    """Full-text course search over title and description, returns ranked course ids."""
+
+    def search(self, db: Session, text: str, limit: int = 1000) -> list[int]:
+        raise NotImplementedError
+
+    def update(self, course: Course) -> None:
+        pass
+
+    def remove(self, course_id: int) -> None:
+        pass
+
+
+class PostgresSearchIndex(SearchIndex):
+    """
+    Trigram word similarity over `title || ' ' || description`, served by the
+    `ix_courses_search_trgm` GIN index. The database keeps it up to date.
+    """
+
+    def search(self, db: Session, text: str, limit: int = 1000) -> list[int]:
+        # Must stay identical to the expression of the ix_courses_search_trgm index.
+        document = Course.title.op("||")(literal_column("' '")).op("||")(
+            func.coalesce(Course.description, literal_column("''"))
+        )
+        rows = (
+            db.query(Course.id)
+            .filter(literal(text).op("<%")(document))
+            .order_by(func.word_similarity(text, document).desc(), Course.id.desc())
+            .limit(limit)
+            .all()
+        )
+        return [row.id for row in rows]
+
+
+class InMemorySearchIndex(SearchIndex):
+    """
+    In-process inverted index for databases without trigram support.
+
+    Query terms match indexed tokens exactly, by prefix, or with one typo through a
+    single-deletion neighbourhood. Every term has to match; courses rank by the sum of
+    their best match per term, title matches weighing more than description ones.
+
+    The first searches wait for one initial build. Afterwards the index is rebuilt
+    from the database in a background thread every `refresh_seconds`, to pick up
+    writes made by other workers, and searches use the previous index meanwhile.
+    Changes made through `update` and `remove` during a rebuild are replayed on it.
+    """
+
+    def __init__(self, refresh_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.RLock()
+        self._build_lock = threading.Lock()
+        self._built_at: Optional[float] = None
+        self._rebuilding = False
+        self._pending: Optional[list[tuple[int, Optional[tuple[str, Optional[str]]]]]] = None
+        self._postings: dict[str, dict[int, int]] = {}
+        self._documents: dict[int, set[str]] = {}
+        self._neighbours: dict[str, set[str]] = {}
+        self._tokens: list[str] = []
+
+    def rebuild(self, db: Session) -> None:
+        with self._lock:
+            self._pending = []
+        rows = db.query(Course.id, Course.title, Course.description).all()
+        # Built aside and swapped in, searches keep using the old index meanwhile.
+        fresh = InMemorySearchIndex(self.refresh_seconds)
+        for row in rows:
+            fresh._add(row.id, row.title, row.description)
+        with self._lock:
+            for course_id, text in self._pending:
+                fresh._remove(course_id)
+                if text is not None:
+                    fresh._add(course_id, *text)
+            self._pending = None
+            self._postings = fresh._postings
+            self._documents = fresh._documents
+            self._neighbours = fresh._neighbours
+            self._tokens = fresh._tokens
+            self._built_at = time.monotonic()
+            self._rebuilding = False
+        logger.info(f"Built course search index with {len(rows)} courses")
+
+    def _ensure_built(self, db: Session) -> None:
+        if self._built_at is None:
+            with self._build_lock:
+                if self._built_at is None:
+                    self.rebuild(db)
+            return
+
+        with self._lock:
+            if self._rebuilding or time.monotonic() - self._built_at <= self.refresh_seconds:
+                return
+            self._rebuilding = True
+        threading.Thread(target=self._refresh, name="search-index-refresh", daemon=True).start()
+
+    def _refresh(self) -> None:
+        try:
+            with SessionLocal() as db:
+                self.rebuild(db)
+        except Exception:
+            logger.exception("Rebuilding the course search index failed")
+            with self._lock:
+                self._pending = None
+                self._rebuilding = False
+
+    def update(self, course: Course) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((course.id, (course.title, course.description)))
+            if self._built_at is None:
+                return
+            self._remove(course.id)
+            self._add(course.id, course.title, course.description)
+
+    def remove(self, course_id: int) -> None:
+        with self._lock:
+            if self._pending is not None:
+                self._pending.append((course_id, None))
+            self._remove(course_id)
+
+    def search(self, db: Session, text: str, limit: int = 1000) -> list[int]:
+        self._ensure_built(db)
+
+        terms = tokenize(text)
+        scores: Optional[dict[int, float]] = None
+        with self._lock:
+            for term in terms:
+                term_scores: dict[int, float] = {}
+                for token, factor in self._match(term).items():
+                    for course_id, weight in self._postings[token].items():
+                        score = factor * weight
+                        if score > term_scores.get(course_id, 0):
+                            term_scores[course_id] = score
+
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {
+                        course_id: score + term_scores[course_id]
+                        for course_id, score in scores.items()
+                        if course_id in term_scores
+                    }
+                if not scores:
+                    return []
+
+        if scores is None:
+            return []
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], -item[0]))
+        return [course_id for course_id, _ in ranked[:limit]]
+
+    def _match(self, term: str) -> dict[str, float]:
+        matches: dict[str, float] = {}
+        if term in self._postings:
+            matches[term] = EXACT_MATCH
+
+        index = bisect_left(self._tokens, term)
+        for token in self._tokens[index : index + MAX_PREFIX_EXPANSIONS]:
+            if not token.startswith(term):
+                break
+            matches.setdefault(token, PREFIX_MATCH)
+
+        if len(term) >= MIN_TYPO_LENGTH:
+            for variant in single_deletes(term) | {term}:
+                for token in self._neighbours.get(variant, ()):
+                    matches.setdefault(token, TYPO_MATCH)
+        return matches
+
+    def _add(self, course_id: int, title: Optional[str], description: Optional[str]) -> None:
+        weights = dict.fromkeys(tokenize(description), DESCRIPTION_WEIGHT)
+        weights.update(dict.fromkeys(tokenize(title), TITLE_WEIGHT))
+
+        for token, weight in weights.items():
+            postings = self._postings.setdefault(token, {})
+            if not postings:
+                insort(self._tokens, token)
+                for variant in single_deletes(token) | {token}:
+                    self._neighbours.setdefault(variant, set()).add(token)
+            postings[course_id] = weight
+        self._documents[course_id] = set(weights)
+
+    def _remove(self, course_id: int) -> None:
+        for token in self._documents.pop(course_id, ()):
+            postings = self._postings[token]
+            postings.pop(course_id, None)
+            if postings:
+                continue
+            del self._postings[token]
+            del self._tokens[bisect_left(self._tokens, token)]
+            for variant in single_deletes(token) | {token}:
+                neighbours = self._neighbours[variant]
+                neighbours.discard(token)
+                if not neighbours:
+                    del self._neighbours[variant]
+
+
+def get_search_index() -> SearchIndex:
+    backend = config.SEARCH_BACKEND or (
+        "postgres" if engine.dialect.name == "postgresql" else "memory"
+    )
+    if backend == "postgres":
+        return PostgresSearchIndex()
+    return InMemorySearchIndex(refresh_seconds=config.SEARCH_INDEX_REFRESH)
+
+
+search_index = get_search_index()
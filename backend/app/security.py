@@ -1,6 +1,10 @@
+import asyncio
 import logging
+import threading
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Literal
+from typing import Any, Callable, Literal, Optional
 
 from app.config import config
 from fastapi import HTTPException, status
@@ -46,6 +50,106 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasher:
+    """
+    Runs bcrypt in a dedicated thread or process pool instead of the request threadpool.
+
+    At most `workers + queue_size` calls are accepted at once; beyond that callers get
+    a 503 so a login storm backs off instead of piling up.
+    """
+
+    def __init__(self, workers: int, queue_size: int, use_processes: bool = False):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.use_processes = use_processes
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.failed = 0
+        self.in_flight = 0
+        self.total_seconds = 0.0
+        self._slots = threading.BoundedSemaphore(workers + queue_size)
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+
+    @property
+    def executor(self) -> Executor:
+        with self._lock:
+            if self._executor is None:
+                executor_class = ProcessPoolExecutor if self.use_processes else ThreadPoolExecutor
+                self._executor = executor_class(max_workers=self.workers)
+            return self._executor
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            logger.warning("Password hashing queue is full")
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Server is busy, please try again",
+                headers={"Retry-After": "1"},
+            )
+
+        started = time.perf_counter()
+        with self._lock:
+            self.submitted += 1
+            self.in_flight += 1
+
+        def release(failed: bool) -> None:
+            with self._lock:
+                self.in_flight -= 1
+                self.total_seconds += time.perf_counter() - started
+                if failed:
+                    self.failed += 1
+                else:
+                    self.completed += 1
+            self._slots.release()
+
+        try:
+            future = self.executor.submit(func, *args)
+        except BaseException:
+            release(failed=True)
+            raise
+        future.add_done_callback(
+            lambda future: release(failed=future.cancelled() or future.exception() is not None)
+        )
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self.run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self.run(verify_password, plain_password, hashed_password)
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            done = self.completed + self.failed
+            return {
+                "workers": self.workers,
+                "queue_size": self.queue_size,
+                "in_flight": self.in_flight,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "avg_seconds": self.total_seconds / done if done else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+
+password_hasher = PasswordHasher(
+    workers=config.PASSWORD_HASH_WORKERS,
+    queue_size=config.PASSWORD_HASH_QUEUE_SIZE,
+    use_processes=config.PASSWORD_HASH_PROCESSES,
+)
+
+
 def get_subject_token_type(token: str, type: Literal["access", "confirm"]) -> str:
     try:
         payload = jwt.decode(token, config.SECRET_KEY, algorithms=[ALGORITHM])
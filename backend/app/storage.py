@@ -0,0 +1,113 @@
+import logging
+import os
+import re
+import shutil
+import uuid
+from pathlib import Path
+from typing import BinaryIO, Optional, Union
+
+from app.config import config
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+LARGE_UPLOAD_CHUNK_SIZE = 20 * 1024 * 1024
+
+
+class StorageBackend:
+    """Where uploaded media lives, see `CloudinaryStorage` and `LocalStorage`."""
+
+    def save(self, source: Union[Path, BinaryIO], filename: str, resource_type: str) -> str:
+        """
+        Store `source` and return its public URL.
+
+        `source` is either an open file or the path of a staged file the backend
+        may consume.
+        """
+        raise NotImplementedError
+
+    def delete(self, url: str) -> None:
+        raise NotImplementedError
+
+
+class CloudinaryStorage(StorageBackend):
+    def __init__(self, cloud_name: str, api_key: Optional[int], api_secret: Optional[str]):
+        import cloudinary
+        import cloudinary.uploader
+
+        cloudinary.config(cloud_name=cloud_name, api_key=api_key, api_secret=api_secret)
+        self.uploader = cloudinary.uploader
+
+    def save(self, source: Union[Path, BinaryIO], filename: str, resource_type: str) -> str:
+        if isinstance(source, Path):
+            result = self.uploader.upload_large(
+                str(source), resource_type=resource_type, chunk_size=LARGE_UPLOAD_CHUNK_SIZE
+            )
+        else:
+            result = self.uploader.upload(
+                source, resource_type=resource_type, chunk_size=UPLOAD_CHUNK_SIZE
+            )
+        return result["secure_url"]
+
+    def delete(self, url: str) -> None:
+        # https://res.cloudinary.com/<cloud>/<resource type>/upload/v<version>/<public id>.<ext>
+        match = re.search(r"/(image|video|raw)/upload/(?:v\d+/)?(.+?)(?:\.\w+)?$", url)
+        if not match:
+            logger.warning("Not a Cloudinary URL: %s", url)
+            return
+        resource_type, public_id = match.groups()
+        self.uploader.destroy(public_id, resource_type=resource_type, invalidate=True)
+
+
+class LocalStorage(StorageBackend):
+    """Files under `root`, served by the `/media` endpoint at `<url>/<key>`."""
+
+    def __init__(self, root: str, url: str):
+        self.root = Path(root).resolve()
+        self.url = url.rstrip("/")
+
+    def path(self, key: str) -> Optional[Path]:
+        """File of `key`, or None if it is missing or outside `root`."""
+        path = (self.root / key).resolve()
+        if not path.is_relative_to(self.root) or not path.is_file():
+            return None
+        return path
+
+    def save(self, source: Union[Path, BinaryIO], filename: str, resource_type: str) -> str:
+        suffix = re.sub(r"[^a-z0-9.]", "", Path(filename).suffix.lower())[:16]
+        key = f"{resource_type}/{uuid.uuid4().hex}{suffix}"
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        if isinstance(source, Path):
+            # A rename when staging and media share a filesystem, so nothing is copied.
+            shutil.move(source, path)
+        else:
+            partial = path.with_name(f"{path.name}.partial")
+            with open(partial, "wb") as f:
+                shutil.copyfileobj(source, f, UPLOAD_CHUNK_SIZE)
+            os.replace(partial, path)
+        return f"{self.url}/{key}"
+
+    def delete(self, url: str) -> None:
+        if not url.startswith(f"{self.url}/"):
+            logger.warning("Not a local media URL: %s", url)
+            return
+        path = self.path(url[len(self.url) + 1 :])
+        if path:
+            path.unlink(missing_ok=True)
+
+
+local_storage = LocalStorage(config.MEDIA_ROOT, config.MEDIA_URL)
+
+
+def get_storage_backend() -> StorageBackend:
+    backend = config.STORAGE_BACKEND or ("cloudinary" if config.CLOUD_NAME else "local")
+    if backend == "cloudinary":
+        return CloudinaryStorage(
+            config.CLOUD_NAME, config.CLOUD_API_KEY, config.CLOUD_API_SECRET
+        )
+    return local_storage
+
+
+storage = get_storage_backend()
@@ -0,0 +1,66 @@
+import asyncio
+from typing import Any, Optional
+
+import stripe
+from app.config import config
+
+
+class StripeGateway:
+    """
+    Async Stripe API calls over one pooled HTTP client, with timeouts.
+
+    At most `max_concurrency` calls are in flight per worker, the others wait for a
+    slot. The client is created on first use and closed by `close` on shutdown.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        timeout: float,
+        max_concurrency: int,
+        max_retries: int,
+        api_base: Optional[str] = None,
+    ):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.api_base = api_base
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._http_client: Optional[stripe.HTTPXClient] = None
+        self._client: Optional[stripe.StripeClient] = None
+
+    @property
+    def client(self) -> stripe.StripeClient:
+        if self._client is None:
+            self._http_client = stripe.HTTPXClient(timeout=self.timeout)
+            self._client = stripe.StripeClient(
+                self.api_key or "",
+                http_client=self._http_client,
+                max_network_retries=self.max_retries,
+                base_addresses={"api": self.api_base} if self.api_base else None,
+            )
+        return self._client
+
+    async def create_customer(self, email: str) -> str:
+        async with self._slots:
+            customer = await self.client.v1.customers.create_async(params={"email": email})
+        return customer.id
+
+    async def create_checkout_session(self, **params: Any) -> stripe.checkout.Session:
+        async with self._slots:
+            return await self.client.v1.checkout.sessions.create_async(params=params)
+
+    async def close(self) -> None:
+        if self._http_client is not None:
+            await self._http_client.close_async()
+        self._http_client = None
+        self._client = None
+
+
+stripe_gateway = StripeGateway(
+    api_key=config.STRIPE_API_KEY,
+    timeout=config.STRIPE_TIMEOUT,
+    max_concurrency=config.STRIPE_MAX_CONCURRENCY,
+    max_retries=config.STRIPE_MAX_RETRIES,
+    api_base=config.STRIPE_API_BASE,
+)
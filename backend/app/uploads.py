@@ -0,0 +1,216 @@
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+import aiofiles
+from app.config import config
+from app.crud.media import crud_media_object
+from app.database import SessionLocal
+from app.models import MediaUpload
+from fastapi import HTTPException, status
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+UPLOADING = "uploading"
+PROCESSING = "processing"
+COMPLETED = "completed"
+FAILED = "failed"
+EXPIRED = "expired"
+
+# Request chunks are buffered up to this size before each disk write.
+WRITE_BUFFER_SIZE = 1024 * 1024
+
+
+class UploadStaging:
+    """
+    Parts of resumable uploads, staged on disk as `<root>/<upload id>/<part>.part`.
+
+    A part is streamed to a private temporary file and renamed into place once
+    complete, so a retried or interrupted part never leaves a truncated file behind
+    and memory per part in flight stays at `WRITE_BUFFER_SIZE`.
+    """
+
+    def __init__(self, root: Optional[str], max_part_size: int):
+        self.root = Path(root or os.path.join(tempfile.gettempdir(), "lms-uploads"))
+        self.max_part_size = max_part_size
+
+    def upload_dir(self, upload_id: str) -> Path:
+        return self.root / upload_id
+
+    def part_path(self, upload_id: str, part_number: int) -> Path:
+        return self.upload_dir(upload_id) / f"{part_number:05d}.part"
+
+    async def write_part(
+        self, upload_id: str, part_number: int, chunks: AsyncIterator[bytes]
+    ) -> int:
+        path = self.part_path(upload_id, part_number)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        partial = path.with_name(f"{path.stem}.{uuid.uuid4().hex}.partial")
+
+        size = 0
+        buffer = bytearray()
+        try:
+            async with aiofiles.open(partial, "wb") as f:
+                async for chunk in chunks:
+                    size += len(chunk)
+                    if size > self.max_part_size:
+                        raise HTTPException(
+                            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+                            detail=f"Parts are limited to {self.max_part_size} bytes",
+                        )
+                    buffer += chunk
+                    if len(buffer) >= WRITE_BUFFER_SIZE:
+                        await f.write(buffer)
+                        buffer.clear()
+                if buffer:
+                    await f.write(buffer)
+            os.replace(partial, path)
+        finally:
+            if partial.exists():
+                partial.unlink()
+        return size
+
+    def parts(self, upload_id: str) -> dict[int, int]:
+        """Sizes of the parts received so far, by part number."""
+        upload_dir = self.upload_dir(upload_id)
+        if not upload_dir.is_dir():
+            return {}
+        return {int(path.stem): path.stat().st_size for path in upload_dir.glob("*.part")}
+
+    def assemble(self, upload_id: str, part_numbers: list[int]) -> tuple[Path, str]:
+        """
+        Concatenate the parts into one file, returns it with its SHA-256.
+
+        Each call writes a file of its own, a stalled job may still be assembling.
+        """
+        path = self.upload_dir(upload_id) / f"{uuid.uuid4().hex}.upload"
+        content_hash = hashlib.sha256()
+        try:
+            with open(path, "wb") as out:
+                for part_number in part_numbers:
+                    with open(self.part_path(upload_id, part_number), "rb") as part:
+                        while chunk := part.read(WRITE_BUFFER_SIZE):
+                            content_hash.update(chunk)
+                            out.write(chunk)
+        except BaseException:
+            path.unlink(missing_ok=True)
+            raise
+        return path, content_hash.hexdigest()
+
+    def upload_ids(self) -> list[str]:
+        """Uploads with a staging directory."""
+        if not self.root.is_dir():
+            return []
+        return [path.name for path in self.root.iterdir() if path.is_dir()]
+
+    def last_modified(self, upload_id: str) -> Optional[datetime]:
+        """When the staging directory or a file in it last changed, None without one."""
+        upload_dir = self.upload_dir(upload_id)
+        try:
+            mtimes = [upload_dir.stat().st_mtime]
+            mtimes += [path.stat().st_mtime for path in upload_dir.iterdir()]
+        except FileNotFoundError:
+            return None
+        return datetime.fromtimestamp(max(mtimes))
+
+    def discard(self, upload_id: str) -> None:
+        shutil.rmtree(self.upload_dir(upload_id), ignore_errors=True)
+
+
+upload_staging = UploadStaging(config.UPLOAD_TMP_DIR, config.UPLOAD_MAX_PART_SIZE)
+
+
+def is_stalled():
+    """Condition for uploads `PROCESSING` longer than `UPLOAD_PROCESSING_TIMEOUT`."""
+    timeout = timedelta(seconds=config.UPLOAD_PROCESSING_TIMEOUT)
+    return and_(
+        MediaUpload.status == PROCESSING, MediaUpload.updated_at < datetime.now() - timeout
+    )
+
+
+def process_upload(upload_id: str, part_numbers: list[int]) -> None:
+    """
+    Background job for a completed upload: assemble the parts and hand them to storage,
+    unless the same content is stored already.
+
+    The outcome is recorded on the `MediaUpload` row. Parts are kept when storing
+    fails, so the client can retry `complete` without uploading them again. That
+    includes a job that never finished: after `UPLOAD_PROCESSING_TIMEOUT` in
+    `PROCESSING`, `complete` claims the upload again.
+    """
+    with SessionLocal() as db:
+        upload = db.get(MediaUpload, upload_id)
+        path = None
+        try:
+            path, content_hash = upload_staging.assemble(upload_id, part_numbers)
+            upload.url = crud_media_object.store(
+                db,
+                path,
+                content_hash=content_hash,
+                size=upload.size,
+                filename=upload.filename,
+                resource_type=upload.resource_type,
+            )
+        except Exception as exc:
+            logger.exception("Storing upload %s failed", upload_id)
+            if path:
+                path.unlink(missing_ok=True)
+            upload.status = FAILED
+            upload.error = str(exc) or exc.__class__.__name__
+        else:
+            upload.status = COMPLETED
+            upload.error = None
+            upload_staging.discard(upload_id)
+        db.commit()
+
+
+def expire_stale_uploads(db: Session, *, max_age: timedelta) -> list[str]:
+    """
+    Expire uploads left uploading, failed or stalled for `max_age` and delete their
+    parts, returns the ids of the deleted staging directories.
+
+    Staging directories of no unfinished upload, left by deleted or completed ones,
+    are deleted once unchanged for `max_age` too.
+    """
+    cutoff = datetime.now() - max_age
+    stale = (
+        MediaUpload.updated_at < cutoff,
+        or_(MediaUpload.status.in_((UPLOADING, FAILED)), is_stalled()),
+    )
+    discarded = []
+    for upload_id in db.scalars(select(MediaUpload.id).where(*stale)).all():
+        # Parts don't touch the row, the staging directory shows recent activity.
+        last_modified = upload_staging.last_modified(upload_id)
+        if last_modified and last_modified >= cutoff:
+            continue
+        # Rechecked row by row, the upload may have been completed since the select.
+        expired = db.query(MediaUpload).filter(MediaUpload.id == upload_id, *stale).update(
+            {MediaUpload.status: EXPIRED, MediaUpload.error: "Upload session expired"},
+            synchronize_session=False,
+        )
+        db.commit()
+        if expired:
+            upload_staging.discard(upload_id)
+            discarded.append(upload_id)
+
+    unfinished = set(
+        db.scalars(
+            select(MediaUpload.id).where(
+                MediaUpload.status.in_((UPLOADING, FAILED, PROCESSING))
+            )
+        )
+    )
+    for upload_id in upload_staging.upload_ids():
+        last_modified = upload_staging.last_modified(upload_id)
+        if upload_id not in unfinished and last_modified and last_modified < cutoff:
+            upload_staging.discard(upload_id)
+            discarded.append(upload_id)
+    return discarded
@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import Optional
+
+from app.config import config
+from app.crud.stripe_event import crud_stripe_event
+from app.database import SessionLocal
+from sqlalchemy.orm import Session
+from starlette.concurrency import run_in_threadpool
+
+logger = logging.getLogger(__name__)
+
+
+class StripeEventWorker:
+    """
+    Background task applying the Stripe event inbox in batches.
+
+    It drains the inbox whenever `notify` is called by the webhook, and every
+    `poll_interval` seconds for events received by other workers or left by a crash.
+    Every app worker may run one: batches are claimed with `SKIP LOCKED` on
+    PostgreSQL, and applying an event twice has no effect anyway.
+    """
+
+    def __init__(self, batch_size: int, poll_interval: float, max_attempts: int):
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.processed = 0
+        self.failed_batches = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def process_batch(self) -> int:
+        """Apply the next batch, returns how many events it handled."""
+        with SessionLocal() as db:
+            try:
+                return crud_stripe_event.process_pending(
+                    db, batch_size=self.batch_size, max_attempts=self.max_attempts
+                )
+            except Exception:
+                logger.exception("Applying a batch of Stripe events failed, isolating the failure")
+                db.rollback()
+                self.failed_batches += 1
+                event_ids = crud_stripe_event.pending_ids(
+                    db, batch_size=self.batch_size, max_attempts=self.max_attempts
+                )
+            return self.process_isolated(db, event_ids)
+
+    def process_isolated(self, db: Session, event_ids: list[str]) -> int:
+        """
+        Apply `event_ids` in halves after their batch failed, down to single events.
+
+        Only an event failing on its own is charged an attempt, so one bad event
+        can't use up the attempts of the others in its batch.
+        """
+        try:
+            crud_stripe_event.process_pending(
+                db, batch_size=len(event_ids), max_attempts=self.max_attempts, event_ids=event_ids
+            )
+        except Exception as exc:
+            db.rollback()
+            if len(event_ids) > 1:
+                middle = len(event_ids) // 2
+                self.process_isolated(db, event_ids[:middle])
+                self.process_isolated(db, event_ids[middle:])
+            else:
+                logger.exception("Applying Stripe event %s failed", event_ids[0])
+                crud_stripe_event.fail(db, event_id=event_ids[0], error=repr(exc))
+        return len(event_ids)
+
+    def drain(self) -> int:
+        """Apply batches until the inbox has no pending event left, returns how many."""
+        total = 0
+        while True:
+            count = self.process_batch()
+            total += count
+            if count < self.batch_size:
+                return total
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                self.processed += await run_in_threadpool(self.drain)
+            except Exception:
+                logger.exception("Stripe event worker failed")
+
+    def start(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def stats(self) -> dict[str, int]:
+        return {"processed": self.processed, "failed_batches": self.failed_batches}
+
+
+stripe_event_worker = StripeEventWorker(
+    batch_size=config.STRIPE_EVENTS_BATCH_SIZE,
+    poll_interval=config.STRIPE_EVENTS_POLL_INTERVAL,
+    max_attempts=config.STRIPE_EVENTS_MAX_ATTEMPTS,
+)
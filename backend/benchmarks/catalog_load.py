@@ -0,0 +1,80 @@
+"""
+Load test GET /api/courses/courses-progress.
+
+Concurrent clients call the catalog endpoint through the ASGI app for a fixed time,
+each as one of several learners who bought a share of the catalog, and the script
+prints RPS with p50/p99 latency. Run from backend/:
+
+    python -m benchmarks.catalog_load --concurrency 32 --duration 10
+"""
+import argparse
+import asyncio
+import random
+import time
+
+# Sets the environment before app settings are read.
+from benchmarks import common
+
+from app.database import SessionLocal
+from app.main import app
+from app.models import Purchase
+from httpx import ASGITransport, AsyncClient
+from tests.utils import auth_headers, create_user, seed_catalog
+
+URL = "/api/courses/courses-progress"
+
+
+def seed(courses: int, learners: int) -> list[dict[str, str]]:
+    with SessionLocal() as db:
+        owner = create_user(db, "teacher@example.com")
+        catalog = seed_catalog(db, owner, courses=courses, chapters=10)
+        users = [create_user(db, f"learner{number}@example.com") for number in range(learners)]
+        for user in users:
+            for course in random.sample(catalog, k=max(1, courses // 10)):
+                db.add(Purchase(owner_id=user.id, course_id=course.id))
+        db.commit()
+        return [auth_headers(user) for user in users]
+
+
+async def run(headers: list[dict[str, str]], concurrency: int, duration: float) -> None:
+    latencies: list[float] = []
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm the catalog cache and the per-user progress counters.
+        for user_headers in headers:
+            (await client.get(URL, headers=user_headers)).raise_for_status()
+
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(URL, headers=random.choice(headers))
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(
+        f"{len(latencies)} requests, concurrency {concurrency}: "
+        f"{len(latencies) / elapsed:.0f} RPS, {common.summarize(latencies)}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--courses", type=int, default=200)
+    parser.add_argument("--learners", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    args = parser.parse_args()
+
+    common.reset_database()
+    headers = seed(args.courses, args.learners)
+    asyncio.run(run(headers, args.concurrency, args.duration))
+
+
+if __name__ == "__main__":
+    main()
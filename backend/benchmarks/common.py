@@ -0,0 +1,46 @@
+"""
+Setup shared by the benchmark scripts.
+
+Import this module before any `app` module: settings are read on import. Without a
+DATABASE_URL the scripts run against a throwaway SQLite database; point DATABASE_URL
+at a scratch Postgres database for numbers closer to production. Its tables are
+dropped and recreated.
+"""
+import os
+import statistics
+import tempfile
+
+BENCH_DIR = tempfile.mkdtemp(prefix="lms-bench-")
+for name, value in {
+    "DATABASE_URL": f"sqlite:///{BENCH_DIR}/bench.db",
+    "SECRET_KEY": "bench-secret",
+    "AT_EXPIRED": "60",
+    "SEARCH_BACKEND": "memory",
+    "STRIPE_EVENTS_WORKER": "false",
+    "STORAGE_BACKEND": "local",
+    "MEDIA_ROOT": f"{BENCH_DIR}/media",
+    "UPLOAD_TMP_DIR": f"{BENCH_DIR}/uploads",
+}.items():
+    os.environ.setdefault(name, value)
+
+
+def reset_database() -> None:
+    from app import models
+    from app.database import engine
+
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+
+
+def percentile(samples: list[float], percent: int) -> float:
+    if len(samples) < 2:
+        return samples[0]
+    return statistics.quantiles(samples, n=100, method="inclusive")[percent - 1]
+
+
+def summarize(samples: list[float]) -> str:
+    """p50/p99 of durations in seconds, as milliseconds."""
+    return (
+        f"p50 {percentile(samples, 50) * 1000:.2f} ms, "
+        f"p99 {percentile(samples, 99) * 1000:.2f} ms"
+    )
@@ -0,0 +1,84 @@
+"""
+CRUDBase.update on a course with 500 loaded chapters.
+
+Times a changed and an unchanged title, against the update CRUDBase had before it
+wrote only changed columns (`legacy_update`), and counts the SQL statements each
+runs. Run from backend/:
+
+    python -m benchmarks.crud_update --chapters 500 --runs 30
+"""
+import argparse
+import contextlib
+import io
+import time
+
+# Sets the environment before app settings are read.
+from benchmarks import common
+
+from app.crud.course import crud_course
+from app.database import SessionLocal, engine
+from app.models import Course
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import event
+from tests.utils import create_user, seed_catalog
+
+
+def legacy_update(db, *, db_obj, obj_in):
+    """The previous CRUDBase.update: encode the whole object, write, commit, refresh."""
+    obj_data = jsonable_encoder(db_obj)
+    print(obj_data)
+    for field in obj_data:
+        if field in obj_in:
+            setattr(db_obj, field, obj_in[field])
+    db.add(db_obj)
+    db.commit()
+    db.refresh(db_obj)
+    return db_obj
+
+
+def measure(update, changed: bool, runs: int, course_id: int, **kwargs) -> tuple[float, float]:
+    """Mean milliseconds and SQL statements per update."""
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    elapsed = 0.0
+    for run in range(runs):
+        with SessionLocal() as db:
+            course = db.get(Course, course_id)
+            course.chapters  # Loaded, as after serving the course.
+            title = f"title {run}" if changed else course.title
+            event.listen(engine, "before_cursor_execute", record)
+            started = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                update(db, db_obj=course, obj_in={"title": title}, **kwargs)
+            elapsed += time.perf_counter() - started
+            event.remove(engine, "before_cursor_execute", record)
+    return elapsed / runs * 1000, len(statements) / runs
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--chapters", type=int, default=500)
+    parser.add_argument("--runs", type=int, default=30)
+    args = parser.parse_args()
+
+    common.reset_database()
+    with SessionLocal() as db:
+        (course,) = seed_catalog(db, create_user(db), courses=1, chapters=args.chapters)
+        course_id = course.id
+
+    for label, update, changed, kwargs in [
+        ("legacy, changed", legacy_update, True, {}),
+        ("update, changed", crud_course.update, True, {}),
+        ("update, refresh=False", crud_course.update, True, {"refresh": False}),
+        ("legacy, no-op", legacy_update, False, {}),
+        ("update, no-op", crud_course.update, False, {}),
+    ]:
+        milliseconds, statements = measure(update, changed, args.runs, course_id, **kwargs)
+        print(f"{label:24} {milliseconds:8.2f} ms {statements:5.1f} statements")
+
+
+if __name__ == "__main__":
+    main()
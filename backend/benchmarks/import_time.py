@@ -0,0 +1,76 @@
+"""
+Startup time of `import app.main`.
+
+Imports the app in `--runs` fresh interpreters and prints the median wall time, and
+the slowest top-level imports of one run by `python -X importtime`. Run from backend/:
+
+    python -m benchmarks.import_time --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+# Sets the environment before app settings are read.
+from benchmarks import common
+
+BACKEND_DIR = Path(__file__).parents[1]
+
+
+def import_app(*options: str) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *options, "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=os.environ,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+def slowest_imports(stderr: str, count: int) -> list[tuple[int, str]]:
+    """Cumulative microseconds of the slowest top-level packages outside `app`."""
+    imports = []
+    for line in stderr.splitlines():
+        fields = line.removeprefix("import time:").split("|")
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue
+        name = fields[2].strip()
+        if "." not in name and name != "app":
+            imports.append((int(fields[1]), name))
+    return sorted(imports, reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--top", type=int, default=10)
+    args = parser.parse_args()
+
+    common.reset_database()
+    interpreter = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "pass"], check=True)
+        interpreter.append(time.perf_counter() - started)
+    durations = []
+    for _ in range(args.runs):
+        started = time.perf_counter()
+        import_app()
+        durations.append(time.perf_counter() - started)
+
+    print(
+        f"import app.main: median {statistics.median(durations) * 1000:.0f} ms, "
+        f"min {min(durations) * 1000:.0f} ms over {args.runs} runs "
+        f"(bare interpreter {statistics.median(interpreter) * 1000:.0f} ms)"
+    )
+    print("slowest packages imported, cumulative:")
+    for microseconds, name in slowest_imports(import_app("-X", "importtime").stderr, args.top):
+        print(f"  {microseconds / 1000:8.1f} ms  {name}")
+
+
+if __name__ == "__main__":
+    main()
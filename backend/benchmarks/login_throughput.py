@@ -0,0 +1,127 @@
+"""
+Concurrent logins through PasswordHasher.
+
+Sends `--requests` logins with real bcrypt hashes through the ASGI app,
+`--concurrency` at a time, once per pool setup, and prints logins per second,
+p50/p99 latency, 503 rejections and the longest event loop stall seen meanwhile.
+The "inline" row verifies on the event loop, like a login that calls bcrypt without
+the pool. Run from backend/:
+
+    python -m benchmarks.login_throughput --requests 64 --concurrency 16
+"""
+import argparse
+import asyncio
+import logging
+import time
+
+# Sets the environment before app settings are read.
+from benchmarks import common
+
+from app import security
+from app.api.endpoints import auth
+from app.database import SessionLocal
+from app.main import app
+from app.models import User
+from app.security import PasswordHasher, get_password_hash, verify_password
+from httpx import ASGITransport, AsyncClient
+
+PASSWORD = "correct horse battery staple"
+
+
+class InlineHasher(PasswordHasher):
+    """Verifies on the calling thread, which for an async endpoint is the event loop."""
+
+    async def run(self, func, *args):
+        return func(*args)
+
+
+def seed(users: int) -> list[dict[str, str]]:
+    hashed_password = get_password_hash(PASSWORD)
+    with SessionLocal() as db:
+        db.add_all(
+            User(
+                username=f"user{number}",
+                email=f"user{number}@example.com",
+                hashed_password=hashed_password,
+                is_active=True,
+            )
+            for number in range(users)
+        )
+        db.commit()
+    return [
+        {"email": f"user{number}@example.com", "password": PASSWORD} for number in range(users)
+    ]
+
+
+async def run(credentials: list[dict[str, str]], requests: int, concurrency: int) -> str:
+    latencies: list[float] = []
+    statuses: list[int] = []
+    stalls: list[float] = []
+    done = asyncio.Event()
+
+    async def ticker():
+        while not done.is_set():
+            started = time.perf_counter()
+            await asyncio.sleep(0.01)
+            stalls.append(time.perf_counter() - started - 0.01)
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        numbers = iter(range(requests))
+
+        async def worker():
+            for number in numbers:
+                started = time.perf_counter()
+                response = await client.post(
+                    "/api/auth/login", json=credentials[number % len(credentials)]
+                )
+                statuses.append(response.status_code)
+                if response.status_code == 200:
+                    latencies.append(time.perf_counter() - started)
+
+        ticking = asyncio.create_task(ticker())
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+        done.set()
+        await ticking
+
+    assert set(statuses) <= {200, 503}, statuses
+    return (
+        f"{statuses.count(200) / elapsed:6.1f} logins/s, {common.summarize(latencies)}, "
+        f"{statuses.count(503)} x 503, loop stall max {max(stalls) * 1000:.0f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=64)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--queue-size", type=int, default=64)
+    args = parser.parse_args()
+
+    # Rejections are counted, not logged one by one.
+    logging.getLogger(security.__name__).setLevel(logging.ERROR)
+    common.reset_database()
+    credentials = seed(args.concurrency)
+    verify_password(PASSWORD, get_password_hash(PASSWORD))  # Loads the bcrypt backend.
+    setups = {
+        "inline": InlineHasher(workers=1, queue_size=0),
+        f"threads x{args.workers}": PasswordHasher(args.workers, args.queue_size),
+        f"processes x{args.workers}": PasswordHasher(
+            args.workers, args.queue_size, use_processes=True
+        ),
+        "threads x1, queue 4": PasswordHasher(1, 4),
+    }
+    for label, hasher in setups.items():
+        auth.password_hasher = security.password_hasher = hasher
+        try:
+            result = asyncio.run(run(credentials, args.requests, args.concurrency))
+        finally:
+            hasher.shutdown()
+        print(f"{label:20} {result}")
+
+
+if __name__ == "__main__":
+    main()
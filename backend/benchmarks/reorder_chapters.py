@@ -0,0 +1,99 @@
+"""
+Reordering 10, 100 and 1000 chapters.
+
+Reverses the chapter order of a course through PUT /courses/{id}/chapters/reorder and
+with the loop the endpoint used before (`legacy_reorder`, one SELECT per chapter), and
+prints the median time and SQL statements of each. Run from backend/:
+
+    python -m benchmarks.reorder_chapters --runs 10
+"""
+import argparse
+import statistics
+import time
+
+# Sets the environment before app settings are read.
+from benchmarks import common
+
+from app.database import SessionLocal, engine
+from app.main import app
+from app.models import Chapter
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+from tests.utils import auth_headers, create_user, seed_catalog
+
+
+def legacy_reorder(items: list[dict[str, int]]) -> None:
+    with SessionLocal() as db:
+        for item in items:
+            chapter = db.query(Chapter).filter(Chapter.id == item["id"]).first()
+            chapter.position = item["position"]
+        db.commit()
+
+
+def measure(reorder, items: list[list[dict[str, int]]]) -> tuple[float, int]:
+    """Median milliseconds and SQL statements of `reorder` over `items`."""
+    statements: list[str] = []
+
+    def record(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    durations = []
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        for run_items in items:
+            started = time.perf_counter()
+            reorder(run_items)
+            durations.append(time.perf_counter() - started)
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return statistics.median(durations) * 1000, len(statements) // len(items)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args()
+
+    common.reset_database()
+    client = TestClient(app)
+    with SessionLocal() as db:
+        owner = create_user(db)
+        headers = auth_headers(owner)
+        courses = {
+            size: seed_catalog(db, owner, courses=1, chapters=size)[0] for size in args.sizes
+        }
+        chapter_ids = {
+            size: [chapter.id for chapter in course.chapters] for size, course in courses.items()
+        }
+        course_ids = {size: course.id for size, course in courses.items()}
+
+    def endpoint(size):
+        def reorder(items):
+            url = f"/api/courses/{course_ids[size]}/chapters/reorder"
+            client.put(url, json=items, headers=headers).raise_for_status()
+
+        return reorder
+
+    print(f"{'chapters':>8}  {'legacy loop':>20}  {'endpoint (HTTP and auth)':>24}")
+    for size in args.sizes:
+        ids = chapter_ids[size]
+        # Alternate between reversed and original order, so every run moves every row.
+        items = [
+            [
+                {"id": chapter_id, "position": size - 1 - index if run % 2 == 0 else index}
+                for index, chapter_id in enumerate(ids)
+            ]
+            for run in range(args.runs)
+        ]
+        endpoint(size)(items[-1])  # Warms the user cache.
+        legacy = measure(legacy_reorder, items)
+        current = measure(endpoint(size), items)
+        print(
+            f"{size:>8}  {legacy[0]:>9.1f} ms {legacy[1]:>5} q"
+            f"  {current[0]:>13.1f} ms {current[1]:>5} q"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Course search over a large catalog, on the pg_trgm and in-memory backends.
+
+Seeds `--courses` courses with generated titles and descriptions, times building each
+index, then times searches for exact words, prefixes, one-typo words and two-word
+queries, next to the title `ilike` scan search replaced. The pg_trgm backend only runs
+when DATABASE_URL points at PostgreSQL. Run from backend/:
+
+    python -m benchmarks.search --courses 100000
+    DATABASE_URL=postgresql://... python -m benchmarks.search --courses 100000
+"""
+import argparse
+import random
+import resource
+import time
+from datetime import datetime
+
+# Sets the environment before app settings are read.
+from benchmarks import common
+
+from app.database import SessionLocal, engine
+from app.models import Category, Course, User
+from app.search import InMemorySearchIndex, PostgresSearchIndex
+from sqlalchemy import insert, text
+
+SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "ta", "vi", "so", "de", "pa", "gri", "ston", "el"]
+BATCH_SIZE = 5000
+TRGM_INDEX = (
+    "CREATE INDEX ix_courses_search_trgm ON courses "
+    "USING gin ((title || ' ' || coalesce(description, '')) gin_trgm_ops)"
+)
+
+
+def make_words(rng: random.Random, count: int) -> list[str]:
+    words: set[str] = set()
+    while len(words) < count:
+        words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+    return sorted(words)
+
+
+def seed(rng: random.Random, words: list[str], courses: int) -> None:
+    with SessionLocal() as db:
+        owner = User(username="owner", email="owner@example.com", hashed_password="x")
+        category = Category(name="category")
+        db.add_all([owner, category])
+        db.commit()
+        now = datetime.now()
+        for start in range(0, courses, BATCH_SIZE):
+            db.execute(
+                insert(Course),
+                [
+                    {
+                        "title": " ".join(rng.choices(words, k=rng.randint(3, 6))),
+                        "description": " ".join(rng.choices(words, k=rng.randint(15, 30))),
+                        "price": 10,
+                        "is_published": True,
+                        "owner_id": owner.id,
+                        "category_id": category.id,
+                        "created_at": now,
+                        "updated_at": now,
+                    }
+                    for _ in range(min(BATCH_SIZE, courses - start))
+                ],
+            )
+        db.commit()
+
+
+def make_queries(rng: random.Random, words: list[str], count: int) -> dict[str, list[str]]:
+    long_words = [word for word in words if len(word) >= 6]
+
+    def typo(word: str) -> str:
+        position = rng.randrange(1, len(word))
+        return word[:position] + word[position + 1 :]
+
+    return {
+        "exact word": rng.choices(words, k=count),
+        "prefix": [word[:4] for word in rng.choices(long_words, k=count)],
+        "one typo": [typo(word) for word in rng.choices(long_words, k=count)],
+        "two words": [" ".join(rng.choices(words, k=2)) for _ in range(count)],
+    }
+
+
+def ilike_search(db, query: str) -> list[int]:
+    return [
+        row.id for row in db.query(Course.id).filter(Course.title.ilike(f"%{query}%")).limit(1000)
+    ]
+
+
+def time_searches(search, queries: dict[str, list[str]]) -> None:
+    with SessionLocal() as db:
+        for label, texts in queries.items():
+            durations, hits = [], 0
+            for query in texts:
+                started = time.perf_counter()
+                hits += len(search(db, query))
+                durations.append(time.perf_counter() - started)
+            print(f"  {label:11} {common.summarize(durations)}, {hits / len(texts):.0f} hits")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--courses", type=int, default=100_000)
+    parser.add_argument("--words", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    words = make_words(rng, args.words)
+    common.reset_database()
+    started = time.perf_counter()
+    seed(rng, words, args.courses)
+    print(f"seeded {args.courses} courses in {time.perf_counter() - started:.1f} s")
+    queries = make_queries(rng, words, args.queries)
+
+    print("ilike scan on the title:")
+    time_searches(ilike_search, queries)
+
+    memory_index = InMemorySearchIndex(refresh_seconds=3600)
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    started = time.perf_counter()
+    with SessionLocal() as db:
+        memory_index.rebuild(db)
+    rss_growth = (resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - rss_before) / 1024
+    print(
+        f"in-memory index: built in {time.perf_counter() - started:.1f} s, "
+        f"peak RSS +{rss_growth:.0f} MiB"
+    )
+    time_searches(memory_index.search, queries)
+
+    if engine.dialect.name != "postgresql":
+        print("pg_trgm index: skipped, DATABASE_URL is not PostgreSQL")
+        return
+    with engine.begin() as connection:
+        connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+        connection.execute(text("DROP INDEX IF EXISTS ix_courses_search_trgm"))
+        started = time.perf_counter()
+        connection.execute(text(TRGM_INDEX))
+        connection.execute(text("ANALYZE courses"))
+    print(f"pg_trgm index: built in {time.perf_counter() - started:.1f} s")
+    time_searches(PostgresSearchIndex().search, queries)
+
+
+if __name__ == "__main__":
+    main()
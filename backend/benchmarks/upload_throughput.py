@@ -0,0 +1,98 @@
+"""
+Throughput of the chunked upload protocol against local storage.
+
+Uploads a file of `--size-mb` in `--part-mb` parts, `--concurrency` at a time, through
+the ASGI app, then completes it and times the background assembly and storing. Each
+part body is streamed in 64 KiB chunks, like a client reading from disk. Run from
+backend/:
+
+    python -m benchmarks.upload_throughput --size-mb 256 --part-mb 8 --concurrency 4
+"""
+import argparse
+import asyncio
+import os
+import time
+
+# Sets the environment before app settings are read.
+from benchmarks import common
+
+from app.database import SessionLocal
+from app.main import app
+from app.uploads import COMPLETED
+from httpx import ASGITransport, AsyncClient
+from tests.utils import auth_headers, create_user
+
+MIB = 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+async def chunks(content: bytes):
+    for start in range(0, len(content), CHUNK_SIZE):
+        yield content[start : start + CHUNK_SIZE]
+
+
+async def run(size: int, part_size: int, concurrency: int) -> None:
+    with SessionLocal() as db:
+        headers = auth_headers(create_user(db))
+    part = os.urandom(part_size)
+    part_count = -(-size // part_size)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        response = await client.post(
+            "/api/upload/sessions",
+            json={"filename": "bench.mp4", "resource_type": "video"},
+            headers=headers,
+        )
+        sessions = f"/api/upload/sessions/{response.json()['id']}"
+
+        numbers = iter(range(1, part_count + 1))
+        latencies: list[float] = []
+
+        async def worker():
+            for number in numbers:
+                started = time.perf_counter()
+                response = await client.put(
+                    f"{sessions}/parts/{number}", content=chunks(part), headers=headers
+                )
+                response.raise_for_status()
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        upload_seconds = time.perf_counter() - started
+
+        # ASGITransport runs the background job before the response returns.
+        started = time.perf_counter()
+        response = await client.post(
+            f"{sessions}/complete", json={"parts": list(range(1, part_count + 1))}, headers=headers
+        )
+        response.raise_for_status()
+        complete_seconds = time.perf_counter() - started
+        upload = (await client.get(sessions, headers=headers)).json()
+        assert upload["status"] == COMPLETED, upload
+
+    total = part_count * part_size / MIB
+    print(
+        f"{total:.0f} MiB in {part_count} parts of {part_size / MIB:g} MiB, "
+        f"concurrency {concurrency}"
+    )
+    print(
+        f"parts:    {upload_seconds:.2f} s, {total / upload_seconds:.0f} MiB/s, "
+        f"per part {common.summarize(latencies)}"
+    )
+    print(f"complete: {complete_seconds:.2f} s, {total / complete_seconds:.0f} MiB/s")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size-mb", type=int, default=256)
+    parser.add_argument("--part-mb", type=float, default=8)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    common.reset_database()
+    asyncio.run(run(args.size_mb * MIB, int(args.part_mb * MIB), args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+import os
+import shutil
+import tempfile
+
+# Settings are read when app modules are imported, so they are set first.
+TEST_DIR = tempfile.mkdtemp(prefix="lms-tests-")
+os.environ.update(
+    DATABASE_URL=f"sqlite:///{TEST_DIR}/test.db",
+    SECRET_KEY="test-secret",
+    AT_EXPIRED="60",
+    SEARCH_BACKEND="memory",
+    STRIPE_EVENTS_WORKER="false",
+    STRIPE_WEBHOOK_SECRET="whsec_test",
+    STRIPE_API_KEY="sk_test",
+    MEDIA_ROOT=f"{TEST_DIR}/media",
+    UPLOAD_TMP_DIR=f"{TEST_DIR}/uploads",
+)
+
+import pytest
+from app import models
+from app.cache import MemoryBackend, cache
+from app.config import config
+from app.database import SessionLocal, async_engine, engine
+from app.main import app
+from app.search import search_index
+from app.storage import local_storage
+from app.uploads import upload_staging
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+
+@pytest.fixture(autouse=True)
+def database():
+    models.Base.metadata.drop_all(bind=engine)
+    models.Base.metadata.create_all(bind=engine)
+    cache.backend = MemoryBackend(maxsize=config.CACHE_SIZE)
+    search_index.__init__(search_index.refresh_seconds)
+    shutil.rmtree(upload_staging.root, ignore_errors=True)
+    shutil.rmtree(local_storage.root, ignore_errors=True)
+    yield
+
+
+@pytest.fixture
+def db():
+    with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def queries():
+    """SQL statements run by the sync and async engines during the test."""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engines = [engine, async_engine.sync_engine]
+    for listened in engines:
+        event.listen(listened, "before_cursor_execute", record)
+    yield statements
+    for listened in engines:
+        event.remove(listened, "before_cursor_execute", record)
@@ -0,0 +1,59 @@
+from datetime import date
+
+from app.crud.revenue import crud_daily_revenue
+from app.models import Purchase
+from app.worker import stripe_event_worker
+
+from .test_stripe_events import checkout_event, signed
+from .utils import auth_headers, create_user, seed_catalog
+
+
+def test_all_time_and_range_analytics_agree_on_sale_prices(db, client):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    first, second = seed_catalog(db, owner, courses=2, price=10)
+
+    # One purchase through the webhook, one added directly.
+    body, headers = signed(checkout_event("evt_1", learner.id, first.id))
+    assert client.post("/api/payment/webhook", content=body, headers=headers).status_code == 200
+    stripe_event_worker.drain()
+    db.add(Purchase(owner_id=learner.id, course_id=second.id))
+    db.commit()
+    first.price = second.price = 50
+    db.commit()
+
+    url = "/api/purchases/analist"
+    today = date.today().isoformat()
+    all_time = client.get(url, headers=auth_headers(owner)).json()
+    in_range = client.get(
+        url, params={"start": today, "end": today, "daily": True}, headers=auth_headers(owner)
+    ).json()
+
+    assert all_time["data"] == in_range["data"] == [
+        {"name": first.title, "total": 10.0, "sales": 1},
+        {"name": second.title, "total": 10.0, "sales": 1},
+    ]
+    assert (all_time["total_revenue"], all_time["total_sales"]) == (20.0, 2)
+    assert in_range["days"] == [{"day": today, "sales": 2, "revenue": 20.0}]
+
+
+def test_rebuild_keeps_sales_at_the_price_they_were_made(db, client):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    first, second = seed_catalog(db, owner, courses=2, price=10)
+
+    body, headers = signed(checkout_event("evt_1", learner.id, first.id))
+    assert client.post("/api/payment/webhook", content=body, headers=headers).status_code == 200
+    stripe_event_worker.drain()
+    db.add(Purchase(owner_id=learner.id, course_id=second.id))
+    db.commit()
+    first.price = second.price = 50
+    db.commit()
+
+    assert {purchase.price for purchase in db.query(Purchase)} == {10}
+    crud_daily_revenue.rebuild(db)
+
+    assert crud_daily_revenue.totals_by_course(db, owner_id=owner.id) == [
+        (first.title, 1, 10.0),
+        (second.title, 1, 10.0),
+    ]
@@ -0,0 +1,59 @@
+import asyncio
+import threading
+
+import httpx
+from app import security
+from app.api.endpoints import auth
+from app.security import PasswordHasher
+
+from .utils import create_user
+
+
+def test_saturated_password_pool_returns_503_with_retry_after(db, monkeypatch):
+    create_user(db)
+    hasher = PasswordHasher(workers=1, queue_size=1)
+    release = threading.Event()
+
+    def blocked_verify(plain_password, hashed_password):
+        assert release.wait(10)
+        return True
+
+    monkeypatch.setattr(auth, "password_hasher", hasher)
+    monkeypatch.setattr(security, "verify_password", blocked_verify)
+    credentials = {"email": "learner@example.com", "password": "secret"}
+
+    async def login_storm():
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # One login holds the worker and one waits in the queue.
+            accepted = [
+                asyncio.create_task(client.post("/api/auth/login", json=credentials))
+                for _ in range(2)
+            ]
+            while hasher.stats()["in_flight"] < 2:
+                await asyncio.sleep(0.01)
+            rejected = await client.post("/api/auth/login", json=credentials)
+            release.set()
+            return rejected, await asyncio.gather(*accepted)
+
+    try:
+        rejected, accepted = asyncio.run(asyncio.wait_for(login_storm(), 10))
+    finally:
+        release.set()
+        hasher.shutdown()
+
+    assert rejected.status_code == 503
+    assert rejected.headers["retry-after"] == "1"
+    assert [response.status_code for response in accepted] == [200, 200]
+    assert hasher.stats() | {"avg_seconds": None} == {
+        "workers": 1,
+        "queue_size": 1,
+        "in_flight": 0,
+        "submitted": 2,
+        "completed": 2,
+        "failed": 0,
+        "rejected": 1,
+        "avg_seconds": None,
+    }
@@ -0,0 +1,83 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+from app.cache import cache
+from app.database import AsyncSessionLocal
+
+from .utils import auth_headers, create_user, seed_catalog
+
+
+def test_get_or_set_refuses_the_event_loop_thread():
+    async def build_in_run_sync():
+        async with AsyncSessionLocal() as session:
+            await session.run_sync(lambda _: cache.get_or_set("key", lambda: 1, ttl=60))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(build_in_run_sync())
+    assert cache.get_or_set("key", lambda: 1, ttl=60) == 1
+
+
+def test_concurrent_cold_catalog_requests_finish(db):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    seed_catalog(db, owner, courses=20, purchaser=learner)
+    headers = auth_headers(learner)
+    statuses = []
+
+    async def fetch_concurrently():
+        from app.main import app
+
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            responses = await asyncio.gather(
+                *(client.get("/api/courses/courses-progress", headers=headers) for _ in range(8))
+            )
+        statuses.extend(response.status_code for response in responses)
+
+    # A deadlocked event loop never returns, so the requests run in a thread we can abandon.
+    thread = threading.Thread(target=asyncio.run, args=(fetch_concurrently(),), daemon=True)
+    thread.start()
+    thread.join(timeout=30)
+
+    assert not thread.is_alive(), "concurrent catalog requests deadlocked"
+    assert statuses == [200] * 8
+
+
+def test_categories_return_304_until_a_write_changes_the_etag(client, db):
+    headers = auth_headers(create_user(db))
+    client.post("/api/categories/", json={"name": "design"}, headers=headers)
+    response = client.get("/api/categories/", headers=headers)
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "no-cache"
+
+    for if_none_match in [etag, f'W/"other", W/{etag}', "*"]:
+        response = client.get(
+            "/api/categories/", headers={**headers, "If-None-Match": if_none_match}
+        )
+        assert response.status_code == 304, if_none_match
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    client.post("/api/categories/", json={"name": "music"}, headers=headers)
+    response = client.get("/api/categories/", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert [category["name"] for category in response.json()] == ["design", "music"]
+
+
+def test_catalog_etag_changes_after_a_course_update(client, db):
+    owner = create_user(db, "teacher@example.com")
+    (course,) = seed_catalog(db, owner, courses=1)
+    headers = auth_headers(owner)
+    url = "/api/courses/courses-progress"
+    etag = client.get(url, headers=headers).headers["etag"]
+    assert client.get(url, headers={**headers, "If-None-Match": etag}).status_code == 304
+
+    client.patch(f"/api/courses/{course.id}", json={"title": "renamed"}, headers=headers)
+    response = client.get(url, headers={**headers, "If-None-Match": etag})
+
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+    assert response.json()[0]["title"] == "renamed"
@@ -0,0 +1,47 @@
+from app.cache import MemoryBackend, cache
+from app.config import config
+from app.models import UserProgress
+
+from .utils import auth_headers, create_user, seed_catalog
+
+
+def catalog_queries(client, queries, learner) -> int:
+    cache.backend = MemoryBackend(maxsize=config.CACHE_SIZE)
+    queries.clear()
+    response = client.get("/api/courses/courses-progress", headers=auth_headers(learner))
+    assert response.status_code == 200
+    return len(queries)
+
+
+def test_catalog_query_count_does_not_grow_with_the_catalog(db, client, queries):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+
+    counts = []
+    for courses in (2, 20, 60):
+        for course in seed_catalog(db, owner, courses=courses, purchaser=learner):
+            db.add(UserProgress(owner=learner, chapter=course.chapters[0], is_completed=True))
+        db.commit()
+        counts.append(catalog_queries(client, queries, learner))
+
+    assert counts[0] == counts[1] == counts[2]
+    response = client.get("/api/courses/courses-progress", headers=auth_headers(learner))
+    assert len(response.json()) == 82
+    assert all(course["progress"] == 33.3 for course in response.json())
+
+
+def test_dashboard_query_count_does_not_grow_with_purchases(db, client, queries):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+
+    counts = []
+    for courses in (2, 20):
+        seed_catalog(db, owner, courses=courses, purchaser=learner)
+        cache.backend = MemoryBackend(maxsize=config.CACHE_SIZE)
+        queries.clear()
+        response = client.get("/api/courses/dashboard-courses", headers=auth_headers(learner))
+        assert response.status_code == 200
+        counts.append(len(queries))
+
+    assert len(response.json()["courses_in_progress"]) == 22
+    assert counts[0] == counts[1]
@@ -0,0 +1,83 @@
+from app.models import Chapter
+
+from .utils import auth_headers, create_user, seed_catalog
+
+
+def titles_in_order(db, course) -> list[str]:
+    db.expire_all()
+    chapters = db.query(Chapter).filter_by(course_id=course.id).order_by(Chapter.position)
+    return [chapter.title for chapter in chapters]
+
+
+def reorder(client, owner, course, moved: list[tuple[Chapter, int]]):
+    return client.put(
+        f"/api/courses/{course.id}/chapters/reorder",
+        json=[{"id": chapter.id, "position": position} for chapter, position in moved],
+        headers=auth_headers(owner),
+    )
+
+
+def test_reorder_moves_chapters_down_and_up(client, db):
+    owner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=4)
+    first, second, third, fourth = course.chapters
+
+    # Like the chapter list sends a drag: the new index of every chapter in between.
+    response = reorder(client, owner, course, [(second, 0), (third, 1), (first, 2)])
+    assert response.status_code == 200
+    assert titles_in_order(db, course) == ["chapter 1", "chapter 2", "chapter 0", "chapter 3"]
+
+    response = reorder(client, owner, course, [(fourth, 0), (second, 1), (third, 2), (first, 3)])
+    assert response.status_code == 200
+    assert titles_in_order(db, course) == ["chapter 3", "chapter 1", "chapter 2", "chapter 0"]
+
+
+def test_reorder_to_the_same_position_changes_nothing(client, db):
+    owner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=3)
+
+    assert reorder(client, owner, course, [(course.chapters[1], 1)]).status_code == 200
+    assert reorder(client, owner, course, []).status_code == 200
+    assert titles_in_order(db, course) == ["chapter 0", "chapter 1", "chapter 2"]
+
+
+def test_reorder_rejects_positions_and_chapters_out_of_range(client, db):
+    owner = create_user(db)
+    course, other = seed_catalog(db, owner, courses=2, chapters=3)
+    first, second, third = course.chapters
+
+    response = reorder(client, owner, course, [(first, 3), (third, 0)])
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Position out of range"
+    assert reorder(client, owner, course, [(first, -1)]).status_code == 422
+    assert reorder(client, owner, course, [(other.chapters[0], 0)]).status_code == 404
+    assert reorder(client, create_user(db, "other@example.com"), course, []).status_code == 403
+    assert titles_in_order(db, course) == ["chapter 0", "chapter 1", "chapter 2"]
+
+
+def test_chapter_dashboard_runs_at_most_two_queries(client, db, queries):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    for chapters in (6, 60):
+        (course,) = seed_catalog(db, owner, courses=1, chapters=chapters, purchaser=learner)
+        ids = [chapter.id for chapter in course.chapters]
+        url = f"/api/courses/{course.id}/chapters/{ids[1]}/dashboard"
+        for user, prefetch, upcoming in [
+            (learner, 0, []),
+            (learner, 3, ids[2:5]),
+            (learner, 20, ids[2:22]),
+            # No access: upcoming chapters are listed, the next one is not offered.
+            (owner, 3, ids[2:5]),
+        ]:
+            headers = auth_headers(user)
+            client.get(url, headers=headers)  # Caches the user lookup.
+            queries.clear()
+
+            response = client.get(url, params={"prefetch": prefetch}, headers=headers)
+
+            assert response.status_code == 200
+            dashboard = response.json()
+            assert [chapter["id"] for chapter in dashboard["upcoming_chapters"]] == upcoming
+            next_chapter = dashboard["next_chapter"]
+            assert (next_chapter and next_chapter["id"]) == (ids[2] if user is learner else None)
+            assert len(queries) <= 2, (chapters, prefetch, queries)
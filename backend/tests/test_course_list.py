@@ -0,0 +1,48 @@
+from datetime import datetime
+
+from .utils import auth_headers, create_user, seed_catalog
+
+
+def walk_pages(client, url, headers, limit):
+    """Ids of every page of `url`, following X-Next-Cursor."""
+    pages, cursor = [], None
+    for _ in range(10):
+        params = {"limit": limit, **({"cursor": cursor} if cursor else {})}
+        response = client.get(url, params=params, headers=headers)
+        assert response.status_code == 200
+        pages.append([course["id"] for course in response.json()])
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            return pages
+    raise AssertionError(f"no last page after {pages}")
+
+
+def test_course_lists_page_by_keyset_through_created_at_ties(client, db):
+    owner = create_user(db, "teacher@example.com")
+    courses = seed_catalog(db, owner, courses=7)
+    seed_catalog(db, create_user(db, "other@example.com"), courses=2)
+    # The first ids are the newest, and a page boundary falls inside the last four
+    # courses, which share a timestamp so only the id orders them.
+    timestamps = [datetime(2024, 1, 2)] * 3 + [datetime(2024, 1, 1)] * 4
+    for course, created_at in zip(courses, timestamps):
+        course.created_at = created_at
+    db.commit()
+    newest_first = [
+        course.id
+        for course in sorted(courses, key=lambda course: (course.created_at, course.id))
+    ][::-1]
+    headers = auth_headers(owner)
+
+    for url in ["/api/courses/", "/api/courses/summaries"]:
+        pages = walk_pages(client, url, headers, limit=3)
+        assert pages == [newest_first[:3], newest_first[3:6], newest_first[6:]], url
+        # A last page that is exactly full has no next cursor either.
+        assert walk_pages(client, url, headers, limit=7) == [newest_first], url
+
+
+def test_invalid_course_list_cursor_is_rejected(client, db):
+    headers = auth_headers(create_user(db))
+
+    response = client.get("/api/courses/", params={"cursor": "not-a-cursor"}, headers=headers)
+
+    assert response.status_code == 400
@@ -0,0 +1,80 @@
+from app.crud.base import CRUDBase
+from app.models import Chapter
+
+from .utils import create_user, seed_catalog
+
+crud_chapter = CRUDBase(Chapter)
+
+
+def positions(db, course):
+    db.expire_all()
+    return [
+        chapter.position
+        for chapter in db.query(Chapter).filter_by(course_id=course.id).order_by(Chapter.id)
+    ]
+
+
+def test_bulk_update_runs_one_executemany_per_batch_and_field_set(db, queries):
+    (course,) = seed_catalog(db, create_user(db), courses=1, chapters=5)
+    ids = [chapter.id for chapter in course.chapters]
+    objs_in = [{"id": chapter_id, "position": 10 + index} for index, chapter_id in enumerate(ids)]
+    objs_in[-1]["title"] = "renamed"
+    del queries[:]
+
+    crud_chapter.bulk_update(db, objs_in=objs_in, batch_size=2)
+
+    updates = [statement for statement in queries if statement.startswith("UPDATE")]
+    # Batches [0, 1], [2, 3] and [4], the last one with an extra column.
+    assert len(updates) == 3
+    assert "title" in updates[-1] and "title" not in updates[0]
+    assert positions(db, course) == [10, 11, 12, 13, 14]
+    assert db.get(Chapter, ids[-1]).title == "renamed"
+
+
+def test_bulk_update_with_no_rows_runs_no_statement(db, queries):
+    crud_chapter.bulk_update(db, objs_in=[], commit=False)
+
+    assert queries == []
+
+
+def test_bulk_update_writes_every_row_of_a_large_input(db, queries):
+    (course,) = seed_catalog(db, create_user(db), courses=1, chapters=1200)
+    del queries[:]
+
+    crud_chapter.bulk_update(
+        db,
+        objs_in=[
+            {"id": chapter.id, "position": 1200 - chapter.position} for chapter in course.chapters
+        ],
+    )
+
+    assert len([statement for statement in queries if statement.startswith("UPDATE")]) == 3
+    assert positions(db, course) == list(range(1200, 0, -1))
+
+
+def test_update_without_changes_runs_no_statement(db, queries):
+    (course,) = seed_catalog(db, create_user(db), courses=1, chapters=1)
+    chapter = course.chapters[0]
+    unchanged = {"title": chapter.title, "position": chapter.position, "unknown": "ignored"}
+    del queries[:]
+
+    assert crud_chapter.update(db, db_obj=chapter, obj_in=unchanged) is chapter
+
+    assert queries == []
+
+
+def test_update_writes_only_changed_columns(db, queries):
+    (course,) = seed_catalog(db, create_user(db), courses=1, chapters=1)
+    chapter = course.chapters[0]
+    del queries[:]
+
+    crud_chapter.update(
+        db, db_obj=chapter, obj_in={"title": "renamed", "position": chapter.position}
+    )
+
+    (statement,) = [statement for statement in queries if statement.startswith("UPDATE")]
+    assigned = statement.split(" SET ")[1].split(" WHERE ")[0]
+    # updated_at comes from its `onupdate` default.
+    assert [column.split("=")[0] for column in assigned.split(", ")] == ["title", "updated_at"]
+    db.expire_all()
+    assert db.get(Chapter, chapter.id).title == "renamed"
@@ -0,0 +1,123 @@
+import os
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+from .conftest import TEST_DIR
+
+SEED = textwrap.dedent(
+    """
+    import sys
+    from app import models
+    from app.database import engine
+    from sqlalchemy import insert
+
+    users, courses = int(sys.argv[1]), int(sys.argv[2])
+    models.Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(insert(models.User), [
+            {"id": n, "username": f"user{n}", "email": f"{n}@example.com",
+             "hashed_password": "x", "is_active": True}
+            for n in range(1, users + 1)
+        ])
+        conn.execute(insert(models.Course), [
+            {"id": n, "title": f"course {n}", "owner_id": 1, "price": 10}
+            for n in range(1, courses + 1)
+        ])
+        conn.execute(insert(models.Purchase), [
+            {"owner_id": user, "course_id": course}
+            for user in range(1, users + 1) for course in range(1, courses + 1)
+        ])
+    """
+)
+
+# Prints how much the peak RSS grew, in KiB, while the whole export was sent. The app
+# is driven directly, the test client would buffer the whole body.
+MEASURE = textwrap.dedent(
+    """
+    import asyncio
+    import resource
+    from app.main import app
+    from app.security import create_token
+
+    token = create_token("1@example.com", "access")
+
+    async def export(query):
+        size = 0
+        requested = False
+        disconnected = asyncio.Event()
+
+        async def receive():
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+
+        async def send(message):
+            nonlocal size
+            if message["type"] == "http.response.start":
+                assert message["status"] == 200
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+
+        await app(
+            {
+                "type": "http",
+                "asgi": {"version": "3.0"},
+                "http_version": "1.1",
+                "method": "GET",
+                "scheme": "http",
+                "server": ("test", 80),
+                "client": ("test", 1),
+                "root_path": "",
+                "path": "/api/exports/purchases",
+                "raw_path": b"/api/exports/purchases",
+                "query_string": query.encode(),
+                "headers": [(b"authorization", f"Bearer {token}".encode())],
+            },
+            receive,
+            send,
+        )
+        return size
+
+    query = "with_course=true&with_user=true"
+    asyncio.run(export(query + "&course_id=1"))
+    before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    size = asyncio.run(export(query))
+    print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before, size)
+    """
+)
+
+
+def run(script: str, database: str, *args: int) -> str:
+    env = {**os.environ, "DATABASE_URL": f"sqlite:///{TEST_DIR}/{database}"}
+    return subprocess.run(
+        [sys.executable, "-c", script, *map(str, args)],
+        env=env,
+        cwd=Path(__file__).parents[1],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+
+def peak_rss_growth(users: int, courses: int) -> tuple[int, int]:
+    database = f"export-{users}x{courses}.db"
+    run(SEED, database, users, courses)
+    growth, size = map(int, run(MEASURE, database).split())
+    return growth, size
+
+
+@pytest.mark.skipif(sys.platform != "linux", reason="ru_maxrss is in KiB on Linux only")
+def test_export_peak_rss_stays_flat_as_rows_grow():
+    small_growth, small_size = peak_rss_growth(users=100, courses=50)
+    large_growth, large_size = peak_rss_growth(users=1000, courses=100)
+
+    assert large_size > 15 * small_size
+    # Loading the large export at once grows the peak by about 100 MiB.
+    assert large_size > 5 * 1024 * 1024
+    assert large_growth - small_growth < 8 * 1024
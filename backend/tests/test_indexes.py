@@ -0,0 +1,50 @@
+import re
+
+import pytest
+from app.database import engine
+from app.models import Chapter, Course, Customer, Purchase, StripeEvent, UserProgress
+from sqlalchemy import select, text
+
+from .utils import create_user, seed_catalog
+
+# A plain `SCAN <table>` reads the whole table; scans through an index are fine.
+FULL_SCAN = re.compile(r"^SCAN (\w+)$")
+
+HOT_QUERIES = {
+    "purchase of a user": select(Purchase).where(
+        Purchase.owner_id == 1, Purchase.course_id == 1
+    ),
+    "buyers of a course": select(Purchase).where(Purchase.course_id == 1),
+    "progress of a chapter": select(UserProgress).where(
+        UserProgress.owner_id == 1, UserProgress.chapter_id == 1
+    ),
+    "learners of a chapter": select(UserProgress).where(UserProgress.chapter_id == 1),
+    "published chapters": select(Chapter)
+    .where(Chapter.course_id == 1, Chapter.is_published)
+    .order_by(Chapter.position),
+    "courses of an owner": select(Course).where(Course.owner_id == 1),
+    "published courses": select(Course)
+    .where(Course.is_published)
+    .order_by(Course.created_at.desc()),
+    "customer of a user": select(Customer).where(Customer.user_id == 1),
+    "pending stripe events": select(StripeEvent)
+    .where(StripeEvent.processed_at.is_(None))
+    .order_by(StripeEvent.received_at),
+}
+
+
+@pytest.fixture
+def seeded(db):
+    for number in range(20):
+        owner = create_user(db, f"teacher{number}@example.com")
+        seed_catalog(db, owner, courses=5, purchaser=create_user(db, f"{number}@example.com"))
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
+@pytest.mark.parametrize("name", HOT_QUERIES)
+def test_hot_queries_use_indexes(seeded, name):
+    statement = HOT_QUERIES[name].compile(engine, compile_kwargs={"literal_binds": True})
+    with engine.connect() as conn:
+        plan = [row[3] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {statement}"))]
+    assert not [step for step in plan if FULL_SCAN.match(step)], plan
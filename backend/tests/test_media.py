@@ -0,0 +1,212 @@
+from email.utils import formatdate, parsedate_to_datetime
+from io import BytesIO
+from pathlib import Path
+
+from app import cli
+from app.config import config
+from app.models import Chapter, Course, MediaObject
+from app.storage import local_storage
+
+from .utils import auth_headers, create_user, seed_catalog
+
+
+def upload(client, content: bytes, filename: str = "file.png", resource_type="image") -> str:
+    response = client.post(
+        "/api/upload/",
+        params={"resource_type": resource_type},
+        files={"file": (filename, content)},
+    )
+    assert response.status_code == 201
+    return response.json()
+
+
+def ref_counts(db) -> dict[str, int]:
+    db.expire_all()
+    return {media.url: media.ref_count for media in db.query(MediaObject)}
+
+
+def stored_files() -> list[Path]:
+    return [path for path in Path(config.MEDIA_ROOT).rglob("*") if path.is_file()]
+
+
+def test_duplicate_upload_returns_the_same_url_and_stores_one_object(client, db):
+    first = upload(client, b"same bytes", "first.png")
+    second = upload(client, b"same bytes", "second.png")
+    other = upload(client, b"other bytes", "first.png")
+    # The same content as a video is indexed apart from the image.
+    video = upload(client, b"same bytes", "first.mp4", resource_type="video")
+
+    assert first == second
+    assert len({first, other, video}) == 3
+    assert ref_counts(db) == {first: 0, other: 0, video: 0}
+    assert len(stored_files()) == 3
+
+
+def test_ref_counts_follow_image_and_video_url_changes(client, db):
+    owner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=2)
+    first, second = upload(client, b"first"), upload(client, b"second")
+    video = upload(client, b"video", "video.mp4", resource_type="video")
+
+    course.image_url = first
+    for chapter in course.chapters:
+        chapter.video_url = video
+    db.commit()
+    assert ref_counts(db) == {first: 1, second: 0, video: 2}
+
+    course.image_url = second
+    course.chapters[0].video_url = None
+    db.commit()
+    assert ref_counts(db) == {first: 0, second: 1, video: 1}
+
+    headers = auth_headers(owner)
+    response = client.patch(
+        f"/api/courses/{course.id}", json={"image_url": first}, headers=headers
+    )
+    assert response.status_code == 200
+    chapter = course.chapters[1]
+    response = client.patch(
+        f"/api/courses/{course.id}/chapters/{chapter.id}",
+        json={"title": chapter.title, "video_url": None},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    assert ref_counts(db) == {first: 1, second: 0, video: 0}
+
+
+def test_ref_counts_drop_when_chapters_and_courses_are_deleted(client, db):
+    owner = create_user(db)
+    first, second = seed_catalog(db, owner, courses=2, chapters=2)
+    image = upload(client, b"image")
+    video = upload(client, b"video", "video.mp4", resource_type="video")
+    for course in (first, second):
+        course.image_url = image
+        for chapter in course.chapters:
+            chapter.video_url = video
+    db.commit()
+    assert ref_counts(db) == {image: 2, video: 4}
+    headers = auth_headers(owner)
+
+    chapter = first.chapters[0]
+    response = client.delete(f"/api/courses/{first.id}/chapters/{chapter.id}", headers=headers)
+    assert response.status_code == 200
+    assert ref_counts(db) == {image: 2, video: 3}
+
+    response = client.delete(f"/api/courses/{first.id}", headers=headers)
+    assert response.status_code == 200
+    assert ref_counts(db) == {image: 1, video: 2}
+    assert db.query(Chapter).count() == 2
+    assert db.query(Course).count() == 1
+
+
+def test_media_gc_removes_only_unreferenced_objects(client, db):
+    owner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=1)
+    used, unused = upload(client, b"used"), upload(client, b"unused")
+    course.image_url = used
+    db.commit()
+
+    # Still within the grace period of its upload.
+    assert cli.main(["media-gc", "--grace-hours", "1"]) == 0
+    assert set(ref_counts(db)) == {used, unused}
+
+    assert cli.main(["media-gc", "--grace-hours", "0"]) == 0
+    assert ref_counts(db) == {used: 1}
+    assert [path.name for path in stored_files()] == [used.rsplit("/", 1)[1]]
+
+
+CONTENT = b"0123456789abcdef"
+
+
+def stored(content: bytes = CONTENT) -> str:
+    """Media URL of `content` saved to local storage."""
+    return local_storage.save(BytesIO(content), "clip.mp4", "video")
+
+
+def test_media_is_served_whole_and_in_ranges(client):
+    url = stored()
+
+    response = client.get(url)
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["accept-ranges"] == "bytes"
+    assert response.headers["content-type"] == "video/mp4"
+
+    for value, status_code, body, content_range in [
+        ("bytes=2-5", 206, CONTENT[2:6], "bytes 2-5/16"),
+        ("bytes=-3", 206, CONTENT[-3:], "bytes 13-15/16"),
+        ("bytes=10-", 206, CONTENT[10:], "bytes 10-15/16"),
+        ("bytes=10-99", 206, CONTENT[10:], "bytes 10-15/16"),
+        # Malformed or reversed ranges are ignored.
+        ("bytes=5-2", 200, CONTENT, None),
+        ("items=0-1", 200, CONTENT, None),
+    ]:
+        response = client.get(url, headers={"Range": value})
+        assert response.status_code == status_code, value
+        assert response.content == body, value
+        assert response.headers.get("content-range") == content_range, value
+        assert response.headers["content-length"] == str(len(body)), value
+
+
+def test_unsatisfiable_range_returns_416(client):
+    response = client.get(stored(), headers={"Range": "bytes=16-"})
+
+    assert response.status_code == 416
+    assert response.headers["content-range"] == "bytes */16"
+
+
+def test_if_none_match_returns_304(client):
+    url = stored()
+    etag = client.get(url).headers["etag"]
+
+    response = client.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["etag"] == etag
+    assert client.get(url, headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_if_range_sends_the_whole_file_unless_the_validator_matches(client):
+    url = stored()
+    headers = client.get(url).headers
+    last_modified = parsedate_to_datetime(headers["last-modified"])
+    later = formatdate(last_modified.timestamp() + 60, usegmt=True)
+    earlier = formatdate(last_modified.timestamp() - 60, usegmt=True)
+
+    for if_range, status_code in [
+        (headers["etag"], 206),
+        (headers["last-modified"], 206),
+        ('"stale"', 200),
+        (f"W/{headers['etag']}", 200),
+        # Only an exact date matches, a later one does not vouch for this version.
+        (later, 200),
+        (earlier, 200),
+    ]:
+        response = client.get(url, headers={"Range": "bytes=0-3", "If-Range": if_range})
+        assert response.status_code == status_code, if_range
+        assert response.content == (CONTENT[:4] if status_code == 206 else CONTENT), if_range
+
+
+def test_head_sends_headers_without_a_body(client):
+    url = stored()
+
+    response = client.head(url)
+    assert response.status_code == 200
+    assert response.content == b""
+    assert response.headers["content-length"] == str(len(CONTENT))
+
+    response = client.head(url, headers={"Range": "bytes=0-3"})
+    assert response.status_code == 206
+    assert response.content == b""
+    assert response.headers["content-length"] == "4"
+
+
+def test_paths_outside_media_root_are_not_served(client):
+    secret = local_storage.root.parent / "secret.txt"
+    secret.write_bytes(b"secret")
+    stored()
+
+    for path in ["video/..%2F..%2Fsecret.txt", "%2E%2E/secret.txt", "video", "missing.mp4"]:
+        response = client.get(f"{config.MEDIA_URL}/{path}")
+        assert response.status_code == 404, path
+        assert b"secret" not in response.content
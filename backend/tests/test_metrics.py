@@ -0,0 +1,45 @@
+from app.config import config
+
+from .utils import auth_headers, create_user, seed_catalog
+
+
+def test_metrics_are_hidden_without_a_token(client):
+    assert client.get("/api/metrics/").status_code == 404
+
+
+def test_metrics_require_the_token(client, mocker):
+    mocker.patch.object(config, "METRICS_TOKEN", "metrics-secret")
+
+    assert client.get("/api/metrics/").status_code == 401
+    response = client.get("/api/metrics/", headers={"Authorization": "Bearer wrong"})
+    assert response.status_code == 401
+
+    response = client.get("/api/metrics/", headers={"Authorization": "Bearer metrics-secret"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"password_hasher", "cache", "stripe_events"}
+
+
+def test_cache_hits_and_misses_are_reported_per_namespace(client, db, mocker):
+    mocker.patch.object(config, "METRICS_TOKEN", "metrics-secret")
+    owner = create_user(db, "teacher@example.com")
+    seed_catalog(db, owner, courses=2)
+    headers = auth_headers(owner)
+
+    def namespaces():
+        response = client.get("/api/metrics/", headers={"Authorization": "Bearer metrics-secret"})
+        return response.json()["cache"]["namespaces"]
+
+    before = namespaces()
+    for _ in range(3):
+        client.get("/api/courses/courses-progress", headers=headers)
+    after = namespaces()
+
+    def counted(namespace):
+        counts = after[namespace]
+        previous = before.get(namespace, {"hits": 0, "misses": 0})
+        return counts["hits"] - previous["hits"], counts["misses"] - previous["misses"]
+
+    # One user lookup per request, the first one fills the cache.
+    assert counted("user") == (2, 1)
+    assert counted("response.catalog") == (2, 1)
+    assert 0 < after["user"]["hit_ratio"] < 1
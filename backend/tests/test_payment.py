@@ -0,0 +1,99 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+import pytest
+from app.stripe_client import stripe_gateway
+
+from .utils import auth_headers, create_user, seed_catalog
+
+# How long the fake Stripe API takes to answer each call.
+STRIPE_DELAY = 0.5
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.calls.append(self.path)
+        number = len(self.server.calls)
+        time.sleep(STRIPE_DELAY)
+        if self.path == "/v1/customers":
+            body = {"id": f"cus_{number}", "object": "customer"}
+        else:
+            body = {
+                "id": f"cs_{number}",
+                "object": "checkout.session",
+                "url": f"https://checkout.test/{number}",
+            }
+        data = json.dumps(body).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@pytest.fixture
+def fake_stripe(mocker):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeStripeHandler)
+    server.calls = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    mocker.patch.object(stripe_gateway, "api_base", f"http://127.0.0.1:{server.server_port}")
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_event_loop_stays_responsive_during_slow_checkouts(db, fake_stripe):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    courses = seed_catalog(db, owner, courses=4)
+    headers = auth_headers(learner)
+
+    async def checkout_while_ticking():
+        from app.main import app
+
+        gaps = []
+        done = asyncio.Event()
+
+        async def tick():
+            while not done.is_set():
+                started = time.perf_counter()
+                await asyncio.sleep(0.01)
+                gaps.append(time.perf_counter() - started)
+
+        transport = httpx.ASGITransport(app=app)
+        ticker = asyncio.create_task(tick())
+        try:
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+                responses = await asyncio.gather(
+                    *(
+                        client.post(f"/api/payment/courses/{course.id}", headers=headers)
+                        for course in courses
+                    )
+                )
+        finally:
+            done.set()
+            await ticker
+            await stripe_gateway.close()
+        return responses, gaps
+
+    started = time.perf_counter()
+    responses, gaps = asyncio.run(checkout_while_ticking())
+    elapsed = time.perf_counter() - started
+
+    assert [response.status_code for response in responses] == [200] * 4
+    assert len({response.json() for response in responses}) == 4
+    # One customer for the user, then the four sessions concurrently.
+    assert fake_stripe.calls.count("/v1/customers") == 1
+    assert fake_stripe.calls.count("/v1/checkout/sessions") == 4
+    assert elapsed < 4 * STRIPE_DELAY
+    assert max(gaps) < STRIPE_DELAY / 5
@@ -0,0 +1,116 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from app.cache import cache, is_event_loop_thread
+from app.crud.progress import crud_course_progress
+from app.models import CourseProgress
+
+from .utils import auth_headers, create_user, seed_catalog
+
+
+def get_counter(db, owner_id, course_id):
+    db.expire_all()
+    counter = db.get(CourseProgress, (owner_id, course_id))
+    return counter.completed_chapters, counter.published_chapters
+
+
+def complete_url(course, chapter):
+    return f"/api/progress/courses/{course.id}/chapters/{chapter.id}/progress"
+
+
+def test_repeated_toggles_count_once(client, db):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=2, purchaser=learner)
+    chapter = course.chapters[0]
+    headers = auth_headers(learner)
+    assert client.get(f"/api/progress/{course.id}", headers=headers).json() == 0
+
+    for is_completed, expected in [(True, 1), (True, 1), (False, 0), (False, 0), (True, 1)]:
+        response = client.put(
+            complete_url(course, chapter), json={"is_completed": is_completed}, headers=headers
+        )
+        assert response.status_code == 200
+        assert response.json()["is_completed"] is is_completed
+        assert get_counter(db, learner.id, course.id) == (expected, 2)
+
+
+def test_concurrent_first_completions_count_once(client, db):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=2, purchaser=learner)
+    chapter = course.chapters[0]
+    headers = auth_headers(learner)
+    client.get(f"/api/progress/{course.id}", headers=headers)
+
+    def complete(_):
+        return client.put(
+            complete_url(course, chapter), json={"is_completed": True}, headers=headers
+        ).status_code
+
+    with ThreadPoolExecutor(8) as pool:
+        statuses = list(pool.map(complete, range(16)))
+
+    assert statuses == [200] * 16
+    assert get_counter(db, learner.id, course.id) == (1, 2)
+    assert client.get(f"/api/progress/{course.id}", headers=headers).json() == 50.0
+
+
+def test_repeated_publish_toggles_count_once(client, db):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=2, purchaser=learner)
+    chapter = course.chapters[0]
+    headers = auth_headers(learner)
+    client.put(complete_url(course, chapter), json={"is_completed": True}, headers=headers)
+    client.get(f"/api/progress/{course.id}", headers=headers)
+    url = f"/api/courses/{course.id}/chapters/{chapter.id}/publish"
+
+    for action, expected in [("unpublish", (0, 1)), ("unpublish", (0, 1)), ("publish", (1, 2))]:
+        client.patch(url, params={"action": action}, headers=auth_headers(owner))
+        assert get_counter(db, learner.id, course.id) == expected
+    client.patch(url, params={"action": "publish"}, headers=auth_headers(owner))
+    assert get_counter(db, learner.id, course.id) == (1, 2)
+
+    assert crud_course_progress.rebuild(db, verify_only=True) == {}
+
+
+def test_retried_and_concurrent_batches_count_once(client, db):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=4, purchaser=learner)
+    headers = auth_headers(learner)
+    url = f"/api/progress/courses/{course.id}/progress"
+    batch = [{"chapter_id": chapter.id, "is_completed": True} for chapter in course.chapters[:3]]
+    client.get(f"/api/progress/{course.id}", headers=headers)
+
+    def send(_):
+        return client.put(url, json=batch, headers=headers).json()
+
+    with ThreadPoolExecutor(4) as pool:
+        results = list(pool.map(send, range(8)))
+
+    assert all(result["progress"] == 75.0 for result in results)
+    assert get_counter(db, learner.id, course.id) == (3, 4)
+
+    undo = [{"chapter_id": course.chapters[0].id, "is_completed": False}] * 2
+    assert client.put(url, json=undo, headers=headers).json()["progress"] == 50.0
+    assert client.put(url, json=undo, headers=headers).json()["progress"] == 50.0
+    assert get_counter(db, learner.id, course.id) == (2, 4)
+
+
+def test_progress_read_keeps_cache_calls_off_the_event_loop(client, db, monkeypatch):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    (course,) = seed_catalog(db, owner, courses=1, chapters=2, purchaser=learner)
+    on_loop = []
+    get_many = cache.backend.get_many
+
+    def recording_get_many(keys):
+        on_loop.append(is_event_loop_thread())
+        return get_many(keys)
+
+    monkeypatch.setattr(cache.backend, "get_many", recording_get_many)
+    response = client.get(f"/api/progress/{course.id}", headers=auth_headers(learner))
+
+    assert response.json() == 0
+    assert on_loop and not any(on_loop)
@@ -0,0 +1,71 @@
+import threading
+import time
+
+from app.models import Course
+from app.search import InMemorySearchIndex
+
+from .utils import create_user, seed_catalog
+
+
+def test_concurrent_first_searches_build_once(db, mocker):
+    seed_catalog(db, create_user(db), courses=50)
+    index = InMemorySearchIndex(refresh_seconds=300)
+    rebuild = mocker.spy(index, "rebuild")
+
+    def search():
+        from app.database import SessionLocal
+
+        with SessionLocal() as session:
+            assert len(index.search(session, "course")) == 50
+
+    threads = [threading.Thread(target=search) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert rebuild.call_count == 1
+
+
+def test_stale_index_is_rebuilt_in_the_background(db, mocker):
+    owner = create_user(db)
+    seed_catalog(db, owner, courses=3)
+    index = InMemorySearchIndex(refresh_seconds=0)
+    assert len(index.search(db, "course")) == 3
+
+    started = threading.Event()
+    release = threading.Event()
+    rebuild = index.rebuild
+
+    def slow_rebuild(session):
+        started.set()
+        release.wait(10)
+        rebuild(session)
+
+    mocker.patch.object(index, "rebuild", side_effect=slow_rebuild)
+    db.add(Course(title="python basics", description="d", owner_id=owner.id))
+    db.commit()
+    renamed = db.query(Course).filter(Course.title == "course 0").one()
+    renamed.title = "golang"
+    db.commit()
+    index.update(renamed)
+
+    began = time.monotonic()
+    # Served from the previous index while the rebuild waits.
+    assert len(index.search(db, "course")) == 2
+    assert index.search(db, "python") == []
+    assert started.wait(5)
+    assert time.monotonic() - began < 5
+
+    # A change made during the rebuild survives the swap.
+    renamed.title = "rust"
+    db.commit()
+    index.update(renamed)
+    release.set()
+    for _ in range(100):
+        if index.search(db, "python"):
+            break
+        time.sleep(0.05)
+    assert len(index.search(db, "python")) == 1
+    assert index.search(db, "rust") == [renamed.id]
+    assert index.search(db, "golang") == []
@@ -0,0 +1,29 @@
+import subprocess
+import sys
+import textwrap
+from pathlib import Path
+
+IMPORT_APP = textwrap.dedent(
+    """
+    from sqlalchemy import event
+    from sqlalchemy.pool import Pool
+
+    connections = []
+    event.listen(Pool, "connect", lambda *args: connections.append(args))
+    import app.main
+
+    print(len(connections))
+    """
+)
+
+
+def test_importing_the_app_opens_no_database_connection():
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_APP],
+        cwd=Path(__file__).parents[1],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout
+
+    assert output.strip() == "0"
@@ -0,0 +1,118 @@
+import hashlib
+import hmac
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app.config import config
+from app.crud import stripe_event
+from app.crud.stripe_event import CHECKOUT_COMPLETED, crud_stripe_event
+from app.models import DailyRevenue, Purchase, StripeEvent
+from app.worker import StripeEventWorker, stripe_event_worker
+from sqlalchemy import func
+
+from .utils import create_user, seed_catalog
+
+
+def enqueue_checkout(db, event_id, user_id, course_id):
+    payload = {
+        "id": event_id,
+        "type": CHECKOUT_COMPLETED,
+        "data": {"object": {"metadata": {"user_id": user_id, "course_id": course_id}}},
+    }
+    crud_stripe_event.enqueue(
+        db, event_id=event_id, event_type=CHECKOUT_COMPLETED, payload=json.dumps(payload)
+    )
+
+
+def test_one_failing_event_does_not_charge_its_batch(db, mocker):
+    owner = create_user(db, "teacher@example.com")
+    learner = create_user(db)
+    courses = seed_catalog(db, owner, courses=10)
+    poison = courses[3].id
+    for course in courses:
+        enqueue_checkout(db, f"evt_{course.id}", learner.id, course.id)
+
+    upsert = stripe_event.crud_purchase.upsert
+
+    def failing_upsert(db, *, objs_in, **kwargs):
+        if any(purchase["course_id"] == poison for purchase in objs_in):
+            raise RuntimeError("poison")
+        return upsert(db, objs_in=objs_in, **kwargs)
+
+    mocker.patch.object(stripe_event.crud_purchase, "upsert", side_effect=failing_upsert)
+    worker = StripeEventWorker(batch_size=100, poll_interval=60, max_attempts=1)
+
+    assert worker.process_batch() == 10
+
+    db.expire_all()
+    bought = {purchase.course_id for purchase in db.query(Purchase)}
+    assert bought == {course.id for course in courses} - {poison}
+    events = {event.id: event for event in db.query(StripeEvent)}
+    failed = events.pop(f"evt_{poison}")
+    assert failed.processed_at is None
+    assert failed.attempts == 1
+    assert "poison" in failed.last_error
+    assert all(event.processed_at and event.attempts == 1 for event in events.values())
+    assert worker.failed_batches == 1
+
+
+def signed(payload):
+    body = json.dumps(payload).encode()
+    timestamp = int(time.time())
+    signature = hmac.new(
+        config.STRIPE_WEBHOOK_SECRET.encode(), f"{timestamp}.".encode() + body, hashlib.sha256
+    ).hexdigest()
+    return body, {
+        "Stripe-Signature": f"t={timestamp},v1={signature}",
+        "Content-Type": "application/json",
+    }
+
+
+def checkout_event(event_id, user_id, course_id):
+    return {
+        "id": event_id,
+        "object": "event",
+        "type": CHECKOUT_COMPLETED,
+        "data": {
+            "object": {
+                "id": f"cs_{event_id}",
+                "object": "checkout.session",
+                "metadata": {"user_id": str(user_id), "course_id": str(course_id)},
+            }
+        },
+    }
+
+
+def test_webhook_bursts_and_redeliveries_apply_once(db, client):
+    owner = create_user(db, "teacher@example.com")
+    learners = [create_user(db, f"learner{n}@example.com") for n in range(5)]
+    courses = seed_catalog(db, owner, courses=4, price=10)
+    pairs = [(learner.id, course.id) for learner in learners for course in courses]
+    # Every event is redelivered, and every pair also has a second checkout event.
+    deliveries = [
+        checkout_event(f"evt_{n}_{copy}", user_id, course_id)
+        for n, (user_id, course_id) in enumerate(pairs)
+        for copy in (0, 1)
+    ] * 3
+    random.Random(0).shuffle(deliveries)
+
+    def deliver(event):
+        body, headers = signed(event)
+        return client.post("/api/payment/webhook", content=body, headers=headers).status_code
+
+    for _ in range(2):
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            assert set(pool.map(deliver, deliveries)) == {200}
+        stripe_event_worker.drain()
+
+        db.expire_all()
+        assert db.query(StripeEvent).count() == 2 * len(pairs)
+        assert db.query(StripeEvent).filter(StripeEvent.processed_at.is_(None)).count() == 0
+        purchases = db.query(Purchase.owner_id, Purchase.course_id).all()
+        assert sorted(purchases) == sorted(pairs)
+        sales, revenue = db.query(
+            func.sum(DailyRevenue.sales), func.sum(DailyRevenue.revenue)
+        ).one()
+        assert (sales, revenue) == (len(pairs), 10.0 * len(pairs))
@@ -0,0 +1,141 @@
+import os
+from datetime import datetime, timedelta
+
+from app.config import config
+from app.models import MediaUpload
+from app.uploads import (
+    COMPLETED,
+    EXPIRED,
+    FAILED,
+    PROCESSING,
+    UPLOADING,
+    expire_stale_uploads,
+    upload_staging,
+)
+
+from .utils import auth_headers, create_user
+
+
+def stage(db, owner, upload_id, status, age, parts=(b"part",)):
+    """An upload and its staged parts, last changed `age` ago."""
+    changed = datetime.now() - age
+    db.add(
+        MediaUpload(
+            id=upload_id,
+            owner_id=owner.id,
+            filename=f"{upload_id}.txt",
+            resource_type="image",
+            status=status,
+            size=sum(map(len, parts)),
+            created_at=changed,
+            updated_at=changed,
+        )
+    )
+    db.commit()
+    touch_parts(upload_id, parts, changed)
+
+
+def touch_parts(upload_id, parts, changed):
+    upload_dir = upload_staging.upload_dir(upload_id)
+    upload_dir.mkdir(parents=True, exist_ok=True)
+    for number, content in enumerate(parts, start=1):
+        upload_staging.part_path(upload_id, number).write_bytes(content)
+    for path in [*upload_dir.iterdir(), upload_dir]:
+        os.utime(path, (changed.timestamp(), changed.timestamp()))
+
+
+def test_stale_upload_sessions_are_expired(db):
+    owner = create_user(db)
+    day, minute = timedelta(days=1), timedelta(minutes=1)
+    stage(db, owner, "stale_uploading", UPLOADING, day)
+    stage(db, owner, "stale_failed", FAILED, day)
+    stage(db, owner, "stalled_processing", PROCESSING, day)
+    stage(db, owner, "fresh_uploading", UPLOADING, minute)
+    stage(db, owner, "fresh_processing", PROCESSING, minute)
+    # The row is old but a part just arrived.
+    stage(db, owner, "active_uploading", UPLOADING, day)
+    touch_parts("active_uploading", [b"part", b"more"], datetime.now())
+    touch_parts("orphan", [b"part"], datetime.now() - day)
+
+    discarded = expire_stale_uploads(db, max_age=timedelta(hours=1))
+
+    assert sorted(discarded) == [
+        "orphan", "stale_failed", "stale_uploading", "stalled_processing"
+    ]
+    db.expire_all()
+    statuses = {upload.id: upload.status for upload in db.query(MediaUpload)}
+    assert statuses == {
+        "stale_uploading": EXPIRED,
+        "stale_failed": EXPIRED,
+        "stalled_processing": EXPIRED,
+        "fresh_uploading": UPLOADING,
+        "fresh_processing": PROCESSING,
+        "active_uploading": UPLOADING,
+    }
+    assert sorted(upload_staging.upload_ids()) == [
+        "active_uploading", "fresh_processing", "fresh_uploading"
+    ]
+
+
+def test_stalled_processing_upload_can_be_completed_again(db, client):
+    owner = create_user(db)
+    stalled = timedelta(seconds=config.UPLOAD_PROCESSING_TIMEOUT + 60)
+    stage(db, owner, "stalled", PROCESSING, stalled, parts=[b"hello ", b"world"])
+    stage(db, owner, "processing", PROCESSING, timedelta(minutes=1))
+    headers = auth_headers(owner)
+
+    response = client.post(
+        "/api/upload/sessions/processing/complete", json={"parts": [1]}, headers=headers
+    )
+    assert response.status_code == 409
+
+    response = client.post(
+        "/api/upload/sessions/stalled/complete", json={"parts": [1, 2]}, headers=headers
+    )
+    assert response.status_code == 202
+    db.expire_all()
+    upload = db.get(MediaUpload, "stalled")
+    assert upload.status == COMPLETED
+    assert upload.size == 11
+    assert upload_staging.upload_ids() == ["processing"]
+
+
+def test_chunked_upload_flow_against_local_storage(db, client, monkeypatch):
+    owner = create_user(db)
+    headers = auth_headers(owner)
+    monkeypatch.setattr(upload_staging, "max_part_size", 8)
+    response = client.post(
+        "/api/upload/sessions",
+        json={"filename": "clip.mp4", "resource_type": "video"},
+        headers=headers,
+    )
+    assert response.status_code == 201
+    assert response.json()["status"] == UPLOADING
+    sessions = f"/api/upload/sessions/{response.json()['id']}"
+
+    parts = {3: b"world", 1: b"hello", 2: b", "}
+    for number, content in parts.items():
+        response = client.put(f"{sessions}/parts/{number}", content=content, headers=headers)
+        assert response.status_code == 200
+        assert response.json() == {"part_number": number, "size": len(content)}
+    response = client.put(f"{sessions}/parts/4", content=b"too large!", headers=headers)
+    assert response.status_code == 413
+    assert client.get(sessions, headers=headers).json()["parts"] == {"1": 5, "2": 2, "3": 5}
+
+    response = client.post(f"{sessions}/complete", json={"parts": [1, 2, 3, 4]}, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Missing parts: [4]"
+
+    # The background job runs before the test client returns.
+    response = client.post(f"{sessions}/complete", json={"parts": [1, 2, 3]}, headers=headers)
+    assert response.status_code == 202
+    upload = client.get(sessions, headers=headers).json()
+    assert upload["status"] == COMPLETED
+    assert upload["size"] == 12
+    assert upload["parts"] == {}
+    assert client.get(upload["url"]).content == b"hello, world"
+    assert upload_staging.upload_ids() == []
+
+    response = client.post(f"{sessions}/complete", json={"parts": [1, 2, 3]}, headers=headers)
+    assert response.status_code == 409
+    assert response.json()["detail"] == "Upload is completed"
@@ -0,0 +1,55 @@
+from app import models
+from app.security import create_token
+
+
+def create_user(db, email: str = "learner@example.com") -> models.User:
+    user = models.User(
+        username=email.split("@")[0], email=email, hashed_password="x", is_active=True
+    )
+    db.add(user)
+    db.commit()
+    return user
+
+
+def auth_headers(user: models.User) -> dict[str, str]:
+    return {"Authorization": f"Bearer {create_token(user.email, 'access')}"}
+
+
+def seed_catalog(
+    db,
+    owner: models.User,
+    courses: int,
+    chapters: int = 3,
+    purchaser: models.User = None,
+    price: float = 10,
+) -> list[models.Course]:
+    """Published courses of `owner` with published chapters, all bought by `purchaser`."""
+    category = models.Category(name="category")
+    db.add(category)
+    created = []
+    for number in range(courses):
+        course = models.Course(
+            title=f"course {number}",
+            description="description",
+            image_url="image",
+            price=price,
+            is_published=True,
+            owner=owner,
+            category=category,
+        )
+        course.chapters = [
+            models.Chapter(
+                title=f"chapter {position}",
+                description="description",
+                video_url="video",
+                position=position,
+                is_published=True,
+            )
+            for position in range(chapters)
+        ]
+        if purchaser is not None:
+            course.purchases = [models.Purchase(owner=purchaser)]
+        created.append(course)
+    db.add_all(created)
+    db.commit()
+    return created